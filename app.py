@@ -9,7 +9,8 @@ from ui_components import (
     render_sidebar_profile,
     render_chat_header,
     render_chat_messages,
-    get_user_input
+    get_user_input,
+    render_perf_metrics
 )
 from chatbot_logic import (
     initialize_session_state,
@@ -17,12 +18,34 @@ from chatbot_logic import (
     reset_session,
     initialize_chat_messages,
     process_user_input,
-    export_conversation_to_json
+    export_conversation_to_json,
+    is_streaming_enabled,
+    clear_quick_replies,
+    collect_quick_replies,
+    has_pending_quick_replies,
+    collect_stage_evaluation,
+    has_pending_stage_evaluation,
+    collect_safety_reconciliation,
+    has_pending_safety_reconciliation
 )
 from persona_ui import (
     render_persona_selection,
     display_selected_persona_info
 )
+from llm_client import get_connection_stats
+from settings import get_setting
+import perf_metrics
+import distortion_classifier
+
+
+# 백그라운드 선택지 생성 결과 폴링 간격 (초)
+QUICK_REPLY_POLL_INTERVAL = 0.5
+
+# 백그라운드 단계 완료 평가 결과 폴링 간격 (초)
+STAGE_EVALUATION_POLL_INTERVAL = 1.0
+
+# 데드라인을 넘긴 안전 평가 결과 폴링 간격 (초)
+SAFETY_RECONCILIATION_POLL_INTERVAL = 1.0
 
 
 def show_persona_selection_page():
@@ -48,6 +71,65 @@ def show_user_info_page():
         st.rerun()
 
 
+def render_quick_replies(user_info):
+    """빠른 답변 선택지 표시"""
+    # 백그라운드 생성이 끝났으면 전체 화면을 다시 그려 폴링 중단
+    if collect_quick_replies():
+        st.rerun()
+    
+    if has_pending_quick_replies():
+        st.caption("💡 빠른 답변을 준비하고 있어요...")
+        return
+    
+    if 'quick_replies' in st.session_state and st.session_state.quick_replies:
+        st.markdown("---")
+        st.markdown("**💡 빠른 답변을 선택하거나 직접 입력하세요:**")
+        
+        options = st.session_state.quick_replies
+        
+        # 선택지 개수에 따라 열 개수 조정
+        if len(options) <= 2:
+            cols = st.columns(2)
+        else:
+            cols = st.columns(3)
+        
+        # 버튼 생성
+        for idx, option in enumerate(options):
+            col_idx = idx % len(cols)
+            with cols[col_idx]:
+                if st.button(
+                    option, 
+                    key=f"quick_reply_{idx}",
+                    use_container_width=True,
+                    type="secondary"
+                ):
+                    # 선택한 답변을 사용자 입력으로 처리
+                    # 선택지 초기화
+                    clear_quick_replies()
+                    
+                    # 스트리밍 모드: 응답 말풍선보다 사용자 말풍선을 먼저 표시
+                    if is_streaming_enabled():
+                        with st.chat_message("user", avatar="😊"):
+                            st.markdown(option)
+                    
+                    with st.spinner("생각 중..."):
+                        process_user_input(option, user_info)
+                    
+                    st.rerun()
+
+
+def watch_stage_evaluation():
+    """백그라운드 단계 평가가 끝나면 결과(전환/피드백 메시지)를 바로 화면에 반영"""
+    if collect_stage_evaluation():
+        st.rerun()
+
+
+def watch_safety_reconciliation():
+    """늦게 도착한 안전 평가가 더 높은 위험도면 개입 메시지를 바로 화면에 반영"""
+    if collect_safety_reconciliation():
+        st.rerun()
+
+
 def show_chat_page():
     """채팅 페이지"""
     user_info = st.session_state.user_info
@@ -104,6 +186,11 @@ def show_chat_page():
             st.caption(f"📍 현재: {stage_names.get(current_stage, current_stage)}")
         else:
             st.info("💬 대화를 시작하면 다운로드할 수 있습니다.")
+        
+        # 성능 지표 (운영자용)
+        if get_setting("SHOW_PERF_METRICS", False, bool):
+            st.markdown("---")
+            render_perf_metrics(perf_metrics.snapshot(), get_connection_stats())
     
     # 채팅 헤더 렌더링
     render_chat_header(user_info)
@@ -115,44 +202,28 @@ def show_chat_page():
     render_chat_messages(st.session_state.messages)
     
     # ===== 빠른 답변 선택지 표시 =====
-    if 'quick_replies' in st.session_state and st.session_state.quick_replies:
-        st.markdown("---")
-        st.markdown("**💡 빠른 답변을 선택하거나 직접 입력하세요:**")
-        
-        options = st.session_state.quick_replies
-        
-        # 선택지 개수에 따라 열 개수 조정
-        if len(options) <= 2:
-            cols = st.columns(2)
-        else:
-            cols = st.columns(3)
-        
-        # 버튼 생성
-        for idx, option in enumerate(options):
-            col_idx = idx % len(cols)
-            with cols[col_idx]:
-                if st.button(
-                    option, 
-                    key=f"quick_reply_{idx}",
-                    use_container_width=True,
-                    type="secondary"
-                ):
-                    # 선택한 답변을 사용자 입력으로 처리
-                    # 선택지 초기화
-                    from chatbot_logic import clear_quick_replies
-                    clear_quick_replies()
-                    
-                    with st.spinner("생각 중..."):
-                        process_user_input(option, user_info)
-                    
-                    st.rerun()
+    # 백그라운드 생성 중이면 fragment가 결과를 폴링
+    poll_interval = QUICK_REPLY_POLL_INTERVAL if has_pending_quick_replies() else None
+    st.fragment(render_quick_replies, run_every=poll_interval)(user_info)
+    
+    # ===== 지연된 단계 완료 평가 결과 반영 =====
+    if has_pending_stage_evaluation():
+        st.fragment(watch_stage_evaluation, run_every=STAGE_EVALUATION_POLL_INTERVAL)()
+    
+    # ===== 데드라인을 넘긴 안전 평가 결과 대조 =====
+    if has_pending_safety_reconciliation():
+        st.fragment(watch_safety_reconciliation, run_every=SAFETY_RECONCILIATION_POLL_INTERVAL)()
     
     # 사용자 입력 처리
     if prompt := get_user_input():
         # 선택지 초기화 (직접 입력 시)
-        from chatbot_logic import clear_quick_replies
         clear_quick_replies()
         
+        # 스트리밍 모드: 응답 말풍선보다 사용자 말풍선을 먼저 표시
+        if is_streaming_enabled():
+            with st.chat_message("user", avatar="😊"):
+                st.markdown(prompt)
+        
         # 사용자 입력 처리 및 응답 생성
         with st.spinner("생각 중..."):
             process_user_input(prompt, user_info)
@@ -174,6 +245,9 @@ def main():
     # 커스텀 CSS 적용
     apply_custom_css()
     
+    # 로컬 인지왜곡 모델 워밍업 (프로세스당 1회, LOCAL_MODEL_WARMUP 설정 시)
+    distortion_classifier.start_warmup()
+    
     # 세션 상태 초기화
     initialize_session_state()
     
@@ -0,0 +1,112 @@
+"""
+청소년 인지 재구조화 챗봇 - 백그라운드 작업 실행기
+
+공유 스레드 풀에서 작업을 실행하되, 제출한 세션의 Streamlit 스크립트 컨텍스트를
+작업 스레드에 연결해 st.session_state / st.error 등을 그대로 사용할 수 있게 합니다.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from settings import get_setting
+
+
+# 작업 종류별 스레드 풀: 이름 → (스레드 수 설정, 기본값)
+# 안전 평가와 헤지 요청은 빠른 답변·지연 평가·섀도 추출 뒤에 줄 서지 않도록 전용 풀 사용
+# 병렬 추출은 공유 풀 작업(지연 평가) 안에서 기다리므로 공유 풀이 아닌 전용 풀 사용
+POOLS = {
+    'shared': ("BACKGROUND_WORKERS", 16),
+    'safety': ("SAFETY_WORKERS", 8),
+    'hedge': ("HEDGE_WORKERS", 4),
+    'extraction': ("EXTRACTION_WORKERS", 4),
+}
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(pool='shared'):
+    """스레드 풀 가져오기 (풀마다 최초 호출 시 생성)"""
+    executor = _executors.get(pool)
+
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                setting, default = POOLS[pool]
+                executor = ThreadPoolExecutor(
+                    max_workers=get_setting(setting, default, int),
+                    thread_name_prefix=f"chatbot-{pool}"
+                )
+                _executors[pool] = executor
+
+    return executor
+
+
+def submit(fn, *args, **kwargs):
+    """
+    백그라운드 작업 제출 (공유 풀)
+
+    Args:
+        fn: 실행할 함수
+        *args, **kwargs: 함수 인자
+
+    Returns:
+        concurrent.futures.Future
+    """
+    return submit_to('shared', fn, *args, **kwargs)
+
+
+def submit_to(pool, fn, *args, **kwargs):
+    """
+    지정한 풀에 백그라운드 작업 제출
+
+    Args:
+        pool: POOLS의 풀 이름 ('shared', 'safety', 'hedge', 'extraction')
+        fn: 실행할 함수
+        *args, **kwargs: 함수 인자
+
+    Returns:
+        concurrent.futures.Future
+    """
+    ctx = get_script_run_ctx()
+
+    def run():
+        # 제출한 세션의 스크립트 컨텍스트 연결
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+
+    return get_executor(pool).submit(run)
+
+
+def start(fn, *args, **kwargs):
+    """
+    전용 스레드에서 작업 바로 시작 (풀 대기 없음)
+
+    풀 크기에 묶이면 안 되는 요청당 작업용 (예: 헤지 요청의 첫 요청)
+
+    Args:
+        fn: 실행할 함수
+        *args, **kwargs: 함수 인자
+
+    Returns:
+        concurrent.futures.Future
+    """
+    ctx = get_script_run_ctx()
+    future = Future()
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="chatbot-request", daemon=True).start()
+    return future
@@ -0,0 +1,218 @@
+"""
+청소년 인지 재구조화 챗봇 - 내보낸 대화 일괄 인지왜곡 점수 계산 (오프라인 연구용)
+
+앱에서 내보낸 대화 JSON(export_conversation_to_json)을 스트리밍으로 읽어 로컬 분류기로
+점수를 계산합니다. 길이가 비슷한 대화끼리 묶어(길이 정렬 버킷) 패딩 낭비를 줄이고,
+모델을 한 번씩만 로드한 프로세스 풀에서 배치 추론합니다.
+
+실행:
+    python batch_score.py exports/ --output scores.parquet --workers 4 --batch-size 16
+    python batch_score.py conversations.jsonl --output scores.npz --backend onnx
+
+입력: JSON 파일, 디렉터리(*.json, *.jsonl 재귀 탐색), JSON Lines 파일(한 줄에 대화 1개)
+출력: .parquet (pyarrow 필요) 또는 .npz (numpy) - 대화 ID 열 + 레이블별 확률 열
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from distortion_classifier import DISTORTION_LABELS, stage2_text_from_export
+
+
+# 한 번에 읽어 길이순으로 정렬할 대화 수 (메모리 사용량 상한)
+DEFAULT_CHUNK_SIZE = 1024
+PROGRESS_INTERVAL = 10.0
+
+_classifier = None
+
+
+# ========== 입력 스트리밍 ==========
+
+def iter_files(paths):
+    """입력 경로에서 JSON / JSON Lines 파일 경로를 순서대로 생성"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.endswith(('.json', '.jsonl')):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def iter_conversations(paths):
+    """
+    (대화 ID, Stage 2 입력 텍스트)를 하나씩 생성 (파일 전체를 한꺼번에 올리지 않음)
+
+    Stage 2 대화가 없는 내보내기는 건너뜁니다.
+    """
+    for file in iter_files(paths):
+        try:
+            with open(file, 'r', encoding='utf-8') as f:
+                if file.endswith('.jsonl'):
+                    records = ((f"{file}:{i}", json.loads(line)) for i, line in enumerate(f, 1) if line.strip())
+                else:
+                    records = [(file, json.load(f))]
+
+                for conversation_id, data in records:
+                    if not data.get('stages', {}).get('stage2_analysis', {}).get('messages'):
+                        continue
+                    yield conversation_id, stage2_text_from_export(data)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ 읽기 실패: {file} ({e})")
+
+
+def iter_buckets(conversations, chunk_size, batch_size):
+    """chunk_size개씩 읽어 길이순으로 정렬한 뒤 batch_size개씩 묶기"""
+    chunk = []
+    for item in conversations:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield from _split_sorted(chunk, batch_size)
+            chunk = []
+    if chunk:
+        yield from _split_sorted(chunk, batch_size)
+
+
+def _split_sorted(chunk, batch_size):
+    chunk.sort(key=lambda item: len(item[1]))
+    for i in range(0, len(chunk), batch_size):
+        yield chunk[i:i + batch_size]
+
+
+# ========== 워커 프로세스 ==========
+
+def _init_worker(backend, threads):
+    """워커 프로세스 시작 시 분류기 1회 로드"""
+    global _classifier
+    import distortion_classifier
+
+    if threads:
+        os.environ["LOCAL_MODEL_THREADS"] = str(threads)
+    _classifier = distortion_classifier.create_classifier(backend)
+    _classifier.load()
+
+
+def _score_bucket(bucket):
+    """버킷 1개 배치 추론 → [(대화 ID, [확률, ...]), ...]"""
+    results = _classifier.predict_batch([text for _, text in bucket])
+    return [
+        (conversation_id, [probs[label] for label in DISTORTION_LABELS])
+        for (conversation_id, _), probs in zip(bucket, results)
+    ]
+
+
+# ========== 출력 ==========
+
+class ParquetOutput:
+    """버킷 단위로 Parquet row group 기록 (pyarrow)"""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [('conversation_id', pa.string())] + [(label, pa.float32()) for label in DISTORTION_LABELS]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        columns = {'conversation_id': [conversation_id for conversation_id, _ in rows]}
+        for i, label in enumerate(DISTORTION_LABELS):
+            columns[label] = [probs[i] for _, probs in rows]
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class NpzOutput:
+    """numpy 압축 파일 (ids 배열 + float32 확률 행렬, 레이블 순서 포함)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = []
+        self.probs = []
+
+    def write(self, rows):
+        for conversation_id, probs in rows:
+            self.ids.append(conversation_id)
+            self.probs.append(probs)
+
+    def close(self):
+        import numpy as np
+
+        np.savez_compressed(
+            self.path,
+            conversation_id=np.array(self.ids, dtype=str),
+            labels=np.array(DISTORTION_LABELS, dtype=str),
+            probs=np.array(self.probs, dtype=np.float32).reshape(-1, len(DISTORTION_LABELS))
+        )
+
+
+def open_output(path):
+    if path.endswith('.parquet'):
+        return ParquetOutput(path)
+    if path.endswith('.npz'):
+        return NpzOutput(path)
+    raise ValueError("출력 파일 확장자는 .parquet 또는 .npz여야 합니다")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="내보낸 대화 일괄 인지왜곡 점수 계산")
+    parser.add_argument("inputs", nargs="+", help="JSON / JSON Lines 파일 또는 디렉터리")
+    parser.add_argument("--output", required=True, help="출력 파일 (.parquet 또는 .npz)")
+    parser.add_argument("--backend", choices=["torch", "onnx"], help="분류기 백엔드 (기본: LOCAL_MODEL_BACKEND)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4), help="프로세스 수")
+    parser.add_argument("--threads-per-worker", type=int, help="워커별 추론 스레드 수 (기본: CPU 수 / 워커 수)")
+    parser.add_argument("--batch-size", type=int, default=16, help="버킷당 대화 수")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="길이 정렬 단위 (대화 수)")
+    args = parser.parse_args()
+
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+    output = open_output(args.output)
+    buckets = iter_buckets(iter_conversations(args.inputs), args.chunk_size, args.batch_size)
+
+    print(f"[일괄 점수] 워커 {args.workers}개 × {threads}스레드, 버킷 {args.batch_size}개")
+    started = time.monotonic()
+    last_report = started
+    scored = 0
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.backend, threads)
+    ) as pool:
+        # 워커 수의 2배만큼만 미리 제출 (입력을 끝까지 미리 읽지 않음)
+        in_flight = []
+        for bucket in buckets:
+            in_flight.append(pool.submit(_score_bucket, bucket))
+            if len(in_flight) < args.workers * 2:
+                continue
+
+            rows = in_flight.pop(0).result()
+            output.write(rows)
+            scored += len(rows)
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                print(f"  {scored}개 완료 ({scored / (now - started):.1f} 대화/초)")
+                last_report = now
+
+        for future in in_flight:
+            rows = future.result()
+            output.write(rows)
+            scored += len(rows)
+
+    output.close()
+    elapsed = time.monotonic() - started
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {scored}개 대화 점수 계산 완료 - {elapsed:.1f}초, {rate:.2f} 대화/초 → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+청소년 인지 재구조화 챗봇 - 인지왜곡 분류 백엔드 비교 벤치마크 (일치도 + 지연시간)
+
+같은 대화를 각 백엔드(torch / onnx)로 추론해 확률 차이와 상위 유형 일치율,
+로드 시간, 추론 지연시간(p50/p95)을 비교합니다. 첫 번째 백엔드가 기준입니다.
+
+실행:
+    python benchmark_classifier.py --backends torch onnx --conversations exports/ --repeat 3
+    python benchmark_classifier.py --backends onnx --threads 4
+
+--conversations에는 앱에서 내보낸 대화 JSON 파일 또는 디렉터리를 지정합니다.
+지정하지 않으면 내장 예시 대화를 사용합니다.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import distortion_classifier
+from distortion_classifier import DISTORTION_LABELS, stage2_text_from_export
+
+
+# 내장 예시 대화 (짧은 대화 / 긴 대화)
+SAMPLE_CONVERSATIONS = [
+    "Stage 2 대화 내용:\n\n"
+    "상담사: 그때 어떤 생각이 들었어?\n"
+    "청소년: 친구들이 다 나를 싫어하는 것 같았어요.\n"
+    "상담사: 모든 친구들이 그렇다고 느꼈구나.\n"
+    "청소년: 네, 한 명도 내 편이 없는 것 같아요.\n",
+    "Stage 2 대화 내용:\n\n"
+    "상담사: 시험 결과를 보고 어떤 생각이 제일 먼저 들었어?\n"
+    "청소년: 이번에 망했으니까 대학도 못 가고 인생이 끝난 것 같았어요.\n"
+    "상담사: 한 번의 시험이 인생 전체를 결정한다고 느꼈구나.\n"
+    "청소년: 엄마가 실망할 거고 저는 항상 이런 식이에요. 저는 원래 못하는 애예요.\n",
+    "Stage 2 대화 내용:\n\n" + "".join(
+        f"상담사: 그 다음엔 어떻게 됐어?\n청소년: 제가 뭘 해도 다 제 잘못인 것 같아요. {i}번째로 또 그랬어요.\n"
+        for i in range(1, 40)
+    )
+]
+
+TOP_K = 3
+THRESHOLD = 0.5
+
+
+def load_conversations(paths):
+    """내보낸 대화 JSON 파일/디렉터리에서 Stage 2 입력 텍스트 목록 만들기"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.json')
+            )
+        else:
+            files.append(path)
+
+    texts = []
+    for file in files:
+        with open(file, 'r', encoding='utf-8') as f:
+            texts.append(stage2_text_from_export(json.load(f)))
+    return texts
+
+
+def run_backend(backend, texts, repeat):
+    """백엔드 로드 후 모든 대화 추론 (첫 1회는 워밍업으로 제외)"""
+    classifier = distortion_classifier.create_classifier(backend)
+    classifier.load()
+    classifier.predict(texts[0])
+
+    latencies = []
+    results = []
+    for text in texts:
+        for _ in range(repeat):
+            started = time.monotonic()
+            probs = classifier.predict(text)
+            latencies.append(time.monotonic() - started)
+        results.append(probs)
+
+    return classifier.report, latencies, results
+
+
+def _top(probs, k):
+    return [label for label, _ in sorted(probs.items(), key=lambda x: x[1], reverse=True)[:k]]
+
+
+def compare(reference, results):
+    """기준 결과 대비 확률 차이 / 상위 유형 일치율 / 임계값 판정 일치율"""
+    abs_diffs = []
+    top1_match = 0
+    topk_overlap = 0
+    decision_match = 0
+
+    for ref, res in zip(reference, results):
+        diffs = [abs(ref[label] - res[label]) for label in DISTORTION_LABELS]
+        abs_diffs.extend(diffs)
+        top1_match += _top(ref, 1) == _top(res, 1)
+        topk_overlap += len(set(_top(ref, TOP_K)) & set(_top(res, TOP_K))) / TOP_K
+        decision_match += sum(
+            (ref[label] >= THRESHOLD) == (res[label] >= THRESHOLD) for label in DISTORTION_LABELS
+        ) / len(DISTORTION_LABELS)
+
+    n = len(reference)
+    return {
+        'max_abs_diff': max(abs_diffs),
+        'mean_abs_diff': statistics.fmean(abs_diffs),
+        'top1_agreement': top1_match / n,
+        f'top{TOP_K}_overlap': topk_overlap / n,
+        'decision_agreement': decision_match / n
+    }
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인지왜곡 분류 백엔드 비교 벤치마크")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--conversations", nargs="*", default=[], help="내보낸 대화 JSON 파일/디렉터리")
+    parser.add_argument("--repeat", type=int, default=3, help="대화별 반복 추론 횟수")
+    parser.add_argument("--threads", type=int, help="ONNX Runtime 스레드 수 (LOCAL_MODEL_THREADS)")
+    args = parser.parse_args()
+
+    if args.threads:
+        os.environ["LOCAL_MODEL_THREADS"] = str(args.threads)
+
+    texts = load_conversations(args.conversations) or SAMPLE_CONVERSATIONS
+    print(f"대화 {len(texts)}개 × {args.repeat}회\n")
+
+    reports = {}
+    for backend in args.backends:
+        print(f"===== {backend} =====")
+        reports[backend] = run_backend(backend, texts, args.repeat)
+
+    print("\n[지연시간]")
+    for backend, (report, latencies, _) in reports.items():
+        print(
+            f"  {backend:<6} 로드 {report['load_seconds']:.1f}초 · 모델 {report['model_mb']:.0f}MB · "
+            f"p50 {_percentile(latencies, 50) * 1000:.0f}ms · p95 {_percentile(latencies, 95) * 1000:.0f}ms "
+            f"({report['device']})"
+        )
+
+    reference_backend = args.backends[0]
+    reference = reports[reference_backend][2]
+    for backend in args.backends[1:]:
+        print(f"\n[일치도] {backend} vs {reference_backend}")
+        for name, value in compare(reference, reports[backend][2]).items():
+            print(f"  {name}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+청소년 인지 재구조화 챗봇 - 위기 키워드 매처 벤치마크 (재현율 + 지연시간)
+
+crisis_recall_set.jsonl(한 줄에 {"text", "level", "note"})로 위험도별 재현율과 일상 표현 오탐률을
+계산하고, 메시지 1개 검사 시간(p50/p99)을 기존 단순 포함 검사(check_crisis_keywords 이전 방식)와
+비교합니다. level은 기대 위험도입니다 (5: 긴급, 4: 높음, 0: 위기 키워드 아님).
+
+실행:
+    python benchmark_crisis_matcher.py
+    python benchmark_crisis_matcher.py --recall-set my_set.jsonl --min-recall 0.95
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import crisis_matcher
+
+
+DEFAULT_RECALL_SET = "crisis_recall_set.jsonl"
+
+# 기존 단순 포함 검사 키워드 (비교 기준)
+LEGACY_KEYWORDS = [
+    '죽고 싶', '자살', '자해', '끝내고 싶',
+    '사라지고 싶', '목숨', '유서',
+    '칼로 긋', '약을 먹', '뛰어내리',
+    '목을 매', '손목을'
+]
+
+# 지연시간 측정용 긴 메시지 (Stage 2 대화 한 턴 분량)
+LONG_MESSAGE = (
+    "오늘 학교에서 발표를 했는데 중간에 말이 막혀서 다들 웃는 것 같았어요. "
+    "끝나고 나서도 계속 그 장면이 떠올라서 수업에 집중을 못 했고, 집에 와서도 "
+    "엄마한테 말도 못 하고 방에만 있었어요. 나는 왜 이렇게 항상 실수만 하는지 모르겠어요. "
+) * 3
+
+
+def legacy_match(text):
+    return any(keyword in text for keyword in LEGACY_KEYWORDS)
+
+
+def load_recall_set(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(samples):
+    """위험도별 재현율 / 오탐률 + 놓친 문장·오탐 문장 목록"""
+    results = {'new': {}, 'legacy': {}}
+    misses = []
+    false_alarms = []
+
+    for name, detect in (('new', lambda t: (crisis_matcher.assess_keywords(t) or {}).get('risk_level', 0)),
+                         ('legacy', lambda t: 5 if legacy_match(t) else 0)):
+        counts = {5: [0, 0], 4: [0, 0], 0: [0, 0]}
+        for sample in samples:
+            expected = sample['level']
+            level = detect(sample['text'])
+            counts[expected][1] += 1
+            if expected == 0:
+                hit = level > 0
+                if hit and name == 'new':
+                    false_alarms.append(sample)
+            else:
+                # Level 5는 5로 잡아야 즉시 경고가 뜨고, Level 4는 키워드가 하나라도 잡히면 인정
+                hit = level >= 5 if expected == 5 else level > 0
+                if not hit and name == 'new':
+                    misses.append(sample)
+            counts[expected][0] += hit
+
+        results[name] = {
+            'recall_level5': counts[5][0] / max(counts[5][1], 1),
+            'recall_level4': counts[4][0] / max(counts[4][1], 1),
+            'false_alarm_rate': counts[0][0] / max(counts[0][1], 1)
+        }
+
+    return results, misses, false_alarms
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def measure(detect, texts, repeat):
+    """메시지 1개 검사 시간 목록 (마이크로초)"""
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            started = time.perf_counter()
+            detect(text)
+            latencies.append((time.perf_counter() - started) * 1_000_000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="위기 키워드 매처 벤치마크 (재현율 + 지연시간)")
+    parser.add_argument("--recall-set", default=DEFAULT_RECALL_SET, help="재현율 검증 세트 (JSON Lines)")
+    parser.add_argument("--repeat", type=int, default=200, help="지연시간 측정 반복 횟수")
+    parser.add_argument("--min-recall", type=float, help="Level 5 재현율이 이보다 낮으면 종료 코드 1")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    matcher = crisis_matcher.CrisisMatcher(crisis_matcher.CRISIS_PATTERNS, crisis_matcher.EXCLUSION_PATTERNS)
+    compile_ms = (time.perf_counter() - started) * 1000
+    print(f"패턴 {matcher.pattern_count}개 · 상태 {matcher.state_count}개 · 컴파일 {compile_ms:.1f}ms\n")
+
+    samples = load_recall_set(args.recall_set)
+    results, misses, false_alarms = evaluate(samples)
+
+    print(f"[재현율] 문장 {len(samples)}개")
+    for name, metrics in results.items():
+        print(
+            f"  {name:<6} Level 5 {metrics['recall_level5']:.1%} · Level 4 {metrics['recall_level4']:.1%} · "
+            f"오탐 {metrics['false_alarm_rate']:.1%}"
+        )
+    for sample in misses:
+        print(f"  ❌ 놓침 (Level {sample['level']}): {sample['text']} [{sample.get('note', '')}]")
+    for sample in false_alarms:
+        print(f"  ⚠️ 오탐: {sample['text']} [{sample.get('note', '')}]")
+
+    texts = [sample['text'] for sample in samples]
+    print(f"\n[지연시간] 메시지 1개당 (반복 {args.repeat}회)")
+    for label, batch in (("짧은 메시지", texts), (f"긴 메시지 {len(LONG_MESSAGE)}자", [LONG_MESSAGE])):
+        for name, detect in (('new', crisis_matcher.find_crisis_keywords), ('legacy', legacy_match)):
+            latencies = measure(detect, batch, args.repeat)
+            print(
+                f"  {label:<14} {name:<6} p50 {_percentile(latencies, 50):.1f}µs · "
+                f"p99 {_percentile(latencies, 99):.1f}µs"
+            )
+
+    if args.min_recall is not None and results['new']['recall_level5'] < args.min_recall:
+        print(f"\n❌ Level 5 재현율이 기준({args.min_recall:.1%})보다 낮습니다")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
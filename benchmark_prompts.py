@@ -0,0 +1,160 @@
+"""
+청소년 인지 재구조화 챗봇 - 시스템 프롬프트 조립 벤치마크 (페르소나 × 단계)
+
+페르소나 4개 × 단계 3개(정보 수집 / 인지왜곡 탐색 / 재구조화) 조합마다
+미리 조합한 템플릿(get_composed_prompt)으로 만든 시스템 프롬프트가 기존 방식(매번 파일 읽기 +
+문자열 이어 붙이기)과 같은지 확인하고, 턴당 프롬프트 조립 시간(p50/p99)을 비교합니다.
+
+실행:
+    python benchmark_prompts.py
+    python benchmark_prompts.py --repeat 2000
+"""
+
+import argparse
+import sys
+import time
+
+import streamlit as st
+
+import chatbot_logic
+from chatbot_logic import PERSONAS
+
+
+USER_INFO = {'gender': '여성', 'age': 15, 'emotion_intensity': 7}
+
+ANALYSIS_DATA = {
+    'emotion': {'primary': '불안'},
+    'logic': {'automatic_thoughts': ['다들 나를 싫어해', '나는 항상 실수만 해']},
+    'behavior': {'actions': ['방에만 있었다']}
+}
+
+RESTRUCTURING_STATE = {
+    'restructuring_method': {'selected_method': '증거 찾기', 'method_code': 'evidence'},
+    'selected_distortion': {'type': '과잉 일반화'}
+}
+
+
+# ========== 기존 방식 (비교 기준: 턴마다 파일을 읽고 이어 붙이기) ==========
+
+def _read(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def legacy_persona_prompt(persona_id):
+    persona_info = PERSONAS.get(persona_id, PERSONAS['friend'])
+    return _read("prompt9_persona.txt").replace('{selected_persona}', persona_info['name'])
+
+
+def legacy_stage1(user_info, persona_id):
+    user_context = f"""
+
+**[사용자 정보]**
+- 성별: {user_info['gender']}
+- 나이: {user_info['age']}세
+- 하루 점수: {user_info['emotion_intensity']}/10 (0=괜찮음, 10=최악)
+
+위 정보를 참고하되, 대화 중에는 언급하지 마세요. 자연스럽게 대화를 이어가세요."""
+    return _read("prompt1.txt") + user_context + legacy_persona_prompt(persona_id)
+
+
+def legacy_stage2(user_info, persona_id, analysis_data):
+    user_context = f"""
+
+**[사용자 정보]**
+- 성별: {user_info['gender']}
+- 나이: {user_info['age']}세
+- 하루 점수: {user_info['emotion_intensity']}/10 (0=괜찮음, 10=최악)"""
+    analysis_context = f"""
+
+**[수집된 정보 - 참고용]**
+이전 단계에서 다음 정보가 수집되었습니다:
+
+• 감정: {analysis_data.get('emotion', {}).get('primary', 'N/A')}
+• 자동적 사고: {', '.join(analysis_data.get('logic', {}).get('automatic_thoughts', [])[:2]) if analysis_data.get('logic', {}).get('automatic_thoughts') else 'N/A'}
+• 행동: {', '.join(analysis_data.get('behavior', {}).get('actions', [])[:2]) if analysis_data.get('behavior', {}).get('actions') else 'N/A'}
+
+이 정보를 참고하여 더 깊이 탐색하세요."""
+    return _read("prompt4.txt") + user_context + analysis_context + legacy_persona_prompt(persona_id)
+
+
+def legacy_restructuring(persona_id, state, analysis_data):
+    base_prompt = _read("prompt7.txt")
+    base_prompt = base_prompt.replace('{restructuring_method}', state['restructuring_method']['selected_method'])
+    base_prompt = base_prompt.replace('{selected_distortion_type}', state['selected_distortion']['type'])
+    base_prompt = base_prompt.replace('{situation_summary}', str(analysis_data))
+    return base_prompt + legacy_persona_prompt(persona_id)
+
+
+# ========== 측정 ==========
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def measure(build, repeat):
+    """프롬프트 1개 조립 시간 목록 (마이크로초)"""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+    return latencies
+
+
+def stage_builders(persona_id):
+    """단계별 (이름, 기존 방식, 조합 템플릿) 조립 함수"""
+    return [
+        ('collection',
+         lambda: legacy_stage1(USER_INFO, persona_id),
+         lambda: chatbot_logic.get_system_prompt_stage1(USER_INFO)),
+        ('analysis',
+         lambda: legacy_stage2(USER_INFO, persona_id, ANALYSIS_DATA),
+         lambda: chatbot_logic.get_system_prompt_stage2(USER_INFO)),
+        ('restructuring',
+         lambda: legacy_restructuring(persona_id, RESTRUCTURING_STATE, ANALYSIS_DATA),
+         lambda: chatbot_logic.get_system_prompt_restructuring(USER_INFO))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시스템 프롬프트 조립 벤치마크 (페르소나 × 단계)")
+    parser.add_argument("--repeat", type=int, default=1000, help="조합마다 측정 반복 횟수")
+    args = parser.parse_args()
+
+    st.session_state.analysis_data = ANALYSIS_DATA
+    for key, value in RESTRUCTURING_STATE.items():
+        st.session_state[key] = value
+
+    mismatches = 0
+    results = {}
+    for persona_id in PERSONAS:
+        st.session_state.selected_persona = persona_id
+        for stage, legacy, composed in stage_builders(persona_id):
+            prompt = composed()
+            if prompt != legacy():
+                mismatches += 1
+                print(f"❌ 결과 불일치: {persona_id} × {stage}")
+
+            for name, build in (('legacy', legacy), ('composed', composed)):
+                results.setdefault((stage, name), []).extend(measure(build, args.repeat))
+            results.setdefault((stage, 'chars'), []).append(len(prompt))
+
+    print(f"페르소나 {len(PERSONAS)}개 × 단계 3개 · 결과 불일치 {mismatches}개\n")
+    print(f"[턴당 프롬프트 조립 시간] 조합마다 반복 {args.repeat}회")
+    for stage in ('collection', 'analysis', 'restructuring'):
+        chars = max(results[(stage, 'chars')])
+        for name in ('legacy', 'composed'):
+            latencies = results[(stage, name)]
+            print(
+                f"  {stage:<14} {name:<9} p50 {_percentile(latencies, 50):7.1f}µs · "
+                f"p99 {_percentile(latencies, 99):7.1f}µs  ({chars}자)"
+            )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+청소년 인지 재구조화 챗봇 - 안전 선별 보정 리포트 (임계값별 LLM 대비 재현율)
+
+SAFETY_SCREENING_LOG로 기록한 트래픽(선별 점수 + LLM 판정)을 현재 위험 단서 사전으로 다시
+점수 매겨, 임계값마다 LLM 호출 비율과 LLM 판정 대비 재현율(Level 3/4/5 이상)을 계산합니다.
+
+- SAFETY_SCREENING=false 상태로 기록한 트래픽은 모든 메시지에 LLM 판정이 있어 그대로 사용합니다.
+- 선별을 켠 상태의 기록은 감사 표본(route=audit)을 1 / SAFETY_AUDIT_RATE 가중치로 계산해
+  통과시킨 메시지 전체를 대표하게 합니다.
+- 원문이 없는 기록(SAFETY_SCREENING_LOG_TEXT=false, 기본값)은 다시 점수를 매길 수 없어 기록 당시 점수를 쓰고,
+  놓친 메시지는 메시지 해시와 감지된 단서로 표시합니다.
+
+실행:
+    python calibrate_safety_screening.py safety_screening_log.jsonl
+    python calibrate_safety_screening.py logs/*.jsonl --thresholds 0.1 0.15 0.3 --target-recall 0.99
+"""
+
+import argparse
+import json
+from collections import Counter
+
+from safety_screening import score_message
+
+
+DEFAULT_THRESHOLDS = [0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7]
+RECALL_LEVELS = [5, 4, 3]
+MAX_MISSES_SHOWN = 10
+
+
+def load_records(paths):
+    records = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    return records
+
+
+def rescore(records, use_logged_scores):
+    """
+    현재 사전으로 점수 다시 계산 (사전을 고친 뒤 효과 확인용)
+
+    Returns:
+        다시 계산한 기록 수 (원문이 있는 기록만)
+    """
+    rescored = 0
+    for record in records:
+        if not use_logged_scores and 'message' in record:
+            record['score'], record['keyword_level'], record['cues'] = score_message(record['message'])
+            rescored += 1
+    return rescored
+
+
+def _describe(record):
+    """놓친 메시지 표시 (원문이 없으면 해시 + 감지된 단서)"""
+    if 'message' in record:
+        return record['message'][:60]
+    cues = ", ".join(record.get('cues', [])) or "단서 없음"
+    return f"#{record.get('message_hash', '')[:12]} ({cues})"
+
+
+def _escalated(record, threshold):
+    return bool(record.get('keyword_level')) or record.get('context_elevated', False) or record['score'] >= threshold
+
+
+def _weight(record):
+    # 감사 표본 1건은 같은 시점에 통과시킨 메시지 1 / audit_rate 건을 대표
+    if record.get('route') == 'audit' and record.get('audit_rate'):
+        return 1.0 / record['audit_rate']
+    return 1.0
+
+
+def evaluate(records, threshold, audit_rate):
+    """임계값 1개의 LLM 호출 비율 / 위험도별 재현율 / 놓친 메시지"""
+    escalated = sum(_escalated(record, threshold) for record in records)
+    call_rate = (escalated + audit_rate * (len(records) - escalated)) / len(records)
+
+    judged = [record for record in records if record.get('llm_level') is not None]
+    recall = {}
+    for level in RECALL_LEVELS:
+        positives = [record for record in judged if record['llm_level'] >= level]
+        total = sum(_weight(record) for record in positives)
+        caught = sum(_weight(record) for record in positives if _escalated(record, threshold))
+        recall[level] = caught / total if total else None
+
+    misses = [record for record in judged if record['llm_level'] >= 4 and not _escalated(record, threshold)]
+    return call_rate, recall, misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="안전 선별 보정 리포트 (임계값별 LLM 대비 재현율)")
+    parser.add_argument("logs", nargs="+", help="SAFETY_SCREENING_LOG 파일 (JSON Lines)")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--audit-rate", type=float, default=0.05, help="통과 메시지 감사 비율 (호출 비율 계산용)")
+    parser.add_argument("--target-recall", type=float, default=1.0, help="Level 4 이상 목표 재현율 (권장 임계값 계산)")
+    parser.add_argument("--use-logged-scores", action="store_true", help="기록 당시 점수 사용 (다시 계산하지 않음)")
+    args = parser.parse_args()
+
+    records = load_records(args.logs)
+    if not records:
+        print("기록이 없습니다.")
+        return
+
+    rescored = rescore(records, args.use_logged_scores)
+    judged = [record for record in records if record.get('llm_level') is not None]
+    audited = sum(record.get('route') == 'audit' for record in records)
+    print(f"메시지 {len(records)}개 · LLM 판정 {len(judged)}개 (감사 표본 {audited}개)")
+    if not args.use_logged_scores and rescored < len(records):
+        print(f"⚠️ 원문이 없는 기록 {len(records) - rescored}개는 기록 당시 점수 사용 (SAFETY_SCREENING_LOG_TEXT=false)")
+    print()
+
+    header = " ".join(f"{'재현율 L' + str(level) + '+':>11}" for level in RECALL_LEVELS)
+    print(f"{'임계값':>6} {'LLM 호출':>8} {header}")
+
+    recommended = None
+    results = {}
+    for threshold in sorted(args.thresholds):
+        call_rate, recall, misses = evaluate(records, threshold, args.audit_rate)
+        results[threshold] = misses
+        cells = " ".join(
+            f"{'-' if recall[level] is None else f'{recall[level]:.1%}':>13}" for level in RECALL_LEVELS
+        )
+        print(f"{threshold:>8.2f} {call_rate:>10.1%} {cells}")
+
+        if recall[4] is not None and recall[4] >= args.target_recall:
+            recommended = threshold
+
+    if recommended is None:
+        print(f"\n❌ 목표 재현율 {args.target_recall:.1%}를 만족하는 임계값이 없습니다")
+        shown = min(args.thresholds)
+    else:
+        print(f"\n✅ 권장 SAFETY_SCREENING_THRESHOLD={recommended} (Level 4 이상 재현율 ≥ {args.target_recall:.1%})")
+        # 권장값보다 한 단계 높은 임계값에서 놓치는 메시지
+        higher = [threshold for threshold in sorted(args.thresholds) if threshold > recommended]
+        shown = higher[0] if higher else None
+
+    # 놓치는 메시지 = 위험 단서 사전 보강 후보
+    if shown is not None:
+        misses = Counter((record['llm_level'], _describe(record)) for record in results[shown])
+        print(f"\n[임계값 {shown}에서 놓치는 Level 4 이상 메시지] {sum(misses.values())}개")
+        for (level, message), count in misses.most_common(MAX_MISSES_SHOWN):
+            print(f"  L{level} ×{count}: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,35 @@
 """
 
 import streamlit as st
-from openai import OpenAI
 import datetime
 import os
 import json
+import time
+import copy
+import functools
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeoutError, wait as wait_futures
+
+from llm_client import get_api_key, chat_completion, get_deadline
+from structured_output import complete_json, collect_outcomes, apply_outcomes
+from hedging import is_hedging_enabled, hedged_stream, hedged_completion_text
+from settings import get_setting
+import perf_metrics
+import background
+import distortion_classifier
+import crisis_matcher
+import safety_screening
+import safety_fallback
+import safety_cache
+import prompt_registry
+from incremental_scoring import (
+    is_incremental_scoring_enabled,
+    request_scoring,
+    collect_scores,
+    get_running_probs,
+    get_ranking,
+    build_extraction_hint
+)
 
 # ========== 안전 에이전트 Import ==========
 try:
@@ -22,30 +47,6 @@ except ImportError:
     print("⚠️ 안전 에이전트를 불러올 수 없습니다.")
 
 
-# ========== API 키 헬퍼 함수 ==========
-def get_api_key():
-    """
-    API 키 가져오기 (Streamlit Secrets 우선, 환경변수 대체)
-    """
-    try:
-        # Streamlit Secrets 시도
-        api_key = st.secrets.get("OPENAI_API_KEY")
-        if api_key:
-            return api_key
-    except:
-        pass
-    
-    # 환경변수 시도
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        return api_key
-    
-    # 둘 다 없으면 에러
-    st.error("⚠️ OpenAI API 키가 설정되지 않았습니다. Streamlit Secrets에 OPENAI_API_KEY를 추가하세요.")
-    return None
-
-
-
 def initialize_session_state():
     """세션 상태 초기화"""
     if 'user_info_collected' not in st.session_state:
@@ -76,16 +77,28 @@ def initialize_session_state():
     # ========== 빠른 답변 선택지 ==========
     if 'quick_replies' not in st.session_state:
         st.session_state.quick_replies = None  # 현재 선택 가능한 답변들
+    if 'pending_quick_replies' not in st.session_state:
+        st.session_state.pending_quick_replies = None  # 백그라운드 생성 중인 선택지
+    if 'pending_stage_evaluation' not in st.session_state:
+        st.session_state.pending_stage_evaluation = None  # 백그라운드 단계 완료 평가
+    if 'turn_seq' not in st.session_state:
+        st.session_state.turn_seq = 0  # 턴 번호 (이전 턴의 늦은 결과 폐기용)
+    if 'distortion_scores' not in st.session_state:
+        st.session_state.distortion_scores = None  # Stage 2 턴별 누적 인지왜곡 점수
+    if 'pending_distortion_scores' not in st.session_state:
+        st.session_state.pending_distortion_scores = None  # 백그라운드 점수 계산
+    if 'pending_safety_reconciliation' not in st.session_state:
+        st.session_state.pending_safety_reconciliation = None  # 데드라인을 넘긴 안전 평가
+    if 'pending_evaluation_logs' not in st.session_state:
+        st.session_state.pending_evaluation_logs = []  # 섀도 추출 등 백그라운드 작업의 평가 로그
     
     # ========== 안전 에이전트 초기화 ==========
     if 'safety_agent' not in st.session_state and SAFETY_AGENT_AVAILABLE:
         print("\n[안전 에이전트 초기화 시작]")
         try:
-            # API 키 (다른 에이전트와 동일)
-            api_key = get_api_key()
-            
-            if api_key:
-                st.session_state.safety_agent = SafetyAgent(api_key)
+            # 공유 OpenAI 클라이언트 사용 (다른 에이전트와 동일)
+            if get_api_key():
+                st.session_state.safety_agent = SafetyAgent()
                 print("✅ 안전 에이전트 초기화 성공!")
             else:
                 st.session_state.safety_agent = None
@@ -105,18 +118,81 @@ def initialize_session_state():
         st.session_state.last_risk_level = 1
 
 
+# 백그라운드 작업 스레드의 평가 로그 (session_state 대신 작업 결과와 함께 반환)
+_log_buffer = threading.local()
+
+
 def add_evaluation_log(log_type, data):
     """평가 로그 추가"""
-    if 'evaluation_logs' not in st.session_state:
-        st.session_state.evaluation_logs = []
-    
     import datetime
     log_entry = {
         'timestamp': datetime.datetime.now().isoformat(),
         'type': log_type,
         'data': data
     }
-    st.session_state.evaluation_logs.append(log_entry)
+    store_evaluation_logs([log_entry])
+
+
+def store_evaluation_logs(entries):
+    """
+    평가 로그 저장
+    
+    백그라운드 작업(run_with_evaluation_logs) 안에서는 session_state를 건드리지 않고 작업 결과에 모으고,
+    스크립트 스레드에서만 evaluation_logs에 추가합니다. 아직 끝나지 않은 작업(Future)은
+    collect_evaluation_logs에서 반영하고, 함수 항목(구조화 출력 통계 등)은 스크립트 스레드에서 실행합니다.
+    """
+    buffer = getattr(_log_buffer, 'entries', None)
+    if buffer is not None:
+        buffer.extend(entries)
+        return
+    
+    if 'evaluation_logs' not in st.session_state:
+        st.session_state.evaluation_logs = []
+    pending = st.session_state.get('pending_evaluation_logs') or []
+    for entry in entries:
+        if isinstance(entry, Future):
+            pending.append(entry)
+        elif callable(entry):
+            entry()
+        else:
+            st.session_state.evaluation_logs.append(entry)
+    st.session_state.pending_evaluation_logs = pending
+
+
+def run_with_evaluation_logs(fn, *args):
+    """
+    백그라운드 작업 실행 (평가 로그는 session_state에 쓰지 않고 결과와 함께 반환)
+    
+    Returns:
+        (fn 결과, 평가 로그 목록) - 스크립트 스레드에서 store_evaluation_logs로 반영
+    """
+    previous = getattr(_log_buffer, 'entries', None)
+    _log_buffer.entries = []
+    try:
+        result, outcomes = collect_outcomes(fn, *args)
+        entries = _log_buffer.entries
+        if outcomes:
+            # 구조화 출력 세션 통계도 스크립트 스레드에서 반영
+            entries.append(functools.partial(apply_outcomes, outcomes))
+        return result, entries
+    finally:
+        _log_buffer.entries = previous
+
+
+def collect_evaluation_logs():
+    """끝난 백그라운드 작업(섀도 추출 등)의 평가 로그 반영"""
+    pending = st.session_state.get('pending_evaluation_logs') or []
+    st.session_state.pending_evaluation_logs = [future for future in pending if not future.done()]
+    
+    for future in pending:
+        if not future.done():
+            continue
+        try:
+            _, entries = future.result()
+        except Exception as e:
+            print(f"⚠️ 백그라운드 작업 오류: {str(e)}")
+            continue
+        store_evaluation_logs(entries)
 
 
 def save_user_info(user_info):
@@ -187,7 +263,8 @@ def export_conversation_to_json():
             'total_messages': len(st.session_state.messages),
             'stage1_turns': len([m for m in stage_messages['collection'] if m['role'] == 'user']),
             'stage2_turns': len([m for m in stage_messages['analysis'] if m['role'] == 'user']),
-            'stage3_turns': len([m for m in stage_messages['restructuring'] if m['role'] == 'user'])
+            'stage3_turns': len([m for m in stage_messages['restructuring'] if m['role'] == 'user']),
+            'structured_output': st.session_state.get('structured_output_stats', {})
         }
     }
     
@@ -216,10 +293,9 @@ def get_welcome_message(user_info):
 
 
 def load_prompt_from_file(file_path):
-    """외부 파일에서 프롬프트 로드"""
+    """외부 파일에서 프롬프트 로드 (프롬프트 레지스트리 캐시)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return prompt_registry.get_text(file_path)
     except FileNotFoundError:
         st.error(f"⚠️ 프롬프트 파일을 찾을 수 없습니다: {file_path}")
         return ""
@@ -228,51 +304,102 @@ def load_prompt_from_file(file_path):
         return ""
 
 
-def get_persona_prompt():
+# 페르소나 프롬프트용 정보 (prompt9_persona.txt의 {selected_persona})
+PERSONAS = {
+    "detective": {"name": "분석적 있는 탐정형 (형/누나)", "emoji": "🕵️"},
+    "friend": {"name": "따뜻한 감정 공감 친구형 (친구)", "emoji": "💕"},
+    "cool": {"name": "쿨한 형·누나형 (현실적 조력 유머)", "emoji": "😎"},
+    "coach": {"name": "자분한 건문 코치형 (상담교사 느낌)", "emoji": "🧘"}
+}
+
+
+def get_persona_prompt(persona_id=None):
     """페르소나 프롬프트 로드 및 적용"""
-    persona_id = st.session_state.get('selected_persona', 'friend')
-    
-    # 페르소나 정보
-    PERSONAS = {
-        "detective": {"name": "분석적 있는 탐정형 (형/누나)", "emoji": "🕵️"},
-        "friend": {"name": "따뜻한 감정 공감 친구형 (친구)", "emoji": "💕"},
-        "cool": {"name": "쿨한 형·누나형 (현실적 조력 유머)", "emoji": "😎"},
-        "coach": {"name": "자분한 건문 코치형 (상담교사 느낌)", "emoji": "🧘"}
-    }
+    if persona_id is None:
+        persona_id = st.session_state.get('selected_persona', 'friend')
+    persona_info = PERSONAS.get(persona_id, PERSONAS['friend'])
     
-    # prompt9 파일 로드
+    # prompt9 템플릿에 페르소나 정보 삽입
     try:
-        prompt_file_path = "prompt9_persona.txt"
-        with open(prompt_file_path, 'r', encoding='utf-8') as f:
-            persona_prompt = f.read()
-        
-        # 페르소나 정보 삽입
-        persona_info = PERSONAS.get(persona_id, PERSONAS['friend'])
-        persona_prompt = persona_prompt.replace('{selected_persona}', persona_info['name'])
-        
-        return persona_prompt
+        return prompt_registry.render("prompt9_persona.txt", selected_persona=persona_info['name'])
     except FileNotFoundError:
         # 파일이 없으면 기본 페르소나 설명만
-        persona_info = PERSONAS.get(persona_id, PERSONAS['friend'])
         return f"\n\n**[대화 스타일]**\n선택된 페르소나: {persona_info['emoji']} {persona_info['name']}\n이 페르소나의 특징을 살려 대화하세요.\n"
     except Exception as e:
         return ""
 
 
-def get_system_prompt_stage1(user_info):
-    """Stage 1: 정보 수집 단계 프롬프트"""
-    # 프롬프트 파일 경로
-    prompt_file_path = "prompt1.txt"
+# 단계별 시스템 프롬프트 구성: (프롬프트 파일, 파일이 없을 때 기본 프롬프트, 페르소나 앞에 들어갈 동적 자리표시자)
+STAGE_PROMPTS = {
+    'collection': (
+        "prompt1.txt",
+        """당신은 청소년의 고민을 경청하며 체계적으로 정보를 수집하는 상담사입니다.
+정보 수집 후 [COLLECTION_COMPLETE] 신호를 출력하세요.""",
+        "{user_context}"
+    ),
+    'analysis': (
+        "prompt4.txt",
+        """당신은 청소년의 인지왜곡을 탐색하는 상담사입니다.
+자동적 사고, 중간 신념, 핵심 신념을 탐색하세요.
+질문보다는 반영, 요약, 공감을 많이 사용하세요.""",
+        "{user_context}{analysis_context}"
+    ),
+    'restructuring': (
+        "prompt7.txt",
+        """당신은 청소년의 인지왜곡을 재구조화하는 전문 상담사입니다.
+감정 타당화, 콜롬보식 접근, 논리적 반문을 사용하세요.""",
+        ""
+    )
+}
+
+# (단계, 페르소나) → (단계 템플릿, 페르소나 템플릿, 조합된 템플릿) - 원본 템플릿이 바뀌면 다시 조합
+_composed_prompts = {}
+
+
+def _registry_template(file_path):
+    """레지스트리 템플릿 (파일이 없으면 None)"""
+    try:
+        return prompt_registry.get_registry().get(file_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ 프롬프트 파일 로드 중 오류 발생: {file_path} ({e})")
+        return None
+
+
+def get_composed_prompt(stage, persona_id=None):
+    """
+    페르소나 × 단계 시스템 프롬프트 템플릿
     
-    # 파일에서 프롬프트 로드
-    prompt1 = load_prompt_from_file(prompt_file_path)
+    단계 프롬프트 + 동적 자리표시자 + 페르소나 프롬프트를 처음 한 번만 이어 붙여 두고,
+    턴마다 사용자 정보·분석 요약만 채웁니다 (결과는 매번 조립하던 문자열과 동일).
+    프롬프트 파일이 바뀌어 레지스트리가 다시 읽으면 새로 조합합니다.
+    """
+    if persona_id is None:
+        persona_id = st.session_state.get('selected_persona', 'friend')
+    if persona_id not in PERSONAS:
+        persona_id = 'friend'
+    
+    file_path, default_prompt, dynamic = STAGE_PROMPTS[stage]
+    stage_template = _registry_template(file_path)
+    persona_template = _registry_template("prompt9_persona.txt")
+    if stage_template is None:
+        st.error(f"⚠️ 프롬프트 파일을 찾을 수 없습니다: {file_path}")
     
-    if not prompt1:
-        # 파일 로드 실패 시 기본 프롬프트 사용
-        prompt1 = """당신은 청소년의 고민을 경청하며 체계적으로 정보를 수집하는 상담사입니다.
-정보 수집 후 [COLLECTION_COMPLETE] 신호를 출력하세요."""
+    cached = _composed_prompts.get((stage, persona_id))
+    if cached is not None and cached[0] is stage_template and cached[1] is persona_template:
+        return cached[2]
     
-    # 사용자 정보 추가
+    base = stage_template.text if stage_template is not None and stage_template.text else default_prompt
+    composed = prompt_registry.PromptTemplate(base + dynamic + get_persona_prompt(persona_id))
+    _composed_prompts[(stage, persona_id)] = (stage_template, persona_template, composed)
+    perf_metrics.increment("prompt.composed")
+    return composed
+
+
+def get_system_prompt_stage1(user_info):
+    """Stage 1: 정보 수집 단계 프롬프트"""
+    # 사용자 정보 (페르소나 앞에 삽입)
     user_context = f"""
 
 **[사용자 정보]**
@@ -282,27 +409,12 @@ def get_system_prompt_stage1(user_info):
 
 위 정보를 참고하되, 대화 중에는 언급하지 마세요. 자연스럽게 대화를 이어가세요."""
 
-    # 페르소나 프롬프트 추가
-    persona_prompt = get_persona_prompt()
-
-    return prompt1 + user_context + persona_prompt
+    return get_composed_prompt('collection').render(user_context=user_context)
 
 
 def get_system_prompt_stage2(user_info):
     """Stage 2: 인지왜곡 탐색 단계 프롬프트"""
-    # 프롬프트 파일 경로
-    prompt_file_path = "prompt4.txt"
-    
-    # 파일에서 프롬프트 로드
-    prompt4 = load_prompt_from_file(prompt_file_path)
-    
-    if not prompt4:
-        # 파일 로드 실패 시 기본 프롬프트 사용
-        prompt4 = """당신은 청소년의 인지왜곡을 탐색하는 상담사입니다.
-자동적 사고, 중간 신념, 핵심 신념을 탐색하세요.
-질문보다는 반영, 요약, 공감을 많이 사용하세요."""
-    
-    # 사용자 정보 및 분석 데이터 추가
+    # 사용자 정보 및 분석 데이터 (페르소나 앞에 삽입)
     user_context = f"""
 
 **[사용자 정보]**
@@ -311,6 +423,7 @@ def get_system_prompt_stage2(user_info):
 - 하루 점수: {user_info['emotion_intensity']}/10 (0=괜찮음, 10=최악)"""
 
     # 분석 데이터가 있으면 추가
+    analysis_context = ""
     if 'analysis_data' in st.session_state and st.session_state.analysis_data:
         analysis_data = st.session_state.analysis_data
         analysis_context = f"""
@@ -323,16 +436,8 @@ def get_system_prompt_stage2(user_info):
 • 행동: {', '.join(analysis_data.get('behavior', {}).get('actions', [])[:2]) if analysis_data.get('behavior', {}).get('actions') else 'N/A'}
 
 이 정보를 참고하여 더 깊이 탐색하세요."""
-        
-        # 페르소나 프롬프트 추가
-        persona_prompt = get_persona_prompt()
-        
-        return prompt4 + user_context + analysis_context + persona_prompt
     
-    # 페르소나 프롬프트 추가
-    persona_prompt = get_persona_prompt()
-    
-    return prompt4 + user_context + persona_prompt
+    return get_composed_prompt('analysis').render(user_context=user_context, analysis_context=analysis_context)
 
 
 def get_system_prompt_evaluator():
@@ -464,17 +569,149 @@ def add_assistant_message(message):
     })
 
 
+def is_streaming_enabled():
+    """응답 스트리밍 모드 여부 (STREAM_REPLIES 설정)"""
+    return get_setting("STREAM_REPLIES", False, bool)
+
+
+def record_reply_timing(mode, ttft, total):
+    """
+    턴별 응답 지연시간 기록 (첫 토큰까지 시간 포함)
+    
+    Args:
+        mode: 'stream' 또는 'blocking'
+        ttft: 첫 토큰까지 걸린 시간 (초, blocking은 전체 시간과 동일)
+        total: 전체 응답 시간 (초)
+    """
+    perf_metrics.observe(f"reply.ttft.{mode}", ttft)
+    perf_metrics.observe(f"reply.total.{mode}", total)
+    
+    turn = len([m for m in st.session_state.get('messages', []) if m["role"] == "user"])
+    add_evaluation_log('reply_timing', {
+        'turn': turn,
+        'stage': st.session_state.get('current_stage', 'collection'),
+        'mode': mode,
+        'ttft': round(ttft, 3),
+        'total': round(total, 3),
+        'prompt_assembly': round(prompt_registry.turn_assembly_time(), 6)
+    })
+    print(f"[응답 시간] {mode} - 첫 토큰 {ttft:.2f}초 / 전체 {total:.2f}초")
+
+
+def stream_reply_to_chat(agent, request):
+    """
+    토큰이 도착하는 대로 assistant 말풍선에 표시하고 전체 텍스트 반환
+    
+    안전 평가 병행 모드에서는 평가 결과가 나올 때까지 토큰을 모아두기만 하고,
+    위험도 5면 스트림을 닫고 SafetyEscalation을 발생시킵니다 (이미 나온 판정이면 요청 전에).
+    스트림은 성공·오류와 관계없이 항상 닫습니다.
+    """
+    started = time.perf_counter()
+    ttft = None
+    chunks = []
+    gate = get_active_safety_gate()
+    
+    if gate is not None:
+        gate.check()
+    
+    slot = st.empty()
+    bubble = None
+    
+    stream = open_reply_stream(agent, request)
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            chunks.append(delta)
+            
+            # 안전 평가 전에는 화면에 내보내지 않음
+            if gate is not None:
+                gate.check()
+                if not gate.ready():
+                    continue
+            
+            if bubble is None:
+                bubble = slot.chat_message("assistant", avatar="🤖").empty()
+            bubble.markdown("".join(chunks) + "▌")
+        
+        if gate is not None:
+            gate.release()
+    except SafetyEscalation:
+        slot.empty()
+        raise
+    except Exception:
+        # 스트림 도중 오류: 이미 보인 부분 응답은 끊겼다고 표시 (오류 메시지는 호출한 쪽에서)
+        perf_metrics.increment("reply.stream_interrupted")
+        if bubble is not None:
+            bubble.markdown("".join(chunks) + "\n\n⚠️ *응답이 중간에 끊겼습니다.*")
+        raise
+    finally:
+        stream.close()
+    
+    text = "".join(chunks)
+    if bubble is None:
+        bubble = slot.chat_message("assistant", avatar="🤖").empty()
+    bubble.markdown(text)
+    
+    total = time.perf_counter() - started
+    record_reply_timing('stream', ttft if ttft is not None else total, total)
+    return text
+
+
+def open_reply_stream(agent, request):
+    """단계별 응답 스트림 열기 (헤지 모드면 먼저 첫 토큰을 보낸 요청 사용)"""
+    if is_hedging_enabled():
+        return hedged_stream(agent, **request)
+    return chat_completion(agent, stream=True, **request)
+
+
+def complete_reply(agent, request):
+    """
+    단계별 응답 생성 호출 (스트리밍/블로킹 모드 공통)
+    
+    Args:
+        agent: 호출 에이전트 이름 (stage_reply, restructuring_reply)
+        request: chat.completions.create 인자
+    
+    Returns:
+        응답 텍스트
+    """
+    if is_streaming_enabled():
+        return stream_reply_to_chat(agent, request)
+    
+    # 안전 평가 병행 모드: 이미 위험도 5로 판정됐으면 응답을 요청하지 않음
+    gate = get_active_safety_gate()
+    if gate is not None:
+        gate.check()
+    
+    started = time.perf_counter()
+    if is_hedging_enabled():
+        text = hedged_completion_text(agent, **request)
+    else:
+        text = chat_completion(agent, **request).choices[0].message.content
+    total = time.perf_counter() - started
+    
+    record_reply_timing('blocking', total, total)
+    
+    # 안전 평가 병행 모드: 평가 결과가 나온 뒤에만 응답 공개
+    if gate is not None:
+        gate.release()
+    
+    return text
+
+
 def generate_response_with_gpt(user_message, user_info):
     """GPT API를 사용하여 응답 생성"""
     try:
-        # OpenAI 클라이언트 초기화 (API 키 하드코딩)
-        api_key = get_api_key()
-        
-        client = OpenAI(api_key=api_key)
-        
         # 대화 히스토리 구성
         messages = [
-            {"role": "system", "content": get_system_prompt(user_info)}
+            {"role": "system", "content": prompt_registry.assemble('reply', get_system_prompt, user_info)}
         ]
         
         # 이전 대화 내역 추가 (최근 10개만)
@@ -492,30 +729,26 @@ def generate_response_with_gpt(user_message, user_info):
             "content": user_message
         })
         
-        # GPT API 호출
-        response = client.chat.completions.create(
-            model="gpt-4o",  # 또는 "gpt-3.5-turbo"
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        return response.choices[0].message.content
+        # GPT API 호출 (스트리밍 모드면 말풍선에 바로 표시)
+        return complete_reply('stage_reply', {
+            'messages': messages
+        })
         
+    except SafetyEscalation:
+        raise
     except Exception as e:
         return f"⚠️ 응답 생성 중 오류가 발생했습니다: {str(e)}\n\n문제가 계속되면 관리자에게 문의해주세요."
 
 
-def check_collection_complete_with_evaluator():
+def check_collection_complete_with_evaluator(messages=None):
     """평가 에이전트를 사용하여 정보 수집 완료 여부 확인"""
+    if messages is None:
+        messages = st.session_state.messages
+    
     try:
-        # API 키
-        api_key = get_api_key()
-        client = OpenAI(api_key=api_key)
-        
         # 대화 내역을 텍스트로 변환
         conversation_text = "대화 내용:\n"
-        for msg in st.session_state.messages:
+        for msg in messages:
             role = "청소년" if msg["role"] == "user" else "상담사"
             conversation_text += f"{role}: {msg['content']}\n"
         
@@ -523,29 +756,14 @@ def check_collection_complete_with_evaluator():
         evaluator_prompt = get_system_prompt_evaluator()
         
         # 평가 요청
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        result = complete_json(
+            'collection_evaluator',
             messages=[
                 {"role": "system", "content": evaluator_prompt},
                 {"role": "user", "content": conversation_text}
-            ],
-            temperature=0.3,  # 낮은 temperature로 일관된 판단
-            max_tokens=200
+            ]
         )
         
-        # 응답 파싱
-        result_text = response.choices[0].message.content.strip()
-        
-        # JSON 파싱 시도
-        import json
-        # JSON 코드 블록 제거
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(result_text)
-        
         # 평가 로그 저장
         add_evaluation_log('stage1_evaluation', {
             'status': result.get('status'),
@@ -561,16 +779,15 @@ def check_collection_complete_with_evaluator():
         return False, {"status": "INCOMPLETE", "reason": "평가 오류"}
 
 
-def extract_emotion_logic_behavior():
+def extract_emotion_logic_behavior(messages=None):
     """추출 에이전트를 사용하여 감정-논리-행동 추출"""
+    if messages is None:
+        messages = st.session_state.messages
+    
     try:
-        # API 키
-        api_key = get_api_key()
-        client = OpenAI(api_key=api_key)
-        
         # 대화 내역을 텍스트로 변환 (사용자 메시지만)
         conversation_text = "청소년과의 대화 내용:\n\n"
-        for msg in st.session_state.messages:
+        for msg in messages:
             if msg["role"] == "user":
                 conversation_text += f"청소년: {msg['content']}\n"
         
@@ -578,29 +795,14 @@ def extract_emotion_logic_behavior():
         extractor_prompt = get_system_prompt_extractor()
         
         # 추출 요청
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        result = complete_json(
+            'elb_extractor',
             messages=[
                 {"role": "system", "content": extractor_prompt},
                 {"role": "user", "content": conversation_text}
-            ],
-            temperature=0.5,
-            max_tokens=800
+            ]
         )
         
-        # 응답 파싱
-        result_text = response.choices[0].message.content.strip()
-        
-        # JSON 파싱
-        import json
-        # JSON 코드 블록 제거
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(result_text)
-        
         # 추출 로그 저장
         add_evaluation_log('stage1_extraction', {
             'emotion': result.get('emotion'),
@@ -615,15 +817,14 @@ def extract_emotion_logic_behavior():
         return False, None
 
 
-def check_distortion_extraction_ready():
+def check_distortion_extraction_ready(messages=None):
     """인지왜곡 추출 준비 평가"""
+    if messages is None:
+        messages = st.session_state.messages
+    
     try:
-        # API 키
-        api_key = get_api_key()
-        client = OpenAI(api_key=api_key)
-        
         # Stage 2 (analysis) 대화만 필터링
-        analysis_messages = [m for m in st.session_state.messages if m.get('stage') == 'analysis']
+        analysis_messages = [m for m in messages if m.get('stage') == 'analysis']
         
         # 대화 내역을 텍스트로 변환
         conversation_text = "Stage 2 인지왜곡 탐색 대화 내용:\n\n"
@@ -635,29 +836,14 @@ def check_distortion_extraction_ready():
         evaluator_prompt = get_system_prompt_distortion_evaluator()
         
         # 평가 요청
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        result = complete_json(
+            'distortion_evaluator',
             messages=[
                 {"role": "system", "content": evaluator_prompt},
                 {"role": "user", "content": conversation_text}
-            ],
-            temperature=0.3,
-            max_tokens=500
+            ]
         )
         
-        # 응답 파싱
-        result_text = response.choices[0].message.content.strip()
-        
-        # JSON 파싱
-        import json
-        # JSON 코드 블록 제거
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(result_text)
-        
         # 평가 로그 저장
         add_evaluation_log('stage2_evaluation', {
             'status': result.get('status'),
@@ -673,11 +859,124 @@ def check_distortion_extraction_ready():
         return False, {"status": "NOT_READY", "reason": "평가 오류"}
 
 
-def extract_cognitive_distortions():
-    """인지왜곡 유형 추출 및 피드백 생성 (GPT + 로컬 모델 병행)"""
+# 인지왜곡 추출 정책 (EXTRACTION_POLICY)
+# gpt      : GPT만 실행 (GPT 실패 시 로컬 대체 없음)
+# parallel : GPT와 로컬 모델을 동시에 실행해 먼저 나온 사용 가능한 결과 사용
+#            (로컬 결과는 신뢰도 기준을 넘을 때만, GPT가 실패하면 기준 미달 로컬 결과라도 사용)
+# fallback : GPT만 실행하고 실패/타임아웃 시에만 로컬 모델 실행 (기본값, 기존 동작)
+# shadow   : GPT 결과를 바로 사용하고 로컬 모델은 백그라운드에서 실행해 일치도만 기록
+EXTRACTION_POLICIES = ('gpt', 'parallel', 'fallback', 'shadow')
+
+
+def get_extraction_policy():
+    """인지왜곡 추출 정책"""
+    policy = get_setting("EXTRACTION_POLICY", "fallback")
+    if policy not in EXTRACTION_POLICIES:
+        print(f"⚠️ 알 수 없는 추출 정책: {policy} (fallback 사용)")
+        return 'fallback'
+    return policy
+
+
+def passes_local_confidence(local_result):
+    """로컬 결과 신뢰도 기준 - 표시할 상위 3개 유형이 모두 LOCAL_EXTRACTION_CONFIDENCE 이상"""
+    top = sorted(local_result.values(), reverse=True)[:3]
+    return len(top) == 3 and top[-1] >= get_setting("LOCAL_EXTRACTION_CONFIDENCE", 0.5, float)
+
+
+def run_parallel_extraction(run_gpt, run_local):
+    """
+    GPT와 로컬 추출을 추출 전용 풀에서 동시에 실행하고 먼저 나온 사용 가능한 결과 사용
+    
+    호출한 쪽이 공유 풀 작업(지연 평가)이어도 다른 풀의 Future만 기다리므로 풀이 막히지 않습니다.
+    진 쪽은 취소하거나(시작 전) 결과를 무시합니다.
+    
+    Returns:
+        (gpt_success, gpt_result, local_success, local_result)
+    """
+    futures = {
+        background.submit_to('extraction', run_with_evaluation_logs, run_gpt): 'gpt',
+        background.submit_to('extraction', run_with_evaluation_logs, run_local): 'local'
+    }
+    deadline = time.monotonic() + get_deadline('distortion_extractor')
+    results = {'gpt': (False, None), 'local': (False, None)}
+    pending = set(futures)
+    winner = None
+    
+    while pending and winner is None:
+        done, pending = wait_futures(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            print("[병렬 추출] 시간 초과")
+            break
+        
+        # 같은 시점에 끝났으면 GPT 우선
+        for future in sorted(done, key=lambda f: futures[f] != 'gpt'):
+            source = futures[future]
+            try:
+                results[source], entries = future.result()
+            except Exception as e:
+                print(f"[병렬 추출] {source} 오류: {e}")
+                continue
+            store_evaluation_logs(entries)
+            success, result = results[source]
+            if success and (source == 'gpt' or passes_local_confidence(result)):
+                winner = source
+                break
+    
+    for future in pending:
+        future.cancel()
+    
+    if winner is not None:
+        perf_metrics.increment(f"extraction.parallel.winner.{winner}")
+    if winner == 'local':
+        # 로컬 결과 채택 - 아직 끝나지 않은 GPT 결과는 사용하지 않음
+        return False, None, True, results['local'][1]
+    return results['gpt'] + results['local']
+
+
+def _normalize_distortion_type(name):
+    return (name or "").replace(" ", "")
+
+
+def record_shadow_agreement(gpt_result, local_result):
+    """GPT 추출 결과와 로컬 모델 상위 3개의 일치도 기록 (shadow 정책)"""
+    gpt_types = {_normalize_distortion_type(d.get('type')) for d in gpt_result.get('distortions', [])}
+    local_top = [
+        _normalize_distortion_type(label)
+        for label, _ in sorted(local_result.items(), key=lambda x: x[1], reverse=True)[:3]
+    ]
+    
+    overlap = len(gpt_types & set(local_top)) / max(1, len(gpt_types))
+    top1_match = bool(local_top) and local_top[0] in gpt_types
+    
+    perf_metrics.increment("extraction.shadow.runs")
+    perf_metrics.observe("extraction.shadow.overlap", overlap)
+    if top1_match:
+        perf_metrics.increment("extraction.shadow.top1_match")
+    
+    print(f"[섀도 비교] GPT {sorted(gpt_types)} / 로컬 상위 3개 {local_top} → 일치율 {overlap:.0%}")
+    add_evaluation_log('distortion_extraction_shadow', {
+        'gpt_types': sorted(gpt_types),
+        'local_top3': local_top,
+        'overlap': overlap,
+        'top1_match': top1_match
+    })
+
+
+def _run_shadow_extraction(run_local, gpt_result):
+    """백그라운드 로컬 추출 + 일치도 기록"""
+    local_success, local_result = run_local()
+    if local_success:
+        record_shadow_agreement(gpt_result, local_result)
+
+
+def extract_cognitive_distortions(messages=None):
+    """인지왜곡 유형 추출 및 피드백 생성 (GPT + 로컬 모델, EXTRACTION_POLICY에 따라 실행)"""
+    if messages is None:
+        messages = st.session_state.messages
+    
     try:
         # Stage 2 (analysis) 대화만 필터링
-        analysis_messages = [m for m in st.session_state.messages if m.get('stage') == 'analysis']
+        analysis_messages = [m for m in messages if m.get('stage') == 'analysis']
         
         # 대화 내역을 텍스트로 변환
         conversation_text = "Stage 2 대화 내용:\n\n"
@@ -685,20 +984,51 @@ def extract_cognitive_distortions():
             role = "청소년" if msg["role"] == "user" else "상담사"
             conversation_text += f"{role}: {msg['content']}\n"
         
-        # 1. GPT로 추출 (기존 방식)
-        gpt_success, gpt_result = extract_with_gpt(conversation_text)
+        # 턴별 누적 점수가 있으면 로컬 순위는 이미 준비된 상태
+        ranking = get_ranking() if is_incremental_scoring_enabled() else []
+        
+        if ranking:
+            # GPT: 사전 순위 힌트 + 청소년 발화만 전달해 프롬프트/출력 축소
+            user_text = "Stage 2 청소년 발화:\n\n" + "".join(
+                f"청소년: {msg['content']}\n" for msg in analysis_messages if msg["role"] == "user"
+            )
+            hint = build_extraction_hint(ranking)
+            run_gpt = lambda: extract_with_gpt(user_text, hint=hint)
+            # 로컬: 누적 확률 (전체 대화 재추론 없음)
+            local_probs = get_running_probs()
+            run_local = lambda: (True, local_probs)
+        else:
+            run_gpt = lambda: extract_with_gpt(conversation_text)
+            run_local = lambda: extract_with_local_model(conversation_text)
+        
+        policy = get_extraction_policy()
+        extraction_started = time.perf_counter()
+        local_success, local_result = False, None
         
-        # 2. 로컬 모델로 추출 (새로운 방식)
-        local_success, local_result = extract_with_local_model(conversation_text)
+        if policy == 'parallel':
+            # 동시에 실행 - 먼저 나온 사용 가능한 결과 사용
+            gpt_success, gpt_result, local_success, local_result = run_parallel_extraction(run_gpt, run_local)
+        else:
+            gpt_success, gpt_result = run_gpt()
+            if not gpt_success and policy != 'gpt':
+                # fallback / shadow: GPT 실패 또는 타임아웃 시에만 로컬 모델 실행
+                local_success, local_result = run_local()
+            elif policy == 'shadow':
+                # 일치도 로그는 작업이 끝난 뒤 스크립트 스레드에서 반영
+                store_evaluation_logs([
+                    background.submit(run_with_evaluation_logs, _run_shadow_extraction, run_local, gpt_result)
+                ])
+        
+        perf_metrics.observe(f"extraction.total.{policy}", time.perf_counter() - extraction_started)
         
         # 결과 로그
         if gpt_success:
-            print(f"\n[GPT 추출 결과]")
+            print(f"\n[GPT 추출 결과] ({policy})")
             for dist in gpt_result.get('distortions', []):
-                print(f"  - {dist['type']}")
+                print(f"  - {dist.get('type')}")
         
         if local_success:
-            print(f"\n[로컬 모델 추출 결과]")
+            print(f"\n[로컬 모델 추출 결과] ({policy})")
             for dist_type, prob in local_result.items():
                 print(f"  - {dist_type}: {prob:.3f}")
         
@@ -707,7 +1037,9 @@ def extract_cognitive_distortions():
             return True, gpt_result
         elif local_success:
             # GPT 실패 시 로컬 모델 결과를 GPT 형식으로 변환
-            converted_result = convert_local_to_gpt_format(local_result)
+            perf_metrics.increment("extraction.local_fallback")
+            evidence = {item['type']: item['evidence'] for item in ranking}
+            converted_result = convert_local_to_gpt_format(local_result, evidence)
             return True, converted_result
         else:
             return False, None
@@ -717,43 +1049,38 @@ def extract_cognitive_distortions():
         return False, None
 
 
-def extract_with_gpt(conversation_text):
-    """GPT를 사용한 인지왜곡 추출"""
+def extract_with_gpt(conversation_text, hint=None):
+    """
+    GPT를 사용한 인지왜곡 추출
+    
+    Args:
+        conversation_text: 대화 텍스트
+        hint: 로컬 분류기 사전 순위 힌트 (있으면 출력 토큰 한도를 줄임)
+    """
     try:
-        # API 키
-        api_key = get_api_key()
-        client = OpenAI(api_key=api_key)
-        
         # 추출 에이전트 프롬프트
         extractor_prompt = get_system_prompt_distortion_extractor()
         
+        user_content = conversation_text
+        request = {}
+        if hint:
+            user_content = f"{conversation_text}\n\n{hint}"
+            request['max_tokens'] = get_setting("HINTED_EXTRACTION_MAX_TOKENS", 900, int)
+        
         # 추출 요청
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        result = complete_json(
+            'distortion_extractor',
             messages=[
                 {"role": "system", "content": extractor_prompt},
-                {"role": "user", "content": conversation_text}
+                {"role": "user", "content": user_content}
             ],
-            temperature=0.5,
-            max_tokens=1500
+            **request
         )
         
-        # 응답 파싱
-        result_text = response.choices[0].message.content.strip()
-        
-        # JSON 파싱
-        import json
-        # JSON 코드 블록 제거
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(result_text)
-        
         # 추출 로그 저장
         add_evaluation_log('distortion_extraction', {
             'method': 'GPT',
+            'hinted': bool(hint),
             'distortions': [
                 {
                     'type': d.get('type'),
@@ -771,61 +1098,9 @@ def extract_with_gpt(conversation_text):
 
 
 def extract_with_local_model(conversation_text):
-    """로컬 파인튜닝 모델을 사용한 인지왜곡 추출"""
+    """로컬 파인튜닝 모델을 사용한 인지왜곡 추출 (공유 모델로 추론만 수행)"""
     try:
-        import torch
-        from transformers import AutoTokenizer, AutoModelForSequenceClassification
-        
-        # 모델 경로
-        MODEL_PATH = r"C:\Users\kma80\Desktop\python_workspace\LLM\중견연구3\baseline_roberta_large_20250817_052327"
-        
-        # 10가지 인지왜곡 레이블
-        DISTORTION_LABELS = [
-            "흑백 사고",
-            "과잉 일반화",
-            "부정적 편향",
-            "긍정 축소화",
-            "성급한 판단",
-            "확대와 축소",
-            "감정적 추론",
-            "해야 한다 진술",
-            "낙인찍기",
-            "개인화"
-        ]
-        
-        print(f"\n[로컬 모델 로딩 시작...]")
-        
-        # 토크나이저와 모델 로드
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-        model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH)
-        
-        # GPU 사용 가능하면 GPU로
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
-        model.eval()
-        
-        print(f"[로컬 모델 로드 완료] Device: {device}")
-        
-        # 대화 텍스트를 토큰화
-        inputs = tokenizer(
-            conversation_text,
-            max_length=512,
-            truncation=True,
-            padding=True,
-            return_tensors="pt"
-        )
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        
-        # 추론
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probs = torch.sigmoid(logits)[0]  # Multi-label classification
-        
-        # 확률을 딕셔너리로 변환
-        distortion_probs = {}
-        for i, label in enumerate(DISTORTION_LABELS):
-            distortion_probs[label] = float(probs[i].cpu().numpy())
+        distortion_probs = distortion_classifier.predict(conversation_text)
         
         # 확률 높은 순으로 정렬
         sorted_distortions = sorted(
@@ -847,8 +1122,9 @@ def extract_with_local_model(conversation_text):
         return False, None
 
 
-def convert_local_to_gpt_format(local_result):
-    """로컬 모델 결과를 GPT 형식으로 변환"""
+def convert_local_to_gpt_format(local_result, evidence=None):
+    """로컬 모델 결과를 GPT 형식으로 변환 (evidence: 유형별 근거 문장, 있으면 포함)"""
+    evidence = evidence or {}
     # 확률 높은 순으로 정렬하여 상위 3개 선택
     sorted_distortions = sorted(
         local_result.items(),
@@ -862,7 +1138,7 @@ def convert_local_to_gpt_format(local_result):
         distortions.append({
             "type": dist_type,
             "type_english": get_english_name(dist_type),
-            "evidence": [],
+            "evidence": evidence.get(dist_type, []),
             "explanation": f"'{dist_type}' 패턴이 보여. (확률: {prob:.1%})",
             "pattern": "이런 생각이 반복되는 것 같아."
         })
@@ -892,10 +1168,6 @@ def get_english_name(korean_name):
 def select_restructuring_method():
     """재구조화 방법 선택 (평가 에이전트)"""
     try:
-        # API 키
-        api_key = get_api_key()
-        client = OpenAI(api_key=api_key)
-        
         # 선택된 왜곡 정보
         selected_distortion = st.session_state.get('selected_distortion', {})
         
@@ -926,28 +1198,14 @@ Stage 2 대화:
         evaluator_prompt = get_system_prompt_method_evaluator()
         
         # 평가 요청
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        result = complete_json(
+            'method_selector',
             messages=[
                 {"role": "system", "content": evaluator_prompt},
                 {"role": "user", "content": input_text}
-            ],
-            temperature=0.5,
-            max_tokens=800
+            ]
         )
         
-        # 응답 파싱
-        result_text = response.choices[0].message.content.strip()
-        
-        # JSON 파싱
-        import json
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(result_text)
-        
         # 방법 선택 로그 저장
         add_evaluation_log('restructuring_method_selection', {
             'selected_method': result.get('selected_method'),
@@ -966,8 +1224,7 @@ Stage 2 대화:
 def get_system_prompt_method_evaluator():
     """재구조화 방법 평가 에이전트 프롬프트 로드"""
     try:
-        with open('prompt8.txt', 'r', encoding='utf-8') as f:
-            return f.read()
+        return prompt_registry.get_text('prompt8.txt')
     except FileNotFoundError:
         # 기본 프롬프트
         return """당신은 청소년에게 가장 효과적인 인지 재구조화 방법을 선택하는 전문 평가자입니다.
@@ -976,13 +1233,6 @@ def get_system_prompt_method_evaluator():
 
 def get_system_prompt_restructuring(user_info):
     """재구조화 단계 시스템 프롬프트 생성"""
-    try:
-        with open('prompt7.txt', 'r', encoding='utf-8') as f:
-            base_prompt = f.read()
-    except FileNotFoundError:
-        base_prompt = """당신은 청소년의 인지왜곡을 재구조화하는 전문 상담사입니다.
-감정 타당화, 콜롬보식 접근, 논리적 반문을 사용하세요."""
-    
     # 선택된 재구조화 방법 정보
     method_data = st.session_state.get('restructuring_method', {})
     selected_method = method_data.get('selected_method', '대안적 설명 찾기')
@@ -996,26 +1246,19 @@ def get_system_prompt_restructuring(user_info):
     analysis_data = st.session_state.get('analysis_data', {})
     situation_summary = str(analysis_data)
     
-    # 프롬프트에 정보 삽입
-    base_prompt = base_prompt.replace('{restructuring_method}', selected_method)
-    base_prompt = base_prompt.replace('{selected_distortion_type}', distortion_type)
-    base_prompt = base_prompt.replace('{situation_summary}', situation_summary)
-    
-    # 페르소나 프롬프트 추가
-    persona_prompt = get_persona_prompt()
-    
-    return base_prompt + persona_prompt
+    # 페르소나별로 조합해 둔 prompt7 템플릿에 정보 삽입
+    return get_composed_prompt('restructuring').render(
+        restructuring_method=selected_method,
+        selected_distortion_type=distortion_type,
+        situation_summary=situation_summary
+    )
 
 
 def generate_restructuring_response(user_message, user_info):
     """재구조화 단계 응답 생성"""
     try:
-        # API 키
-        api_key = get_api_key()
-        client = OpenAI(api_key=api_key)
-        
         # 재구조화 시스템 프롬프트
-        system_prompt = get_system_prompt_restructuring(user_info)
+        system_prompt = prompt_registry.assemble('restructuring', get_system_prompt_restructuring, user_info)
         
         # 대화 히스토리 (Stage 3만)
         restructuring_messages = [m for m in st.session_state.messages if m.get('stage') == 'restructuring']
@@ -1033,23 +1276,37 @@ def generate_restructuring_response(user_message, user_info):
             "content": user_message
         })
         
-        # GPT 응답 생성
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        # GPT 응답 생성 (스트리밍 모드면 말풍선에 바로 표시)
+        response = complete_reply('restructuring_reply', {
+            'messages': [
                 {"role": "system", "content": system_prompt}
-            ] + conversation_history,
-            temperature=0.7,
-            max_tokens=500
-        )
+            ] + conversation_history
+        })
         
-        return response.choices[0].message.content.strip()
+        return response.strip()
         
+    except SafetyEscalation:
+        raise
     except Exception as e:
         print(f"[재구조화 응답 생성 실패] {str(e)}")
         return "그 생각에 대해 좀 더 알려줄래?"
 
 
+# 왜곡별 쉬운 설명 (청소년이 왜곡을 선택하면 함께 안내)
+DISTORTION_SIMPLE_EXPLANATIONS = {
+    "흑백 사고": "\"완벽 아니면 실패\"처럼 극단적으로만 생각하는 거야. 중간이 없고, 조금만 잘못돼도 전부 망한 것처럼 느껴지는 패턴이야.",
+    "과잉 일반화": "한 번 일어난 일을 \"맨날 그래\" \"항상 그래\"로 확대하는 거야. 한 번 실수하면 앞으로도 계속 그럴 거라고 생각하는 패턴이야.",
+    "부정적 편향": "잘한 건 안 보이고 나쁜 것만 크게 보이는 거야. 칭찬받아도 실수 하나만 계속 떠오르는 패턴이야.",
+    "긍정 축소화": "내가 잘한 건 \"별거 아니야\" \"그냥 운\"이라고 작게 보는 거야. 자기 성취를 인정하지 못하는 패턴이야.",
+    "성급한 판단": "확실한 증거 없이 \"분명 그럴 거야\"라고 단정하는 거야. 상대방 표정만 보고 날 싫어한다고 결론 내리는 패턴이야.",
+    "확대와 축소": "작은 실수를 \"인생 끝\" \"완전 망함\"처럼 크게 만드는 거야. 시험 하나 못 봤는데 인생 망한 것처럼 느껴지는 패턴이야.",
+    "감정적 추론": "\"기분이 그러니까 진짜 그런 거야\"처럼 느낌을 사실로 받아들이는 거야. 불안하면 나쁜 일이 정말 일어날 거라고 믿는 패턴이야.",
+    "해야 한다 진술": "\"무조건 ~해야 해\" \"절대 ~하면 안 돼\"처럼 자신을 너무 엄격하게 다그치는 거야. 못 지키면 자책하는 패턴이야.",
+    "낙인찍기": "한두 번 실수하고 \"나는 바보야\" \"나는 실패자야\"처럼 자신에게 딱지 붙이는 거야. 행동이 아니라 자기 자체를 부정적으로 규정하는 패턴이야.",
+    "개인화": "내 잘못이 아닌 일도 \"다 내 탓이야\"라고 자책하는 거야. 다른 요인들은 안 보이고 모든 책임을 자기한테 돌리는 패턴이야."
+}
+
+
 def parse_distortion_selection(user_message):
     """사용자의 왜곡 선택 파싱 (1, 2, 3)"""
     message = user_message.strip().lower()
@@ -1079,7 +1336,7 @@ def format_distortion_feedback(distortion_data):
     # 3가지 왜곡을 증거와 함께 설명
     for i, dist in enumerate(distortion_data['distortions'], 1):
         # 번호와 설명
-        feedback += f"**{i}. {dist['explanation']}**\n"
+        feedback += f"**{i}. {dist.get('explanation') or dist.get('type', '')}**\n"
         
         # 증거 추가 (있으면)
         if dist.get('evidence') and len(dist['evidence']) > 0:
@@ -1139,93 +1396,834 @@ def format_analysis_result(analysis_data):
         return "네 이야기를 잘 들었어."
 
 
-def process_user_input(user_message, user_info):
-    """사용자 입력 처리 및 응답 생성 - 안전 모니터링 통합"""
+# ========== 안전 평가 병행 실행 ==========
+
+# 병행 모드에서 되돌릴 턴 상태 (위험도 4 이상이면 추측 실행 결과 폐기)
+TURN_STATE_KEYS = [
+    'messages',
+    'current_stage',
+    'analysis_data',
+    'distortion_data',
+    'distortion_extracted',
+    'awaiting_distortion_selection',
+    'selected_distortion',
+    'awaiting_restructuring_start',
+    'restructuring_method',
+    'evaluation_logs',
+    'quick_replies',
+    'distortion_scores'
+]
+
+# 진행 중인 백그라운드 작업 (턴 상태와 함께 되돌리되 Future는 복사하지 않음)
+PENDING_STATE_KEYS = [
+    'pending_quick_replies',
+    'pending_stage_evaluation',
+    'pending_distortion_scores',
+    'pending_evaluation_logs'
+]
+
+# 세션 스크립트 스레드별 현재 턴 정보 (안전 게이트)
+_turn_context = threading.local()
+
+
+class SafetyEscalation(Exception):
+    """병행 모드에서 위험도 4 이상 판정 시 응답 공개를 중단하기 위한 예외"""
+
+
+class SafetyGate:
+    """안전 평가 결과가 나올 때까지 응답 공개를 막는 게이트"""
+    
+    def __init__(self, future, budget=None, fallback=None):
+        """
+        Args:
+            future: LLM 안전 평가 Future
+            budget: 결과를 기다릴 최대 시간 (초, None이면 무제한)
+            fallback: 시간 초과/오류 시 판정 함수 (인자: 'timeout' 또는 'error')
+        """
+        self.future = future
+        self.deadline = time.monotonic() + budget if budget else None
+        self.fallback = fallback
+        self._assessment = None
+    
+    def ready(self):
+        """평가 완료 또는 데드라인 경과 여부 (대기하지 않음)"""
+        if self.future.done():
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def wait(self):
+        """평가 결과 대기 (데드라인 초과·오류 시 로컬 판정)"""
+        if self._assessment is None:
+            timeout = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+            try:
+                assessment = self.future.result(timeout=timeout)
+                llm_status = 'error' if assessment.get('error') else None
+            except FutureTimeoutError:
+                assessment, llm_status = None, 'timeout'
+            except Exception as e:
+                print(f"⚠️ 안전 평가 오류: {e}")
+                assessment, llm_status = None, 'error'
+            
+            if llm_status is None:
+                self._assessment = assessment
+            elif self.fallback is not None:
+                self._assessment = self.fallback(llm_status)
+            else:
+                self._assessment = assessment or {"risk_level": 1}
+        return self._assessment
     
-    # ========== 안전 에이전트 평가 ==========
-    # 응급 모드 체크
-    if st.session_state.get('emergency_mode', False):
-        if SAFETY_AGENT_AVAILABLE:
-            display_emergency_screen()
-        return
+    def escalated(self):
+        """위험도 5(응급) 여부 (평가 완료까지 대기)"""
+        return self.wait().get('risk_level', 1) >= 5
     
-    # 현재 단계 확인
-    current_stage = st.session_state.get('current_stage', 'collection')
+    def check(self):
+        """평가가 끝났고 위험도 5면 즉시 중단 (대기하지 않음)"""
+        if self.ready() and self.escalated():
+            raise SafetyEscalation()
     
-    # 안전 평가 (매번 실행!)
-    risk_level = 1
-    safety_assessment = None
+    def release(self):
+        """평가 결과를 기다린 뒤 위험도 5면 중단"""
+        if self.escalated():
+            raise SafetyEscalation()
+
+
+def is_concurrent_safety_enabled():
+    """안전 평가 병행 모드 여부 (CONCURRENT_SAFETY 설정)"""
+    return get_setting("CONCURRENT_SAFETY", False, bool)
+
+
+def get_active_safety_gate():
+    """현재 턴의 안전 게이트 (병행 모드가 아니면 None)"""
+    return getattr(_turn_context, 'safety_gate', None)
+
+
+def snapshot_turn_state():
+    """
+    추측 실행 전 턴 상태 저장
     
-    # 디버깅: 안전 에이전트 상태 확인
-    print(f"\n{'='*60}")
-    print(f"[안전 에이전트 체크]")
-    print(f"SAFETY_AGENT_AVAILABLE: {SAFETY_AGENT_AVAILABLE}")
-    print(f"safety_agent in session: {'safety_agent' in st.session_state}")
-    if 'safety_agent' in st.session_state:
-        print(f"safety_agent is None: {st.session_state.safety_agent is None}")
-    print(f"사용자 메시지: {user_message[:50]}...")
-    print(f"{'='*60}\n")
+    백그라운드 작업은 session_state에 쓰지 않고 결과를 돌려주므로(run_with_evaluation_logs)
+    스냅샷과 복원은 스크립트 스레드의 변경만 다룹니다.
+    """
+    snapshot = {
+        key: copy.deepcopy(st.session_state[key])
+        for key in TURN_STATE_KEYS
+        if key in st.session_state
+    }
+    # Future는 복사할 수 없으므로 참조만 보관 (이전 턴에 시작된 작업)
+    for key in PENDING_STATE_KEYS:
+        snapshot[key] = copy.copy(st.session_state.get(key))
+    return snapshot
+
+
+def restore_turn_state(snapshot):
+    """추측 실행 결과를 버리고 턴 시작 시점 상태로 복원"""
+    for key in TURN_STATE_KEYS:
+        if key in snapshot:
+            st.session_state[key] = snapshot[key]
+        elif key in st.session_state:
+            del st.session_state[key]
     
-    if SAFETY_AGENT_AVAILABLE and st.session_state.get('safety_agent'):
-        try:
-            # 메시지 추가 전에 평가
-            temp_messages = st.session_state.messages + [{
-                "role": "user",
-                "content": user_message
-            }]
-            
-            safety_assessment = st.session_state.safety_agent.analyze_risk(
-                user_message=user_message,
-                conversation_history=temp_messages
-            )
-            risk_level = safety_assessment.get('risk_level', 1)
-            
-            print(f"\n🛡️ [안전 평가 완료]")
-            print(f"Risk Level: {risk_level}")
-            print(f"Category: {safety_assessment.get('risk_category', 'NONE')}")
-            print(f"Keywords: {safety_assessment.get('detected_keywords', [])}")
-            print(f"{'='*60}\n")
-            
-            # Level 5: 긴급 - 즉시 중단
-            if risk_level >= 5:
-                add_user_message(user_message)
-                st.session_state.messages[-1]['stage'] = current_stage
-                
-                display_safety_alert(safety_assessment)
-                st.session_state.emergency_mode = True
-                
-                emergency_msg = st.session_state.safety_agent.get_intervention_message(safety_assessment)
-                add_assistant_message(emergency_msg)
-                st.session_state.messages[-1]['stage'] = current_stage
-                st.session_state.messages[-1]['risk_level'] = risk_level
-                
-                log_safety_assessment(safety_assessment)
-                return emergency_msg
-            
-            # Level 4: 높은 위험 - 경고 후 계속
-            elif risk_level == 4:
-                add_user_message(user_message)
-                st.session_state.messages[-1]['stage'] = current_stage
-                
-                display_safety_alert(safety_assessment)
-                
-                warning_msg = st.session_state.safety_agent.get_intervention_message(safety_assessment)
-                add_assistant_message(warning_msg)
-                st.session_state.messages[-1]['stage'] = current_stage
-                st.session_state.messages[-1]['risk_level'] = risk_level
-                
-                log_safety_assessment(safety_assessment)
-                # 기존 응답도 계속 생성 (아래에서)
-                
-        except Exception as e:
-            print(f"⚠️ 안전 평가 오류: {e}")
-            risk_level = 1
+    # 추측 실행 중 시작된 백그라운드 작업은 폐기하고 이전 턴에 시작된 작업은 유지
+    for key in PENDING_STATE_KEYS:
+        st.session_state[key] = snapshot[key]
+
+
+def run_crisis_keyword_check(user_message):
+    """
+    위기 키워드 즉시 검사 (모든 메시지, API 호출 전)
     
-    # 사용자 메시지 추가 (Level 4, 5가 아닌 경우만)
+    Level 5 키워드면 LLM 안전 평가를 기다리지 않고 바로 경고를 표시합니다.
+    개입 메시지와 응급 모드 전환은 기존처럼 LLM 안전 평가 결과를 따릅니다.
+    
+    Returns:
+        키워드 평가 결과 (키워드가 없으면 None)
+    """
+    started = time.perf_counter()
+    keyword_assessment = crisis_matcher.assess_keywords(user_message)
+    perf_metrics.observe("safety.keyword_check", time.perf_counter() - started)
+    
+    if keyword_assessment is None:
+        return None
+    
+    risk_level = keyword_assessment['risk_level']
+    perf_metrics.increment(f"safety.keyword_hits.level{risk_level}")
+    print(f"[위기 키워드] Level {risk_level} - {keyword_assessment['detected_keywords']}")
+    
+    if risk_level >= 5 and SAFETY_AGENT_AVAILABLE:
+        show_safety_alert(keyword_assessment)
+    
+    return keyword_assessment
+
+
+def show_safety_alert(assessment):
+    """안전 경고 표시 (위기 키워드로 이미 표시한 턴이면 LLM 평가 결과로 다시 표시하지 않음)"""
+    if assessment.get('risk_level', 1) < 5:
+        display_safety_alert(assessment)
+        return
+    
+    if st.session_state.get('safety_alert_shown'):
+        return
+    st.session_state.safety_alert_shown = True
+    display_safety_alert(assessment)
+
+
+def screen_safety(safety_agent, user_message):
+    """
+    안전 평가 단계별 선별 (SAFETY_SCREENING)
+    
+    명백히 안전한 메시지는 LLM 평가 없이 Level 1로 위험도 이력에 남깁니다.
+    
+    Returns:
+        선별 결과 (route가 'cleared'면 LLM 안전 평가 생략)
+    """
+    screening = safety_screening.screen(user_message, safety_agent.risk_history)
+    print(f"[안전 선별] {screening['route']} ({screening['reason']}, 점수 {screening['score']})")
+    
+    if screening['route'] == 'cleared':
+        safety_agent.record_risk(safety_screening.cleared_assessment(screening))
+        safety_screening.record(user_message, screening)
+    
+    return screening
+
+
+def get_safety_verdict_budget():
+    """안전 평가 결과를 기다릴 최대 시간 (SAFETY_VERDICT_BUDGET 설정, 초)"""
+    return get_setting("SAFETY_VERDICT_BUDGET", 3.0, float)
+
+
+def start_safety_assessment(safety_agent, user_message, user_info, screening=None):
+    """
+    LLM 안전 평가를 백그라운드에서 시작
+    
+    SAFETY_VERDICT_BUDGET 안에 결과가 없거나 오류면 로컬 신호(위기 키워드, 위험도 이력,
+    하루 점수)로 판정하고, 늦게 도착한 LLM 결과는 collect_safety_reconciliation에서 대조합니다.
+    로컬 판정은 최대 Level 4라 응급 모드 전환(세션 종료)은 항상 LLM 판정으로만 일어납니다.
+    
+    Returns:
+        SafetyGate
+    """
+    # 메시지 추가 전에 평가
+    temp_messages = st.session_state.messages + [{
+        "role": "user",
+        "content": user_message
+    }]
+    
+    # 안전 평가 전용 풀 (공유 풀의 빠른 답변·지연 평가 작업 뒤에 줄 서지 않음)
+    future = background.submit_to(
+        'safety',
+        timed_analyze_risk,
+        safety_agent,
+        user_message,
+        temp_messages,
+        screening
+    )
+    
+    def fallback(llm_status):
+        verdict = safety_fallback.local_verdict(user_message, safety_agent.risk_history, user_info, llm_status)
+        perf_metrics.increment(f"safety.verdict.fallback.{llm_status}")
+        print(f"[안전 평가 {llm_status}] 로컬 판정 Level {verdict['risk_level']} - {verdict['risk_factors']}")
+        
+        if llm_status == 'timeout':
+            # 늦게 성공하면 analyze_risk가 이력에 추가하므로 여기서는 대조만 예약
+            register_safety_reconciliation(future, user_message, verdict)
+        else:
+            safety_agent.record_risk(verdict)
+        return verdict
+    
+    return SafetyGate(future, get_safety_verdict_budget(), fallback)
+
+
+def register_safety_reconciliation(future, user_message, verdict):
+    """데드라인을 넘긴 LLM 안전 평가를 나중에 로컬 판정과 대조하도록 등록"""
+    pending = st.session_state.get('pending_safety_reconciliation') or []
+    pending.append({
+        'future': future,
+        'message': user_message,
+        'local_level': verdict['risk_level'],
+        'stage': st.session_state.get('current_stage', 'collection'),
+        'started': time.monotonic()
+    })
+    st.session_state.pending_safety_reconciliation = pending
+
+
+def has_pending_safety_reconciliation():
+    """대조를 기다리는 늦은 안전 평가가 있는지 여부"""
+    return bool(st.session_state.get('pending_safety_reconciliation'))
+
+
+def collect_safety_reconciliation():
+    """
+    늦게 도착한 LLM 안전 평가를 로컬 판정과 대조 (다음 턴 시작 시 / 폴링)
+    
+    LLM이 로컬 판정보다 높은 위험도를 판정했으면 늦게라도 기록하고, Level 5면 개입 메시지를
+    추가하고 응급 모드로 전환합니다. 로컬 판정이 더 높았던 경우는 되돌리지 않습니다.
+    
+    Returns:
+        bool: 화면에 반영할 변경(개입 메시지)이 있었는지 여부
+    """
+    pending = st.session_state.get('pending_safety_reconciliation') or []
+    if not pending:
+        return False
+    
+    remaining = []
+    changed = False
+    for item in pending:
+        if not item['future'].done():
+            remaining.append(item)
+            continue
+        
+        try:
+            assessment = item['future'].result()
+        except Exception as e:
+            assessment = {'error': str(e)}
+        if assessment.get('error'):
+            perf_metrics.increment("safety.reconcile.failed")
+            continue
+        
+        perf_metrics.observe("safety.reconcile.delay", time.monotonic() - item['started'])
+        llm_level = assessment.get('risk_level', 1)
+        local_level = item['local_level']
+        
+        if llm_level < local_level:
+            perf_metrics.increment("safety.reconcile.local_higher")
+            continue
+        if llm_level == local_level:
+            perf_metrics.increment("safety.reconcile.agreed")
+            continue
+        
+        perf_metrics.increment("safety.reconcile.escalated")
+        print(f"[안전 평가 대조] 로컬 Level {local_level} → LLM Level {llm_level}: {item['message'][:50]}")
+        
+        if llm_level >= 4:
+            log_safety_assessment(assessment)
+        if llm_level >= 5:
+            add_assistant_message(st.session_state.safety_agent.get_intervention_message(assessment))
+            st.session_state.messages[-1]['stage'] = item['stage']
+            st.session_state.messages[-1]['risk_level'] = llm_level
+            st.session_state.emergency_mode = True
+            changed = True
+    
+    st.session_state.pending_safety_reconciliation = remaining
+    return changed
+
+
+def check_risk_escalation(safety_agent):
+    """
+    위험도 상승 패턴 확인 (이력 길이와 무관한 상수 시간)
+    
+    패턴이 처음 감지된 턴에만 경고 메시지를 추가하고 기록하며, 패턴이 풀리면 다시 알립니다.
+    """
+    detected, warning = safety_agent.check_escalation_pattern()
+    if not detected:
+        st.session_state.escalation_notified = False
+        return
+    if st.session_state.get('escalation_notified'):
+        return
+    
+    st.session_state.escalation_notified = True
+    perf_metrics.increment("safety.escalation_pattern")
+    print(f"[위험도 상승 패턴] {warning}")
+    
+    add_assistant_message(warning)
+    st.session_state.messages[-1]['stage'] = st.session_state.get('current_stage', 'collection')
+    st.session_state.messages[-1]['risk_level'] = 5
+    log_safety_assessment({
+        'risk_level': 5,
+        'risk_category': 'CRITICAL',
+        'risk_factors': [warning]
+    })
+
+
+def timed_analyze_risk(safety_agent, user_message, conversation_history, screening=None):
+    """안전 평가 실행 + 소요 시간 기록 (선별 결과가 있으면 LLM 판정과 함께 기록)"""
+    # 같은 맥락에서 반복된 저위험 메시지는 캐시된 판정 사용
+    cached = safety_cache.lookup(user_message, conversation_history, safety_agent.risk_history)
+    if cached is not None:
+        safety_agent.record_risk(cached)
+        return cached
+    
+    started = time.perf_counter()
+    try:
+        assessment = safety_agent.analyze_risk(
+            user_message=user_message,
+            conversation_history=conversation_history
+        )
+    finally:
+        perf_metrics.observe("safety.analyze_risk", time.perf_counter() - started)
+    
+    safety_cache.store(user_message, conversation_history, assessment)
+    if screening is not None:
+        safety_screening.record(user_message, screening, assessment)
+    return assessment
+
+
+def apply_safety_assessment(safety_assessment, user_message, current_stage):
+    """
+    안전 평가 결과 반영 (경고 표시, 개입 메시지, 로그)
+    
+    Returns:
+        (risk_level, 즉시 반환할 응답 또는 None)
+    """
+    risk_level = safety_assessment.get('risk_level', 1)
+    
+    print(f"\n🛡️ [안전 평가 완료]")
+    print(f"Risk Level: {risk_level}")
+    print(f"Category: {safety_assessment.get('risk_category', 'NONE')}")
+    print(f"Keywords: {safety_assessment.get('detected_keywords', [])}")
+    print(f"{'='*60}\n")
+    
+    # Level 5: 긴급 - 즉시 중단
+    if risk_level >= 5:
+        add_user_message(user_message)
+        st.session_state.messages[-1]['stage'] = current_stage
+        
+        show_safety_alert(safety_assessment)
+        st.session_state.emergency_mode = True
+        
+        emergency_msg = st.session_state.safety_agent.get_intervention_message(safety_assessment)
+        add_assistant_message(emergency_msg)
+        st.session_state.messages[-1]['stage'] = current_stage
+        st.session_state.messages[-1]['risk_level'] = risk_level
+        
+        log_safety_assessment(safety_assessment)
+        return risk_level, emergency_msg
+    
+    # Level 4: 높은 위험 - 경고 후 계속
+    elif risk_level == 4:
+        add_user_message(user_message)
+        st.session_state.messages[-1]['stage'] = current_stage
+        
+        if safety_assessment.get('show_crisis_resources'):
+            # LLM 확인 전 Level 5 위기 키워드: 상담 전화 안내만 (응급 모드 전환은 늦게 온 LLM 판정이 결정)
+            show_safety_alert({**safety_assessment, 'risk_level': 5})
+        else:
+            show_safety_alert(safety_assessment)
+        
+        warning_msg = st.session_state.safety_agent.get_intervention_message(safety_assessment)
+        add_assistant_message(warning_msg)
+        st.session_state.messages[-1]['stage'] = current_stage
+        st.session_state.messages[-1]['risk_level'] = risk_level
+        
+        log_safety_assessment(safety_assessment)
+        
+        # 반복된 Level 4 (이번 판정까지 반영된 이력 기준)
+        check_risk_escalation(st.session_state.safety_agent)
+        # 기존 응답도 계속 생성 (호출한 쪽에서)
+    
+    return risk_level, None
+
+
+def process_user_input_concurrent(user_message, user_info, current_stage, screening=None, reprompt=None):
+    """
+    안전 평가와 단계별 응답 생성을 동시에 실행
+    
+    응답은 안전 평가 결과가 나온 뒤에만 공개됩니다. 위험도 5면 추측 실행한 응답과
+    상태 변경을 모두 버리고 응급 안내만 남깁니다 (이미 나온 판정이면 응답을 요청하기 전에 중단).
+    위험도 4면 응답을 다시 만들지 않고 경고 메시지를 사용자 메시지와 응답 사이에 넣습니다.
+    """
+    # 메시지 추가 전에 평가 (순차 모드와 동일한 맥락)
+    gate = start_safety_assessment(st.session_state.safety_agent, user_message, user_info, screening)
+    snapshot = snapshot_turn_state()
+    
+    _turn_context.safety_gate = gate
+    response = None
+    user_index = len(st.session_state.messages)
+    try:
+        add_user_message(user_message)
+        st.session_state.messages[-1]['stage'] = current_stage
+        gate.check()
+        
+        response = run_stage_turn(user_message, user_info, current_stage, reprompt)
+        gate.release()
+        
+        if gate.wait().get('risk_level', 1) == 4:
+            insert_safety_warning(gate.wait(), user_message, current_stage, user_index)
+        return response
+    except SafetyEscalation:
+        pass
+    except Exception:
+        # 응답 생성 오류여도 안전 평가 결과는 반드시 확인
+        if not gate.escalated():
+            if gate.wait().get('risk_level', 1) == 4:
+                insert_safety_warning(gate.wait(), user_message, current_stage, user_index)
+            raise
+    finally:
+        _turn_context.safety_gate = None
+    
+    # 위험도 5: 추측 실행 결과 폐기 후 응급 안내
+    print("[병행 안전 평가] 위험도 5 - 생성된 응답 폐기")
+    perf_metrics.increment("safety.concurrent_replies_dropped")
+    restore_turn_state(snapshot)
+    
+    risk_level, early_response = apply_safety_assessment(gate.wait(), user_message, current_stage)
+    return early_response
+
+
+def insert_safety_warning(safety_assessment, user_message, current_stage, user_index):
+    """
+    병행 모드 Level 4: 이미 만든 응답은 유지하고 경고 메시지를 사용자 메시지 바로 뒤에 넣기
+    
+    순차 모드와 같은 순서(사용자 → 경고 → 응답)가 되도록 이번 턴 메시지를 잠시 떼어 두고
+    apply_safety_assessment로 사용자·경고 메시지를 추가한 뒤 다시 붙입니다.
+    """
+    turn_messages = st.session_state.messages[user_index + 1:]
+    del st.session_state.messages[user_index:]
+    
+    apply_safety_assessment(safety_assessment, user_message, current_stage)
+    st.session_state.messages.extend(turn_messages)
+    perf_metrics.increment("safety.concurrent_warnings_inserted")
+
+
+def process_user_input(user_message, user_info):
+    """사용자 입력 처리 및 응답 생성 - 안전 모니터링 통합"""
+    
+    # ========== 안전 에이전트 평가 ==========
+    # 응급 모드 체크
+    if st.session_state.get('emergency_mode', False):
+        if SAFETY_AGENT_AVAILABLE:
+            display_emergency_screen()
+        return
+    
+    # 위기 키워드 즉시 검사 (다른 대기·API 호출보다 먼저)
+    st.session_state.safety_alert_shown = False
+    run_crisis_keyword_check(user_message)
+    
+    # 지난 턴에 데드라인을 넘긴 안전 평가 결과 대조 (Level 5면 응급 모드)
+    collect_safety_reconciliation()
+    if st.session_state.get('emergency_mode', False):
+        if SAFETY_AGENT_AVAILABLE:
+            display_emergency_screen()
+        return
+    
+    # 위험도 상승 패턴 (지난 턴까지의 판정 - 늦게 도착한 판정 포함, 패턴이 풀렸으면 알림 초기화)
+    if SAFETY_AGENT_AVAILABLE and st.session_state.get('safety_agent'):
+        check_risk_escalation(st.session_state.safety_agent)
+    
+    # 지난 턴의 지연 평가가 끝났으면 반영 (사용자 턴에서는 기다리지 않음)
+    current_stage = st.session_state.get('current_stage', 'collection')
+    reprompt = take_unseen_stage_messages(current_stage)
+    collect_evaluation_logs()
+    if reprompt is None:
+        current_stage = st.session_state.get('current_stage', 'collection')
+    
+    # 새 턴 시작 (이전 턴의 백그라운드 결과는 폐기 대상)
+    st.session_state.turn_seq = st.session_state.get('turn_seq', 0) + 1
+    prompt_registry.reset_turn_timing()
+    
+    # 안전 평가 (매번 실행!)
+    risk_level = 1
+    safety_assessment = None
+    
+    # 디버깅: 안전 에이전트 상태 확인
+    print(f"\n{'='*60}")
+    print(f"[안전 에이전트 체크]")
+    print(f"SAFETY_AGENT_AVAILABLE: {SAFETY_AGENT_AVAILABLE}")
+    print(f"safety_agent in session: {'safety_agent' in st.session_state}")
+    if 'safety_agent' in st.session_state:
+        print(f"safety_agent is None: {st.session_state.safety_agent is None}")
+    print(f"사용자 메시지: {user_message[:50]}...")
+    print(f"{'='*60}\n")
+    
+    turn_started = time.perf_counter()
+    
+    # 단계별 선별: 명백히 안전한 메시지는 LLM 안전 평가 생략
+    safety_agent = st.session_state.get('safety_agent') if SAFETY_AGENT_AVAILABLE else None
+    screening = None
+    if safety_agent:
+        screening = screen_safety(safety_agent, user_message)
+        if screening['route'] == 'cleared':
+            safety_agent = None
+    
+    # 병행 모드: 안전 평가와 응답 생성을 동시에
+    if safety_agent and is_concurrent_safety_enabled():
+        response = process_user_input_concurrent(user_message, user_info, current_stage, screening, reprompt)
+        perf_metrics.observe("turn.total.concurrent", time.perf_counter() - turn_started)
+        return response
+    
+    if safety_agent:
+        try:
+            # 데드라인 안에 LLM 결과가 없으면 로컬 판정
+            safety_assessment = start_safety_assessment(safety_agent, user_message, user_info, screening).wait()
+            
+            risk_level, early_response = apply_safety_assessment(safety_assessment, user_message, current_stage)
+            if early_response is not None:
+                return early_response
+                
+        except Exception as e:
+            print(f"⚠️ 안전 평가 오류: {e}")
+            risk_level = 1
+    
+    # 사용자 메시지 추가 (Level 4, 5가 아닌 경우만)
     if risk_level < 4:
         add_user_message(user_message)
         st.session_state.messages[-1]['stage'] = current_stage
     
+    response = run_stage_turn(user_message, user_info, current_stage, reprompt)
+    perf_metrics.observe("turn.total.sequential", time.perf_counter() - turn_started)
+    return response
+
+
+# ========== 단계 완료 평가 ==========
+
+def is_deferred_evaluation_enabled():
+    """단계 완료 평가 지연 실행 여부 (DEFERRED_STAGE_EVALUATION 설정)"""
+    return get_setting("DEFERRED_STAGE_EVALUATION", False, bool)
+
+
+def evaluate_collection_stage(messages):
+    """Stage 1 완료 평가 + 완료 시 감정-논리-행동 추출"""
+    is_complete, eval_result = check_collection_complete_with_evaluator(messages)
+    
+    extraction = (False, None)
+    if is_complete:
+        extraction = extract_emotion_logic_behavior(messages)
+    
+    return {
+        'stage': 'collection',
+        'passed': is_complete,
+        'eval_result': eval_result,
+        'extraction': extraction
+    }
+
+
+def evaluate_analysis_stage(messages):
+    """Stage 2 추출 준비 평가 + 준비 시 인지왜곡 추출"""
+    is_ready, eval_result = check_distortion_extraction_ready(messages)
+    
+    extraction = (False, None)
+    if is_ready:
+        extraction = extract_cognitive_distortions(messages)
+    
+    return {
+        'stage': 'analysis',
+        'passed': is_ready,
+        'eval_result': eval_result,
+        'extraction': extraction
+    }
+
+
+def apply_collection_evaluation(evaluation):
+    """
+    Stage 1 평가 결과 반영 (완료 시 Stage 2로 전환)
+    
+    Returns:
+        전환 안내 메시지 (미완료면 None)
+    """
+    if not evaluation['passed']:
+        return None
+    
+    eval_result = evaluation['eval_result']
+    
+    # 선택지 초기화 (단계 전환 시)
+    clear_quick_replies()
+    
+    # 다음 단계로 전환
+    st.session_state.current_stage = 'analysis'
+    
+    # 평가 이유를 로그로 출력 (디버깅용)
+    if 'reason' in eval_result:
+        print(f"[평가 완료] {eval_result['reason']}")
+    
+    # 추출 에이전트 결과 (감정-논리-행동)
+    extract_success, analysis_data = evaluation['extraction']
+    
+    if extract_success and analysis_data:
+        # 추출 결과를 자연스러운 텍스트로 포맷팅
+        analysis_summary = format_analysis_result(analysis_data)
+        
+        # 전환 안내 메시지 생성 (마지막 질문 제거, 공감 + 정리 + 확인)
+        transition_msg = f"\n\n---\n\n네 이야기를 잘 들었어. 지금까지 말해준 내용을 정리해볼게.\n\n{analysis_summary}\n\n내가 이해한 게 맞아?"
+        
+        # 분석 데이터 저장 (추후 활용)
+        st.session_state.analysis_data = analysis_data
+        
+        print(f"[분석 완료] {analysis_summary}")
+    else:
+        # 추출 실패 시 기본 메시지
+        transition_msg = f"\n\n---\n\n네 이야기를 잘 들었어. 지금까지 말해준 내용을 정리해볼게."
+    
+    return transition_msg
+
+
+def apply_analysis_evaluation(evaluation):
+    """
+    Stage 2 평가 결과 반영 (준비 완료 시 인지왜곡 피드백 + 선택 대기)
+    
+    Returns:
+        피드백 + 선택 질문 메시지 (준비 안 됐거나 추출 실패면 None)
+    """
+    eval_result = evaluation['eval_result']
+    
+    # 평가 결과 상세 출력
+    print(f"\n[평가 결과]")
+    print(f"  - 상태: {eval_result.get('status')}")
+    print(f"  - 이유: {eval_result.get('reason', 'N/A')}")
+    print(f"  - 수집 영역: {eval_result.get('coverage', 'N/A')}")
+    
+    if 'collected_areas' in eval_result:
+        print(f"\n[영역별 수집 현황]")
+        for area, collected in eval_result['collected_areas'].items():
+            status = "✅" if collected else "❌"
+            print(f"  {status} {area}")
+    
+    if not evaluation['passed']:
+        print(f"\n[아직 준비 안 됨]")
+        if 'missing_info' in eval_result and eval_result['missing_info']:
+            print(f"  부족한 정보:")
+            for info in eval_result['missing_info']:
+                print(f"    - {info}")
+        
+        if 'next_questions' in eval_result and eval_result['next_questions']:
+            print(f"  추천 질문:")
+            for q in eval_result['next_questions'][:3]:
+                print(f"    - {q}")
+        
+        print(f"{'='*60}\n")
+        return None
+    
+    print(f"\n{'🎉'*20}")
+    print(f"[인지왜곡 추출 준비 완료!]")
+    print(f"{'🎉'*20}")
+    
+    # 인지왜곡 추출 에이전트 결과
+    extract_success, distortion_data = evaluation['extraction']
+    
+    if not (extract_success and distortion_data):
+        print(f"\n[⚠️ 인지왜곡 추출 실패]")
+        st.info("✅ 인지왜곡 분석을 위한 충분한 정보가 수집되었습니다.")
+        print(f"{'='*60}\n")
+        return None
+    
+    print(f"\n[인지왜곡 추출 성공!]")
+    print(f"  - 추출된 왜곡 개수: {len(distortion_data['distortions'])}개")
+    
+    for i, dist in enumerate(distortion_data['distortions'], 1):
+        print(f"\n  {i}. {dist.get('type')} ({dist.get('type_english')})")
+        print(f"     증거: {dist['evidence'][0][:50]}..." if dist.get('evidence') else "     증거: 없음")
+    
+    # 인지왜곡 피드백 생성
+    distortion_feedback = format_distortion_feedback(distortion_data)
+    
+    # 선택 질문 추가
+    choices = ", ".join(str(i) for i in range(1, len(distortion_data['distortions']) + 1))
+    selection_question = f"\n이 중에서 어떤 게 제일 너의 상황에 크게 다가오는 것 같아? {choices} 중에 골라봐."
+    
+    # ===== 선택지 초기화 (인지왜곡 피드백에는 선택지 불필요) =====
+    clear_quick_replies()
+    
+    # 인지왜곡 데이터 저장 (추후 활용)
+    st.session_state.distortion_data = distortion_data
+    st.session_state.distortion_extracted = True  # 추출 완료 플래그
+    st.session_state.awaiting_distortion_selection = True  # 선택 대기 중
+    
+    print(f"\n[피드백 전달 완료]")
+    print(f"[청소년 선택 대기 중...]")
+    print(f"{'='*60}\n")
+    
+    return distortion_feedback + selection_question
+
+
+def defer_stage_evaluation(stage, evaluate_fn):
+    """단계 완료 평가를 백그라운드로 시작 (현재까지의 대화 스냅샷 기준)"""
+    pending = st.session_state.get('pending_stage_evaluation')
+    if pending is not None and pending['stage'] == stage:
+        # 이전 평가가 아직 진행 중 - 끝나면 반영하고, 미완료면 다음 턴에 다시 평가
+        perf_metrics.increment("stage_evaluation.skipped_pending")
+        return
+    
+    st.session_state.pending_stage_evaluation = {
+        'turn': st.session_state.get('turn_seq', 0),
+        'stage': stage,
+        'future': background.submit(run_with_evaluation_logs, evaluate_fn, list(st.session_state.messages))
+    }
+
+
+def has_pending_stage_evaluation():
+    """백그라운드 단계 평가가 진행 중인지 여부"""
+    return st.session_state.get('pending_stage_evaluation') is not None
+
+
+def collect_stage_evaluation():
+    """
+    끝난 백그라운드 단계 평가 결과 반영 (기다리지 않음 - UI 폴링과 턴 시작 시 호출)
+    
+    전환/피드백 메시지는 이미 보여준 응답을 바꾸지 않고 새 assistant 메시지로 추가합니다.
+    
+    Returns:
+        bool: 대기 중이던 평가를 이번에 처리했는지 여부
+    """
+    pending = st.session_state.get('pending_stage_evaluation')
+    if pending is None or not pending['future'].done():
+        return False
+    
+    st.session_state.pending_stage_evaluation = None
+    
+    # 그 사이 단계가 바뀌었으면 결과 폐기
+    if pending['stage'] != st.session_state.get('current_stage', 'collection'):
+        perf_metrics.increment("stage_evaluation.dropped_stale")
+        return True
+    
+    try:
+        evaluation, entries = pending['future'].result()
+    except Exception as e:
+        print(f"⚠️ 지연 평가 오류: {str(e)}")
+        return True
+    store_evaluation_logs(entries)
+    
+    if pending['stage'] == 'collection':
+        message = apply_collection_evaluation(evaluation)
+        if message is not None:
+            add_assistant_message(message)
+    else:
+        message = apply_analysis_evaluation(evaluation)
+        if message is not None:
+            add_assistant_message(message)
+            st.session_state.messages[-1]['stage'] = 'analysis'
+    
+    perf_metrics.increment("stage_evaluation.deferred_applied")
+    return True
+
+
+def take_unseen_stage_messages(current_stage):
+    """
+    턴 시작 시 끝난 지연 평가 반영 (기다리지 않음)
+    
+    이때 추가된 전환/피드백 메시지는 사용자가 보기 전에 이번 입력을 보낸 것이므로
+    대화 기록에서 잠시 빼 두었다가 사용자 메시지 뒤에 다시 보여 줍니다 (run_stage_turn의 reprompt).
+    
+    Returns:
+        다시 보여 줄 메시지 목록 (없으면 None)
+    """
+    message_count = len(st.session_state.messages)
+    collect_stage_evaluation()
+    
+    unseen = st.session_state.messages[message_count:]
+    if not unseen:
+        return None
+    
+    del st.session_state.messages[message_count:]
+    print(f"[지연 평가] {current_stage} → {st.session_state.get('current_stage', 'collection')}: 이번 입력 대신 평가 메시지 다시 안내")
+    return unseen
+
+
+def reprompt_stage_messages(messages):
+    """지연 평가 메시지를 사용자 메시지 뒤에 다시 보여 주고 이번 입력은 답으로 쓰지 않음"""
+    perf_metrics.increment("stage_evaluation.reprompted")
+    clear_quick_replies()
+    st.session_state.messages.extend(messages)
+    return messages[-1]['content']
+
+
+def run_stage_turn(user_message, user_info, current_stage, reprompt=None):
+    """
+    현재 단계에 맞는 응답 생성 (사용자 메시지는 이미 추가된 상태)
+    
+    Args:
+        reprompt: 턴 시작 시 반영한 지연 평가 메시지 (있으면 단계 응답 대신 이 메시지로 다시 안내)
+    """
+    if reprompt:
+        return reprompt_stage_messages(reprompt)
+    
     if current_stage == 'collection':
         # Stage 1: 정보 수집 단계
         # GPT를 통해 챗봇 응답 생성
@@ -1236,11 +2234,7 @@ def process_user_input(user_message, user_info):
         
         # ===== 선택지 생성 =====
         if should_provide_options(response, current_stage):
-            options = generate_quick_replies(response, user_message, current_stage)
-            if options:
-                set_quick_replies(options)
-            else:
-                clear_quick_replies()
+            request_quick_replies(response, user_message, current_stage)
         else:
             clear_quick_replies()
         
@@ -1248,46 +2242,31 @@ def process_user_input(user_message, user_info):
         # 최소 5턴(사용자 5번 메시지) 이상일 때만 평가
         user_messages = [m for m in st.session_state.messages if m["role"] == "user"]
         if len(user_messages) >= 5:
-            is_complete, eval_result = check_collection_complete_with_evaluator()
-            
-            if is_complete:
-                # 선택지 초기화 (단계 전환 시)
-                clear_quick_replies()
-                
-                # 다음 단계로 전환
-                st.session_state.current_stage = 'analysis'
-                
-                # 평가 이유를 로그로 출력 (디버깅용)
-                if 'reason' in eval_result:
-                    print(f"[평가 완료] {eval_result['reason']}")
-                
-                # 추출 에이전트 호출하여 감정-논리-행동 추출
-                extract_success, analysis_data = extract_emotion_logic_behavior()
-                
-                if extract_success and analysis_data:
-                    # 추출 결과를 자연스러운 텍스트로 포맷팅
-                    analysis_summary = format_analysis_result(analysis_data)
-                    
-                    # 전환 안내 메시지 생성 (마지막 질문 제거, 공감 + 정리 + 확인)
-                    transition_msg = f"\n\n---\n\n네 이야기를 잘 들었어. 지금까지 말해준 내용을 정리해볼게.\n\n{analysis_summary}\n\n내가 이해한 게 맞아?"
-                    
-                    # 분석 데이터 저장 (추후 활용)
-                    st.session_state.analysis_data = analysis_data
-                    
-                    print(f"[분석 완료] {analysis_summary}")
-                else:
-                    # 추출 실패 시 기본 메시지
-                    transition_msg = f"\n\n---\n\n네 이야기를 잘 들었어. 지금까지 말해준 내용을 정리해볼게."
+            if is_deferred_evaluation_enabled():
+                # 응답을 먼저 보여주고 평가는 백그라운드에서 (UI 폴링 또는 다음 턴 시작 시 반영)
+                defer_stage_evaluation('collection', evaluate_collection_stage)
+            else:
+                evaluation = evaluate_collection_stage(list(st.session_state.messages))
+                transition_msg = apply_collection_evaluation(evaluation)
                 
-                # 마지막 assistant 메시지를 전환 메시지로 교체
-                st.session_state.messages[-1]["content"] = transition_msg
-                response = transition_msg
+                if transition_msg is not None:
+                    # 마지막 assistant 메시지를 전환 메시지로 교체
+                    st.session_state.messages[-1]["content"] = transition_msg
+                    response = transition_msg
         
         return response
     
     elif current_stage == 'analysis':
         # Stage 2: 인지왜곡 탐색 단계
         
+        # 턴별 점진적 인지왜곡 점수 (탐색 대화만, 유형 선택/전환 응답 제외)
+        if (is_incremental_scoring_enabled()
+                and not st.session_state.get('distortion_extracted', False)
+                and not st.session_state.get('awaiting_distortion_selection', False)
+                and not st.session_state.get('awaiting_restructuring_start', False)):
+            collect_scores()
+            request_scoring(user_message)
+        
         # 첫 번째 메시지인지 확인 (분석 정리 후 첫 응답)
         analysis_stage_messages = [m for m in st.session_state.messages if m.get('stage') == 'analysis']
         
@@ -1366,6 +2345,11 @@ def process_user_input(user_message, user_info):
                 # 사용자의 선택 처리
                 selection = parse_distortion_selection(user_message)
                 
+                # 보여준 유형 수보다 큰 번호는 잘못된 입력으로 처리
+                distortion_count = len((st.session_state.get('distortion_data') or {}).get('distortions', []))
+                if selection is not None and not 1 <= selection <= distortion_count:
+                    selection = None
+                
                 if selection is not None:
                     # 선택된 왜곡 저장
                     distortion_data = st.session_state.get('distortion_data', {})
@@ -1375,25 +2359,11 @@ def process_user_input(user_message, user_info):
                         st.session_state.awaiting_distortion_selection = False
                         
                         print(f"\n{'='*60}")
-                        print(f"[청소년이 선택한 왜곡: {selected['type']}]")
+                        print(f"[청소년이 선택한 왜곡: {selected.get('type')}]")
                         print(f"{'='*60}\n")
                         
-                        # 왜곡별 쉬운 설명
-                        distortion_simple_explanations = {
-                            "흑백 사고": "\"완벽 아니면 실패\"처럼 극단적으로만 생각하는 거야. 중간이 없고, 조금만 잘못돼도 전부 망한 것처럼 느껴지는 패턴이야.",
-                            "과잉 일반화": "한 번 일어난 일을 \"맨날 그래\" \"항상 그래\"로 확대하는 거야. 한 번 실수하면 앞으로도 계속 그럴 거라고 생각하는 패턴이야.",
-                            "부정적 편향": "잘한 건 안 보이고 나쁜 것만 크게 보이는 거야. 칭찬받아도 실수 하나만 계속 떠오르는 패턴이야.",
-                            "긍정 축소화": "내가 잘한 건 \"별거 아니야\" \"그냥 운\"이라고 작게 보는 거야. 자기 성취를 인정하지 못하는 패턴이야.",
-                            "성급한 판단": "확실한 증거 없이 \"분명 그럴 거야\"라고 단정하는 거야. 상대방 표정만 보고 날 싫어한다고 결론 내리는 패턴이야.",
-                            "확대와 축소": "작은 실수를 \"인생 끝\" \"완전 망함\"처럼 크게 만드는 거야. 시험 하나 못 봤는데 인생 망한 것처럼 느껴지는 패턴이야.",
-                            "감정적 추론": "\"기분이 그러니까 진짜 그런 거야\"처럼 느낌을 사실로 받아들이는 거야. 불안하면 나쁜 일이 정말 일어날 거라고 믿는 패턴이야.",
-                            "해야 한다 진술": "\"무조건 ~해야 해\" \"절대 ~하면 안 돼\"처럼 자신을 너무 엄격하게 다그치는 거야. 못 지키면 자책하는 패턴이야.",
-                            "낙인찍기": "한두 번 실수하고 \"나는 바보야\" \"나는 실패자야\"처럼 자신에게 딱지 붙이는 거야. 행동이 아니라 자기 자체를 부정적으로 규정하는 패턴이야.",
-                            "개인화": "내 잘못이 아닌 일도 \"다 내 탓이야\"라고 자책하는 거야. 다른 요인들은 안 보이고 모든 책임을 자기한테 돌리는 패턴이야."
-                        }
-                        
-                        distortion_type = selected['type']
-                        simple_explanation = distortion_simple_explanations.get(distortion_type, "")
+                        distortion_type = selected.get('type', '')
+                        simple_explanation = DISTORTION_SIMPLE_EXPLANATIONS.get(distortion_type, "")
                         
                         # 증거 추가
                         evidence_text = ""
@@ -1415,7 +2385,8 @@ def process_user_input(user_message, user_info):
                         return confirmation
                 else:
                     # 잘못된 입력
-                    retry_msg = "1, 2, 3 중에 하나를 선택해줘. 어떤 패턴이 제일 크게 다가와?"
+                    choices = ", ".join(str(i) for i in range(1, max(distortion_count, 1) + 1))
+                    retry_msg = f"{choices} 중에 하나를 선택해줘. 어떤 패턴이 제일 크게 다가와?"
                     add_assistant_message(retry_msg)
                     st.session_state.messages[-1]['stage'] = 'analysis'
                     return retry_msg
@@ -1427,11 +2398,7 @@ def process_user_input(user_message, user_info):
             
             # ===== 선택지 생성 =====
             if should_provide_options(response, current_stage):
-                options = generate_quick_replies(response, user_message, current_stage)
-                if options:
-                    set_quick_replies(options)
-                else:
-                    clear_quick_replies()
+                request_quick_replies(response, user_message, current_stage)
             else:
                 clear_quick_replies()
             
@@ -1449,78 +2416,23 @@ def process_user_input(user_message, user_info):
                 if len(analysis_user_messages) >= 5:
                     print(f"[턴 수 확인] ✅ {current_turn}턴 (5턴 이상 - 평가 진행)")
                     
-                    is_ready, eval_result = check_distortion_extraction_ready()
-                    
-                    # 평가 결과 상세 출력
-                    print(f"\n[평가 결과]")
-                    print(f"  - 상태: {eval_result.get('status')}")
-                    print(f"  - 이유: {eval_result.get('reason', 'N/A')}")
-                    print(f"  - 수집 영역: {eval_result.get('coverage', 'N/A')}")
-                    
-                    if 'collected_areas' in eval_result:
-                        print(f"\n[영역별 수집 현황]")
-                        for area, collected in eval_result['collected_areas'].items():
-                            status = "✅" if collected else "❌"
-                            print(f"  {status} {area}")
+                    # 이번 턴까지의 점진적 점수 반영 (추출 시 로컬 순위로 사용)
+                    if is_incremental_scoring_enabled():
+                        collect_scores(wait=True)
                     
-                    if is_ready:
-                        print(f"\n{'🎉'*20}")
-                        print(f"[인지왜곡 추출 준비 완료!]")
-                        print(f"{'🎉'*20}")
-                        
-                        # 인지왜곡 추출 에이전트 호출
-                        print(f"\n[인지왜곡 추출 시작...]")
-                        extract_success, distortion_data = extract_cognitive_distortions()
-                        
-                        if extract_success and distortion_data:
-                            print(f"\n[인지왜곡 추출 성공!]")
-                            print(f"  - 추출된 왜곡 개수: {len(distortion_data['distortions'])}개")
-                            
-                            for i, dist in enumerate(distortion_data['distortions'], 1):
-                                print(f"\n  {i}. {dist['type']} ({dist['type_english']})")
-                                print(f"     증거: {dist['evidence'][0][:50]}..." if dist['evidence'] else "     증거: 없음")
-                            
-                            # 인지왜곡 피드백 생성
-                            distortion_feedback = format_distortion_feedback(distortion_data)
-                            
-                            # 선택 질문 추가
-                            selection_question = "\n이 중에서 어떤 게 제일 너의 상황에 크게 다가오는 것 같아? 1, 2, 3 중에 골라봐."
-                            
-                            # ===== 선택지 초기화 (인지왜곡 피드백에는 선택지 불필요) =====
-                            clear_quick_replies()
-                            
-                            # 기존 응답(질문)을 제거하고 피드백으로 교체
-                            st.session_state.messages[-1]['content'] = distortion_feedback + selection_question
-                            
-                            # 인지왜곡 데이터 저장 (추후 활용)
-                            st.session_state.distortion_data = distortion_data
-                            st.session_state.distortion_extracted = True  # 추출 완료 플래그
-                            st.session_state.awaiting_distortion_selection = True  # 선택 대기 중
-                            
-                            print(f"\n[피드백 전달 완료]")
-                            print(f"[청소년 선택 대기 중...]")
-                            print(f"{'='*60}\n")
-                            
-                            # Stage 완료 - 추후 Stage 3로 전환 가능
-                            # st.session_state.current_stage = 'next_stage'
-                            
-                            return distortion_feedback + selection_question  # 피드백 + 선택 질문 반환
-                        else:
-                            print(f"\n[⚠️ 인지왜곡 추출 실패]")
-                            st.info("✅ 인지왜곡 분석을 위한 충분한 정보가 수집되었습니다.")
+                    if is_deferred_evaluation_enabled():
+                        # 응답을 먼저 보여주고 평가는 백그라운드에서 (UI 폴링 또는 다음 턴 시작 시 반영)
+                        defer_stage_evaluation('analysis', evaluate_analysis_stage)
+                        print(f"[지연 평가] 백그라운드에서 평가 진행")
+                        print(f"{'='*60}\n")
                     else:
-                        print(f"\n[아직 준비 안 됨]")
-                        if 'missing_info' in eval_result and eval_result['missing_info']:
-                            print(f"  부족한 정보:")
-                            for info in eval_result['missing_info']:
-                                print(f"    - {info}")
+                        evaluation = evaluate_analysis_stage(list(st.session_state.messages))
+                        feedback = apply_analysis_evaluation(evaluation)
                         
-                        if 'next_questions' in eval_result and eval_result['next_questions']:
-                            print(f"  추천 질문:")
-                            for q in eval_result['next_questions'][:3]:
-                                print(f"    - {q}")
-                    
-                    print(f"{'='*60}\n")
+                        if feedback is not None:
+                            # 기존 응답(질문)을 제거하고 피드백으로 교체
+                            st.session_state.messages[-1]['content'] = feedback
+                            return feedback  # 피드백 + 선택 질문 반환
                 else:
                     print(f"[턴 수 확인] ⏳ {current_turn}턴 (5턴 미만 - 평가 대기 중)")
                     print(f"  → {5 - current_turn}턴 더 필요")
@@ -1593,12 +2505,9 @@ def generate_quick_replies(response, user_message, current_stage):
         list: 2-4개의 선택지 (또는 None)
     """
     try:
-        api_key = get_api_key()
-        if not api_key:
+        if not get_api_key():
             return None
         
-        client = OpenAI(api_key=api_key)
-        
         # 단계별 프롬프트 조정
         if current_stage == 'collection':
             context_hint = "Stage 1 (정보 수집): 상황, 감정, 행동을 파악하는 단계입니다."
@@ -1646,14 +2555,12 @@ def generate_quick_replies(response, user_message, current_stage):
 }}
 """
         
-        response_obj = client.chat.completions.create(
-            model="gpt-4o",  # gpt-4o로 변경
+        response_obj = chat_completion(
+            'quick_replies',
             messages=[
                 {"role": "system", "content": "당신은 청소년의 실제 대화 방식을 깊이 이해하는 전문가입니다. 청소년이 다음 턴에 할 법한 자연스럽고 충분히 긴 대화 문장 3개를 생성하세요. 절대로 '직접 입력할게요' 같은 메타 선택지를 포함하지 마세요. 3개 모두 실제 답변이어야 합니다. 항상 JSON 형식으로만 응답하세요."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.8,  # 더 다양한 표현을 위해 증가
-            max_tokens=500,  # 더 긴 문장을 위해 증가
             response_format={"type": "json_object"}
         )
         
@@ -1688,11 +2595,84 @@ def generate_quick_replies(response, user_message, current_stage):
         return None
 
 
+def is_background_quick_replies_enabled():
+    """선택지 백그라운드 생성 여부 (BACKGROUND_QUICK_REPLIES 설정)"""
+    return get_setting("BACKGROUND_QUICK_REPLIES", False, bool)
+
+
+def timed_generate_quick_replies(response, user_message, current_stage):
+    """선택지 생성 + 소요 시간 기록"""
+    started = time.perf_counter()
+    try:
+        return generate_quick_replies(response, user_message, current_stage)
+    finally:
+        perf_metrics.observe("quick_replies.generation", time.perf_counter() - started)
+
+
+def request_quick_replies(response, user_message, current_stage):
+    """
+    선택지 생성 요청
+    
+    백그라운드 모드에서는 생성 작업만 시작하고 바로 반환합니다.
+    결과는 show_chat_page의 폴링 fragment가 collect_quick_replies로 가져갑니다.
+    """
+    if not is_background_quick_replies_enabled():
+        options = timed_generate_quick_replies(response, user_message, current_stage)
+        if options:
+            set_quick_replies(options)
+        else:
+            clear_quick_replies()
+        return
+    
+    clear_quick_replies()
+    st.session_state.pending_quick_replies = {
+        'turn': st.session_state.get('turn_seq', 0),
+        'future': background.submit(timed_generate_quick_replies, response, user_message, current_stage)
+    }
+
+
+def has_pending_quick_replies():
+    """백그라운드 선택지 생성이 진행 중인지 여부"""
+    return st.session_state.get('pending_quick_replies') is not None
+
+
+def collect_quick_replies():
+    """
+    완료된 백그라운드 선택지 결과 반영
+    
+    Returns:
+        bool: 대기 중이던 작업이 이번에 끝났는지 여부
+    """
+    pending = st.session_state.get('pending_quick_replies')
+    if pending is None or not pending['future'].done():
+        return False
+    
+    st.session_state.pending_quick_replies = None
+    
+    # 다음 턴이 이미 시작됐으면 늦게 도착한 선택지는 버림
+    if pending['turn'] != st.session_state.get('turn_seq', 0):
+        perf_metrics.increment("quick_replies.dropped_stale")
+        return True
+    
+    try:
+        options = pending['future'].result()
+    except Exception as e:
+        print(f"[선택지 생성 오류] {str(e)}")
+        options = None
+    
+    if options:
+        set_quick_replies(options)
+    return True
+
+
 def set_quick_replies(options):
     """선택지를 세션에 저장"""
     st.session_state.quick_replies = options
 
 
 def clear_quick_replies():
-    """선택지 초기화"""
+    """선택지 초기화 (진행 중인 백그라운드 생성 결과도 폐기)"""
     st.session_state.quick_replies = None
+    if st.session_state.get('pending_quick_replies') is not None:
+        perf_metrics.increment("quick_replies.dropped_stale")
+        st.session_state.pending_quick_replies = None
@@ -0,0 +1,280 @@
+"""
+청소년 인지 재구조화 챗봇 - 위기 키워드 즉시 감지 (Aho-Corasick, 한국어 정규화)
+
+모든 사용자 메시지를 API 호출 전에 검사해, 명백한 위기 표현이면 LLM 안전 평가를 기다리지 않고
+바로 경고를 띄울 수 있게 합니다. 키워드 사전은 모듈 import 시 한 번만 오토마톤으로 컴파일하고,
+메시지 1개는 글자 수에 비례하는 한 번의 순회(수십 마이크로초)로 검사합니다.
+
+정규화 (키워드와 메시지에 똑같이 적용):
+    1. NFKC (전각 문자, 호환 자모 통일) + 소문자
+    2. 띄어쓰기·문장부호·이모지 제거 ("죽 고 싶 다", "죽.고.싶.다")
+    3. 같은 글자 3번 이상 반복 축약 ("죽고싶다아아아", "자자자살" - "혼자 자살"처럼 2번은 유지)
+    4. 음절을 자모로 분해 ("죽고시퍼", "죽고싶ㅓ", "자ㅅㅏㄹ"도 같은 자모열로 비교)
+흔한 오타·은어는 CRISIS_PATTERNS의 변형 목록으로, 일상 표현과 겹치는 경우("유서 깊은",
+"자살골")는 EXCLUSION_PATTERNS로 처리합니다.
+
+띄어쓰기를 지우면 "피자 살래", "그러자 살짝"처럼 두 단어에 걸쳐 짧은 키워드가 생기므로,
+2음절 이하 키워드(자살, 자해, 유서 등)는 단어 첫머리에서 시작해 한 단어 안에서 끝나야 인정합니다.
+한 글자씩 띄운 조각("자 살 하 고")은 한 단어로 봅니다.
+
+벤치마크 / 재현율 검증:
+    python benchmark_crisis_matcher.py --recall-set crisis_recall_set.jsonl
+"""
+
+import re
+import unicodedata
+from collections import deque
+
+
+# (대표 키워드, 위험도, 위험 범주, 변형 표현) - 위험도 기준은 prompt10.txt와 동일
+CRISIS_PATTERNS = [
+    # Level 5: 자살
+    ('죽고 싶', 5, 'CRITICAL', ['죽고십', '죽고파', '죽어버리고 싶', '죽어야겠',
+                               '뒤지고 싶', '디지고 싶', '뒈지고 싶', '죽고만 싶']),
+    ('자살', 5, 'CRITICAL', ['자쌀', '자살각', '극단적 선택', '극단적인 선택']),
+    ('목숨을 끊', 5, 'CRITICAL', ['목숨 끊', '목숨을 버리']),
+    ('삶을 끝내', 5, 'CRITICAL', ['인생을 끝내', '생을 마감', '모든 걸 끝내고 싶', '그만 살고 싶']),
+    ('유서', 5, 'CRITICAL', ['유언장']),
+    ('살기 싫', 5, 'CRITICAL', ['살고 싶지 않', '살 이유가 없', '사는 게 의미 없', '사는 게 의미가 없']),
+    ('뛰어내리', 5, 'CRITICAL', ['뛰어내릴', '투신', '옥상에서 떨어지']),
+    ('목을 매', 5, 'CRITICAL', ['목매']),
+    # Level 5: 자해
+    ('자해', 5, 'CRITICAL', ['자해했', '자해하고']),
+    ('칼로 긋', 5, 'CRITICAL', ['칼로 그었', '칼로 그어']),
+    ('손목을 긋', 5, 'CRITICAL', ['손목 긋', '손목을 그었', '손목 그었', '손목을 그어', '손목을 칼']),
+    ('약을 많이 먹', 5, 'CRITICAL', ['약을 한꺼번에', '약을 왕창', '수면제를 많이', '수면제 모아']),
+    # Level 4: 소극적 자살 사고
+    ('사라지고 싶', 4, 'HIGH', ['사라져 버리고 싶', '내가 사라졌으면', '나만 사라지면']),
+    ('없어지고 싶', 4, 'HIGH', ['내가 없어졌으면', '나만 없어지면', '없어져 버리고 싶']),
+    ('깨어나지 않았으면', 4, 'HIGH', ['안 깨어났으면', '눈 안 떴으면', '영원히 잠들']),
+    ('태어나지 말', 4, 'HIGH', ['안 태어났으면', '태어나지 않았으면']),
+]
+
+# 위기 키워드를 포함하지만 위기 표현이 아닌 일상 표현 (이 구간 안의 키워드는 무시)
+EXCLUSION_PATTERNS = [
+    '유서 깊',
+    '자살골', '자해공갈',
+]
+
+# 이 음절 수 이하인 한 단어 키워드는 단어 경계 안에서만 인정 (두 단어에 걸친 '자살' 방지)
+BOUNDED_SYLLABLES = 2
+
+# 호환 자모 (종성 0번은 받침 없음)
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+              "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+
+# NFD가 만드는 첫가끝 자모(U+1100~) → 호환 자모 (초성 ㅍ과 종성 ㅍ을 같은 글자로 취급)
+_CANONICAL = {}
+for _i, _jamo in enumerate(_CHOSEONG):
+    _CANONICAL[chr(0x1100 + _i)] = _jamo
+for _i, _jamo in enumerate(_JUNGSEONG):
+    _CANONICAL[chr(0x1161 + _i)] = _jamo
+for _i, _jamo in enumerate(_JONGSEONG[1:]):
+    _CANONICAL[chr(0x11A8 + _i)] = _jamo
+
+# 호환 자모 → 같은 글자로 취급할 첫가끝 자모 목록
+_ALIASES = {}
+for _conjoining, _jamo in _CANONICAL.items():
+    _ALIASES.setdefault(_jamo, []).append(_conjoining)
+
+_SEPARATORS = re.compile(r'[\W_]+')
+_REPEATS = re.compile(r'(.)\1{2,}')
+
+
+def _boundaries(text):
+    """
+    normalize(text)의 자모 위치별 단어 정보
+
+    한 글자짜리 조각이 이어지면("죽 고 싶 다") 한 단어로 보고 조각마다 단어 첫머리로 표시합니다.
+
+    Returns:
+        (단어 첫머리 여부 목록, 앞에 단어 경계가 있는지 목록) - 위치가 맞지 않으면 None
+    """
+    tokens = [token for token in _SEPARATORS.split(unicodedata.normalize('NFKC', text).lower()) if token]
+
+    # 글자별 (글자, 단어 첫머리, 앞에 경계)
+    chars = []
+    for i, token in enumerate(tokens):
+        joined = i > 0 and len(token) == 1 and len(tokens[i - 1]) == 1
+        for j, ch in enumerate(token):
+            chars.append((ch, j == 0, j == 0 and i > 0 and not joined))
+
+    starts, breaks = [], []
+    i = 0
+    while i < len(chars):
+        run = i
+        while run < len(chars) and chars[run][0] == chars[i][0]:
+            run += 1
+        # normalize와 같은 반복 축약 (3번 이상 → 1번)
+        for ch, start, boundary in chars[i:i + 1] if run - i >= 3 else chars[i:run]:
+            jamo = unicodedata.normalize('NFD', ch)
+            starts.extend([start] + [False] * (len(jamo) - 1))
+            breaks.extend([boundary] + [False] * (len(jamo) - 1))
+        i = run
+
+    if len(starts) != len(normalize(text)):
+        return None
+    return starts, breaks
+
+
+def normalize(text):
+    """
+    매칭용 정규화 (NFKC → 구분 문자 제거 → 반복 축약 → NFD 자모 분해)
+
+    호환 자모로 입력한 글자("ㅈㅏㅅㅏㄹ")도 NFKC에서 음절로 합쳐지거나 첫가끝 자모로 바뀌므로
+    음절로 쓴 글자와 같은 자모열이 됩니다.
+
+    Returns:
+        str: 첫가끝 자모열
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = _SEPARATORS.sub('', text)
+    text = _REPEATS.sub(r'\1', text)
+    return unicodedata.normalize('NFD', text)
+
+
+class CrisisMatcher:
+    """
+    다중 키워드 동시 매칭 오토마톤 (Aho-Corasick, 실패 링크를 미리 펼친 전이표)
+
+    검사 시 글자마다 딕셔너리 조회 1번만 하므로 키워드 수와 무관하게 메시지 길이에 비례합니다.
+    초성/종성 구분은 전이표에 같은 전이로 등록해 검사 중에는 변환하지 않습니다.
+    """
+
+    def __init__(self, patterns, exclusions=(), bounded_syllables=BOUNDED_SYLLABLES):
+        """
+        Args:
+            patterns: [(대표 키워드, 위험도, 위험 범주, [변형 표현, ...]), ...]
+            exclusions: 무시할 일상 표현 목록
+            bounded_syllables: 이 음절 수 이하인 한 단어 표현은 단어 경계 안에서만 인정 (0이면 사용 안 함)
+        """
+        # 정규화한 패턴 → (대표 키워드, 위험도, 범주, 단어 경계 필요 여부) / 제외 표현은 None
+        entries = {}
+        for keyword, level, category, variants in patterns:
+            for phrase in [keyword] + list(variants):
+                bounded = ' ' not in phrase and len(phrase) <= bounded_syllables
+                entries[self._canonical(phrase)] = (keyword, level, category, bounded)
+        for phrase in exclusions:
+            entries[self._canonical(phrase)] = None
+
+        self.pattern_count = len(entries)
+        self._build(entries)
+
+    @staticmethod
+    def _canonical(phrase):
+        return "".join(_CANONICAL.get(ch, ch) for ch in normalize(phrase))
+
+    def _build(self, entries):
+        goto = [{}]
+        outputs = [[]]
+
+        for pattern, info in entries.items():
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state].append((len(pattern), info))
+
+        # 너비 우선으로 실패 링크 계산 + 실패 전이를 전이표에 펼치기
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            outputs[state] = outputs[state] + outputs[fail[state]]
+
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        # 호환 자모 전이 → 해당 첫가끝 자모 전이로 펼치기
+        for transitions in delta:
+            for ch, target in list(transitions.items()):
+                for alias in _ALIASES.get(ch, ()):
+                    transitions[alias] = target
+
+        # 검사 루프에서 속성 조회를 줄이기 위해 상태별 dict.get을 미리 꺼내 둠
+        self._transitions = [transitions.get for transitions in delta]
+        self._outputs = [tuple(out) for out in outputs]
+        self._accepting = frozenset(state for state, out in enumerate(outputs) if out)
+        self.state_count = len(goto)
+
+    def find(self, text):
+        """
+        메시지에서 위기 키워드 찾기
+
+        Returns:
+            list[dict]: [{'keyword', 'risk_level', 'risk_category'}, ...] (대표 키워드 기준 중복 제거)
+        """
+        transitions = self._transitions
+        accepting = self._accepting
+
+        hits = []
+        state = 0
+        for end, ch in enumerate(normalize(text), 1):
+            state = transitions[state](ch, 0)
+            if state in accepting:
+                for length, info in self._outputs[state]:
+                    hits.append((end - length, end, info))
+
+        if not hits:
+            return []
+
+        excluded = [(start, end) for start, end, info in hits if info is None]
+        boundaries = None
+        found = {}
+        for start, end, info in hits:
+            if info is None:
+                continue
+            if any(ex_start <= start and end <= ex_end for ex_start, ex_end in excluded):
+                continue
+            keyword, level, category, bounded = info
+            if bounded:
+                # 짧은 키워드: 단어 첫머리에서 시작하고 단어 경계를 넘지 않아야 함 (키워드가 있을 때만 계산)
+                if boundaries is None:
+                    boundaries = _boundaries(text) or ([True] * end, [False] * end)
+                starts, breaks = boundaries
+                if not starts[start] or any(breaks[start + 1:end]):
+                    continue
+            found[keyword] = {'keyword': keyword, 'risk_level': level, 'risk_category': category}
+
+        return list(found.values())
+
+
+# import 시 한 번만 컴파일
+_MATCHER = CrisisMatcher(CRISIS_PATTERNS, EXCLUSION_PATTERNS)
+
+
+def find_crisis_keywords(text):
+    """메시지에서 위기 키워드 찾기 (컴파일된 공유 오토마톤 사용)"""
+    return _MATCHER.find(text)
+
+
+def assess_keywords(text):
+    """
+    키워드 기반 즉시 위험도 판정 (LLM 안전 평가와 같은 형식)
+
+    Returns:
+        dict: 가장 높은 위험도 기준 평가 결과 (키워드가 없으면 None)
+    """
+    hits = find_crisis_keywords(text)
+    if not hits:
+        return None
+
+    top = max(hits, key=lambda hit: hit['risk_level'])
+    return {
+        'risk_level': top['risk_level'],
+        'risk_category': top['risk_category'],
+        'detected_keywords': [hit['keyword'] for hit in hits],
+        'immediate_action_required': top['risk_level'] >= 5,
+        'source': 'keyword'
+    }
@@ -11,7 +11,32 @@ required_files=(
     "chatbot_logic.py"
     "persona_ui.py"
     "safety_agent_simplified.py"
+    "crisis_matcher.py"
+    "benchmark_crisis_matcher.py"
+    "crisis_recall_set.jsonl"
+    "safety_screening.py"
+    "calibrate_safety_screening.py"
+    "safety_fallback.py"
+    "safety_cache.py"
+    "safety_log_writer.py"
     "ui_components.py"
+    "llm_client.py"
+    "perf_metrics.py"
+    "settings.py"
+    "prompt_registry.py"
+    "benchmark_prompts.py"
+    "background.py"
+    "model_router.py"
+    "hedging.py"
+    "structured_output.py"
+    "stub_server.py"
+    "distortion_classifier.py"
+    "export_onnx.py"
+    "benchmark_classifier.py"
+    "inference_worker.py"
+    "incremental_scoring.py"
+    "batch_score.py"
+    "model_routing.toml"
     "requirements.txt"
     "README.md"
     ".gitignore"
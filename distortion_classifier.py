@@ -0,0 +1,416 @@
+"""
+청소년 인지 재구조화 챗봇 - 로컬 인지왜곡 분류 모델 (프로세스 전역 1회 로드)
+
+파인튜닝된 RoBERTa 분류기를 처음 필요할 때 한 번만 로드하고 모든 세션이 같은 가중치를
+공유합니다. 서버 시작 시 백그라운드 스레드에서 미리 로드(워밍업)할 수도 있습니다.
+torch / transformers / onnxruntime은 선택 의존성이므로 로드 시점에만 import합니다.
+
+백엔드 (LOCAL_MODEL_BACKEND):
+    torch : 파인튜닝 체크포인트를 PyTorch로 실행 (GPU가 있으면 GPU)
+    onnx  : export_onnx.py로 만든 int8 양자화 ONNX 모델을 ONNX Runtime(CPU)으로 실행
+"""
+
+import os
+import threading
+import time
+
+import perf_metrics
+from settings import get_setting
+
+
+# 기본 모델 경로 (DISTORTION_MODEL_PATH 설정으로 변경 가능)
+DEFAULT_MODEL_PATH = r"C:\Users\kma80\Desktop\python_workspace\LLM\중견연구3\baseline_roberta_large_20250817_052327"
+
+# ONNX 모델 디렉터리 (DISTORTION_ONNX_PATH 설정으로 변경 가능, 토크나이저 파일 포함)
+DEFAULT_ONNX_PATH = "distortion_onnx"
+ONNX_MODEL_FILE = "model.int8.onnx"
+
+# 10가지 인지왜곡 레이블 (모델 출력 순서)
+DISTORTION_LABELS = [
+    "흑백 사고",
+    "과잉 일반화",
+    "부정적 편향",
+    "긍정 축소화",
+    "성급한 판단",
+    "확대와 축소",
+    "감정적 추론",
+    "해야 한다 진술",
+    "낙인찍기",
+    "개인화"
+]
+
+MAX_LENGTH = 512
+
+# 슬라이딩 윈도우 기본값 (LOCAL_MODEL_STRIDE: 이웃 윈도우와 겹치는 토큰 수)
+DEFAULT_STRIDE = 128
+AGGREGATIONS = ('max', 'mean')
+
+# 워밍업용 짧은 입력
+WARMUP_TEXT = "청소년: 요즘 친구들이 다 나를 싫어하는 것 같아요."
+
+
+def _rss_mb():
+    """현재 프로세스 메모리 (MB, psutil이 없으면 None)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def tokenize_windows(tokenizer, texts, return_tensors):
+    """
+    긴 대화를 MAX_LENGTH 토큰 윈도우로 나눠 토큰화 (stride만큼 겹침)
+
+    512 토큰 이후 내용을 버리지 않고 모든 윈도우를 한 배치로 만듭니다.
+    여러 대화를 한 번에 넘기면 모든 대화의 윈도우가 같은 배치에 들어갑니다.
+
+    Returns:
+        (모델 입력, 윈도우별 대화 인덱스)
+    """
+    stride = get_setting("LOCAL_MODEL_STRIDE", DEFAULT_STRIDE, int)
+    stride = max(0, min(stride, MAX_LENGTH // 2))
+
+    inputs = tokenizer(
+        texts,
+        max_length=MAX_LENGTH,
+        truncation=True,
+        stride=stride,
+        return_overflowing_tokens=True,
+        padding=True,
+        return_tensors=return_tensors
+    )
+    mapping = inputs.pop("overflow_to_sample_mapping")
+    return inputs, mapping
+
+
+def aggregate_windows(window_probs):
+    """
+    윈도우별 확률 → 대화 전체 확률 (LOCAL_MODEL_AGGREGATION: max / mean)
+
+    Args:
+        window_probs: (윈도우 수, 레이블 수) 배열
+
+    Returns:
+        dict: {레이블: 확률}
+    """
+    method = get_setting("LOCAL_MODEL_AGGREGATION", "max")
+    if method not in AGGREGATIONS:
+        print(f"⚠️ 알 수 없는 윈도우 집계 방식: {method} (max 사용)")
+        method = 'max'
+
+    combined = window_probs.max(axis=0) if method == 'max' else window_probs.mean(axis=0)
+    return {label: float(combined[i]) for i, label in enumerate(DISTORTION_LABELS)}
+
+
+class BaseDistortionClassifier:
+    """
+    백엔드 공통 - 윈도우별 확률 계산(predict_windows)만 백엔드가 구현
+
+    토크나이저(HF fast tokenizer는 호출마다 truncation/padding 상태를 바꿈)와 모델은 세션·백그라운드
+    스레드가 함께 쓰므로, 토큰화 + forward는 인스턴스 잠금으로 한 번에 하나씩 실행합니다.
+    """
+
+    backend = None
+
+    def __init__(self):
+        self._inference_lock = threading.Lock()
+
+    def predict_windows(self, texts):
+        """
+        Returns:
+            ((윈도우 수, 레이블 수) 확률 배열, 윈도우별 대화 인덱스 배열)
+        """
+        raise NotImplementedError
+
+    def predict_batch(self, texts):
+        """
+        여러 대화를 한 번의 forward pass로 예측 (긴 대화는 윈도우별 확률을 집계)
+
+        Returns:
+            list[dict]: 대화별 {레이블: 확률}
+        """
+        waited = time.monotonic()
+        with self._inference_lock:
+            perf_metrics.observe("local_model.lock_wait", time.monotonic() - waited)
+            window_probs, mapping = self.predict_windows(texts)
+        perf_metrics.observe("local_model.windows", len(window_probs))
+        return [aggregate_windows(window_probs[mapping == i]) for i in range(len(texts))]
+
+    def predict(self, text):
+        """
+        인지왜곡 확률 예측
+
+        Returns:
+            dict: {레이블: 확률}
+        """
+        return self.predict_batch([text])[0]
+
+
+class DistortionClassifier(BaseDistortionClassifier):
+    """PyTorch 인지왜곡 분류기 (tokenizer + model 보관)"""
+
+    backend = 'torch'
+
+    def __init__(self, model_path):
+        super().__init__()
+        self.model_path = model_path
+        self.tokenizer = None
+        self.model = None
+        self.device = None
+        self.report = {}
+
+    def load(self):
+        """토크나이저/모델 로드 및 로드 시간·메모리 기록"""
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        print(f"\n[로컬 모델 로딩 시작...] {self.model_path}")
+        rss_before = _rss_mb()
+        started = time.monotonic()
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
+
+        # CPU 스레드 수 제한 (LOCAL_MODEL_THREADS)
+        num_threads = get_setting("LOCAL_MODEL_THREADS", None, int)
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        # GPU 사용 가능하면 GPU로
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model.to(self.device)
+        self.model.eval()
+
+        load_seconds = time.monotonic() - started
+        model_mb = sum(p.numel() * p.element_size() for p in self.model.parameters()) / (1024 * 1024)
+        rss_after = _rss_mb()
+
+        self.report = {
+            'backend': self.backend,
+            'device': str(self.device),
+            'load_seconds': round(load_seconds, 2),
+            'model_mb': round(model_mb, 1),
+            'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None else None
+        }
+        print(f"[로컬 모델 로드 완료] {self.report}")
+
+    def predict_windows(self, texts):
+        """윈도우별 확률 (모든 윈도우를 한 번의 forward pass로 계산)"""
+        import torch
+
+        inputs, mapping = tokenize_windows(self.tokenizer, texts, "pt")
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+            probs = torch.sigmoid(logits).cpu().numpy()  # Multi-label classification
+
+        return probs, mapping.numpy()
+
+
+class OnnxDistortionClassifier(BaseDistortionClassifier):
+    """ONNX Runtime 인지왜곡 분류기 (int8 동적 양자화 모델, CPU 전용)"""
+
+    backend = 'onnx'
+
+    def __init__(self, model_path, num_threads=None):
+        super().__init__()
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.tokenizer = None
+        self.session = None
+        self.input_names = []
+        self.report = {}
+
+    def load(self):
+        """토크나이저/ONNX 세션 로드 및 로드 시간·메모리 기록"""
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_file = os.path.join(self.model_path, ONNX_MODEL_FILE)
+        print(f"\n[로컬 모델 로딩 시작...] {model_file}")
+        rss_before = _rss_mb()
+        started = time.monotonic()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+        load_seconds = time.monotonic() - started
+        rss_after = _rss_mb()
+
+        self.report = {
+            'backend': self.backend,
+            'device': f"cpu ({self.num_threads or 'auto'} threads)",
+            'load_seconds': round(load_seconds, 2),
+            'model_mb': round(os.path.getsize(model_file) / (1024 * 1024), 1),
+            'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None else None
+        }
+        print(f"[로컬 모델 로드 완료] {self.report}")
+
+    def predict_windows(self, texts):
+        """윈도우별 확률 (모든 윈도우를 한 번의 세션 실행으로 계산)"""
+        import numpy as np
+
+        inputs, mapping = tokenize_windows(self.tokenizer, texts, "np")
+        feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+
+        logits = self.session.run(None, feed)[0]
+        return 1.0 / (1.0 + np.exp(-logits)), np.asarray(mapping)  # Multi-label classification
+
+
+def create_classifier(backend=None):
+    """
+    설정에 맞는 분류기 생성 (로드 전 상태)
+
+    Args:
+        backend: 'torch' / 'onnx' (None이면 LOCAL_MODEL_BACKEND 설정)
+    """
+    backend = backend or get_setting("LOCAL_MODEL_BACKEND", "torch")
+
+    if backend == 'onnx':
+        return OnnxDistortionClassifier(
+            get_setting("DISTORTION_ONNX_PATH", DEFAULT_ONNX_PATH),
+            num_threads=get_setting("LOCAL_MODEL_THREADS", None, int)
+        )
+    if backend != 'torch':
+        print(f"⚠️ 알 수 없는 로컬 모델 백엔드: {backend} (torch 사용)")
+    return DistortionClassifier(get_setting("DISTORTION_MODEL_PATH", DEFAULT_MODEL_PATH))
+
+
+_classifier = None
+_load_error = None
+_lock = threading.Lock()
+_warmup_thread = None
+
+
+def get_classifier():
+    """
+    공유 분류기 가져오기 (최초 호출 시 로드, 동시 호출은 한 번의 로드를 기다림)
+
+    Raises:
+        RuntimeError: 이전 로드가 실패한 경우 (매 호출마다 재시도하지 않음)
+    """
+    global _classifier, _load_error
+
+    if _classifier is not None:
+        return _classifier
+
+    with _lock:
+        if _classifier is None:
+            if _load_error is not None:
+                raise RuntimeError(f"로컬 모델 로드 실패: {_load_error}")
+
+            classifier = create_classifier()
+            try:
+                classifier.load()
+            except Exception as e:
+                _load_error = e
+                perf_metrics.set_gauge("local_model.status", "failed")
+                raise
+
+            perf_metrics.set_gauge("local_model.status", "loaded")
+            perf_metrics.set_gauge("local_model.load_seconds", classifier.report['load_seconds'])
+            perf_metrics.set_gauge("local_model.model_mb", classifier.report['model_mb'])
+            if classifier.report['rss_delta_mb'] is not None:
+                perf_metrics.set_gauge("local_model.rss_delta_mb", classifier.report['rss_delta_mb'])
+            _classifier = classifier
+
+    return _classifier
+
+
+def is_worker_enabled():
+    """추론 워커 프로세스 사용 여부 (INFERENCE_WORKER_ADDRESS 설정)"""
+    return bool(get_setting("INFERENCE_WORKER_ADDRESS"))
+
+
+def predict(text):
+    """
+    인지왜곡 확률 예측 (추론 시간 기록)
+
+    INFERENCE_WORKER_ADDRESS가 있으면 공유 추론 워커 프로세스로 보내고,
+    없으면 이 프로세스의 공유 분류기로 직접 추론합니다.
+    """
+    started = time.monotonic()
+    if is_worker_enabled():
+        import inference_worker
+        result = inference_worker.predict_remote(text)
+    else:
+        result = get_classifier().predict(text)
+    perf_metrics.observe("local_model.inference", time.monotonic() - started)
+    return result
+
+
+def predict_batch(texts):
+    """
+    여러 텍스트의 인지왜곡 확률 예측 (한 번의 배치, 추론 시간 기록)
+
+    Returns:
+        list[dict]: 텍스트별 {레이블: 확률}
+    """
+    started = time.monotonic()
+    if is_worker_enabled():
+        import inference_worker
+        results = inference_worker.predict_remote_batch(texts)
+    else:
+        results = get_classifier().predict_batch(texts)
+    perf_metrics.observe("local_model.inference", time.monotonic() - started)
+    return results
+
+
+def get_load_report():
+    """로드 상태 보고 (로드 전이면 빈 dict)"""
+    if _classifier is not None:
+        return dict(_classifier.report, status='loaded')
+    if _load_error is not None:
+        return {'status': 'failed', 'error': str(_load_error)}
+    return {}
+
+
+def _warm_up():
+    try:
+        started = time.monotonic()
+        predict(WARMUP_TEXT)
+        print(f"✅ 로컬 모델 워밍업 완료 ({time.monotonic() - started:.1f}초)")
+    except Exception as e:
+        print(f"⚠️ 로컬 모델 워밍업 실패: {e}")
+
+
+def start_warmup():
+    """
+    서버 시작 시 백그라운드 스레드에서 모델 로드 + 1회 추론 (LOCAL_MODEL_WARMUP 설정)
+
+    여러 번 호출해도 프로세스당 한 번만 실행됩니다.
+    """
+    global _warmup_thread
+
+    # 워커 프로세스를 쓰는 경우 모델은 워커가 로드
+    if not get_setting("LOCAL_MODEL_WARMUP", False, bool) or is_worker_enabled():
+        return
+
+    with _lock:
+        if _warmup_thread is not None:
+            return
+        _warmup_thread = threading.Thread(target=_warm_up, name="local-model-warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def stage2_text_from_export(export_data):
+    """
+    내보낸 대화 JSON(export_conversation_to_json)에서 모델 입력 텍스트 만들기
+
+    extract_cognitive_distortions와 같은 형식 (Stage 2 대화만 사용)
+    """
+    messages = export_data.get('stages', {}).get('stage2_analysis', {}).get('messages', [])
+    text = "Stage 2 대화 내용:\n\n"
+    for msg in messages:
+        role = "청소년" if msg["role"] == "user" else "상담사"
+        text += f"{role}: {msg['content']}\n"
+    return text
@@ -0,0 +1,81 @@
+"""
+청소년 인지 재구조화 챗봇 - 인지왜곡 분류 모델 ONNX 변환 (int8 동적 양자화)
+
+파인튜닝된 RoBERTa 체크포인트를 ONNX로 내보내고 가중치를 int8로 동적 양자화합니다.
+결과 디렉터리에는 양자화 모델(model.int8.onnx)과 토크나이저 파일이 함께 저장되며,
+LOCAL_MODEL_BACKEND=onnx, DISTORTION_ONNX_PATH=<디렉터리>로 앱에서 사용할 수 있습니다.
+
+실행:
+    python export_onnx.py --model <체크포인트 경로> --output distortion_onnx
+
+필요 패키지: torch, transformers, onnx, onnxruntime
+"""
+
+import argparse
+import os
+import time
+
+from distortion_classifier import DEFAULT_MODEL_PATH, DEFAULT_ONNX_PATH, ONNX_MODEL_FILE, MAX_LENGTH
+
+FP32_MODEL_FILE = "model.fp32.onnx"
+ONNX_OPSET = 17
+
+
+def export(model_path, output_dir, keep_fp32=False):
+    """체크포인트 → fp32 ONNX → int8 동적 양자화 ONNX"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_file = os.path.join(output_dir, FP32_MODEL_FILE)
+    int8_file = os.path.join(output_dir, ONNX_MODEL_FILE)
+
+    print(f"[1/3] 체크포인트 로드: {model_path}")
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    print(f"[2/3] ONNX 변환 (opset {ONNX_OPSET})")
+    started = time.monotonic()
+    sample = tokenizer("청소년: 예시 문장입니다.", max_length=MAX_LENGTH, truncation=True, return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_file,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=ONNX_OPSET
+        )
+    print(f"      완료 ({time.monotonic() - started:.1f}초, {os.path.getsize(fp32_file) / 1024 / 1024:.0f}MB)")
+
+    print("[3/3] int8 동적 양자화")
+    started = time.monotonic()
+    quantize_dynamic(fp32_file, int8_file, weight_type=QuantType.QInt8)
+    print(f"      완료 ({time.monotonic() - started:.1f}초, {os.path.getsize(int8_file) / 1024 / 1024:.0f}MB)")
+
+    tokenizer.save_pretrained(output_dir)
+    if not keep_fp32:
+        os.remove(fp32_file)
+
+    print(f"✅ ONNX 모델 저장: {int8_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인지왜곡 분류 모델 ONNX 변환 (int8 동적 양자화)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="파인튜닝 체크포인트 경로")
+    parser.add_argument("--output", default=DEFAULT_ONNX_PATH, help="출력 디렉터리")
+    parser.add_argument("--keep-fp32", action="store_true", help="양자화 전 fp32 ONNX 파일 유지")
+    args = parser.parse_args()
+
+    export(args.model, args.output, keep_fp32=args.keep_fp32)
+
+
+if __name__ == "__main__":
+    main()
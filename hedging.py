@@ -0,0 +1,157 @@
+"""
+청소년 인지 재구조화 챗봇 - 단계별 응답 헤지 요청 (꼬리 지연시간 단축)
+
+첫 요청이 최근 지연시간의 지정 백분위 안에 첫 토큰을 보내지 않으면 같은 요청을
+한 번 더 보내고, 먼저 첫 토큰을 보낸 쪽을 사용합니다. 진 요청의 스트림은 닫아서 취소합니다.
+첫 토큰은 내용(delta.content)이 있는 첫 청크 기준이며(역할만 담긴 첫 청크 제외),
+첫 요청은 요청마다 전용 스레드에서 바로 보내고(풀 대기 없음, 대기 시간은 보낸 시점부터),
+헤지 요청만 전용 풀(HEDGE_WORKERS)에서 보냅니다. 풀이 가득 차 아직 줄 서 있는 헤지 요청은
+첫 요청이 이기면 보내지 않고 취소합니다.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, wait
+import time
+
+import background
+import perf_metrics
+from llm_client import chat_completion
+from settings import get_setting
+
+
+def is_hedging_enabled():
+    """헤지 요청 사용 여부 (HEDGE_REPLIES 설정)"""
+    return get_setting("HEDGE_REPLIES", False, bool)
+
+
+def first_chunk_metric(agent):
+    """에이전트별 첫 청크 도착 시간 지표 이름"""
+    return f"llm.{agent}.first_chunk"
+
+
+def get_hedge_delay(agent):
+    """
+    헤지 요청을 보낼 대기 시간 (초)
+
+    Returns:
+        최근 첫 청크 도착 시간의 HEDGE_PERCENTILE 백분위 (샘플이 부족하면 None = 헤지 안 함)
+    """
+    metric = first_chunk_metric(agent)
+    if perf_metrics.sample_count(metric) < get_setting("HEDGE_MIN_SAMPLES", 20, int):
+        return None
+    return perf_metrics.percentile(metric, get_setting("HEDGE_PERCENTILE", 95.0, float))
+
+
+def _has_content(chunk):
+    return bool(chunk.choices) and bool(chunk.choices[0].delta.content)
+
+
+class HedgedStream:
+    """이긴 요청의 스트림 (첫 토큰까지 이미 받은 청크 포함)"""
+
+    def __init__(self, stream, iterator, first_chunks):
+        self._stream = stream
+        self._iterator = iterator
+        self._first_chunks = first_chunks
+
+    def __iter__(self):
+        yield from self._first_chunks
+        yield from self._iterator
+
+    def close(self):
+        self._stream.close()
+
+
+def _open_until_first_chunk(agent, request):
+    """스트림을 열고 내용이 있는 첫 청크까지 받기 (앞선 역할 청크도 함께 반환)"""
+    started = time.monotonic()
+    stream = chat_completion(agent, stream=True, **request)
+    iterator = iter(stream)
+    first_chunks = []
+    for chunk in iterator:
+        first_chunks.append(chunk)
+        if _has_content(chunk):
+            break
+    perf_metrics.observe(first_chunk_metric(agent), time.monotonic() - started)
+    return stream, iterator, first_chunks
+
+
+def _close_loser(future):
+    """진 요청 정리 (스트림을 닫아 토큰 생성 중단)"""
+    try:
+        stream, _, _ = future.result()
+        stream.close()
+        perf_metrics.increment("llm.hedge.cancelled")
+    except Exception:
+        pass
+
+
+def _update_rates(agent):
+    """헤지 비율 / 헤지 승률 게이지 갱신"""
+    calls = perf_metrics.get_counter(f"llm.{agent}.hedge.calls")
+    sent = perf_metrics.get_counter(f"llm.{agent}.hedge.sent")
+    wins = perf_metrics.get_counter(f"llm.{agent}.hedge.wins")
+    perf_metrics.set_gauge(f"llm.{agent}.hedge_rate", round(sent / calls, 3) if calls else 0.0)
+    perf_metrics.set_gauge(f"llm.{agent}.hedge_win_rate", round(wins / sent, 3) if sent else 0.0)
+
+
+def hedged_stream(agent, **request):
+    """
+    헤지 요청으로 스트림 열기
+
+    Args:
+        agent: 호출 에이전트 이름 (stage_reply, restructuring_reply)
+        **request: chat.completions.create 인자
+
+    Returns:
+        HedgedStream (먼저 첫 청크를 보낸 요청의 스트림)
+    """
+    perf_metrics.increment(f"llm.{agent}.hedge.calls")
+    delay = get_hedge_delay(agent)
+
+    futures = [background.start(_open_until_first_chunk, agent, request)]
+    done, _ = wait(futures, timeout=delay)
+
+    if not done:
+        # 첫 요청이 느림 → 같은 요청을 한 번 더
+        perf_metrics.increment(f"llm.{agent}.hedge.sent")
+        futures.append(background.submit_to('hedge', _open_until_first_chunk, agent, request))
+
+    pending = set(futures)
+    winner = None
+    last_error = None
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and winner is None:
+                winner = future
+            elif future.exception() is not None:
+                last_error = future.exception()
+
+    # 나머지 요청: 아직 줄 서 있으면 보내지 않고, 이미 보냈으면 끝나는 대로 스트림을 닫아 취소
+    for future in futures:
+        if future is winner:
+            continue
+        if future.cancel():
+            perf_metrics.increment("llm.hedge.cancelled_queued")
+        else:
+            future.add_done_callback(_close_loser)
+
+    if winner is None:
+        _update_rates(agent)
+        raise last_error
+
+    if len(futures) > 1 and winner is futures[1]:
+        perf_metrics.increment(f"llm.{agent}.hedge.wins")
+    _update_rates(agent)
+
+    return HedgedStream(*winner.result())
+
+
+def hedged_completion_text(agent, **request):
+    """헤지 요청으로 전체 응답 텍스트 받기 (블로킹 모드용)"""
+    stream = hedged_stream(agent, **request)
+    parts = []
+    for chunk in stream:
+        if _has_content(chunk):
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts)
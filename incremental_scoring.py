@@ -0,0 +1,171 @@
+"""
+청소년 인지 재구조화 챗봇 - Stage 2 턴별 점진적 인지왜곡 점수
+
+Stage 2 사용자 메시지가 들어올 때마다 로컬 분류기로 문장 단위 점수를 백그라운드에서 계산해
+세션에 누적합니다 (유형별 누적 확률 + 근거 문장 상위 N개). 추출 준비(READY)가 되면
+전체 대화를 다시 추론하지 않고 누적 순위를 바로 사용하고, extract_with_gpt에는 힌트로 넘겨
+프롬프트와 출력 토큰을 줄입니다.
+"""
+
+import re
+
+import streamlit as st
+
+import background
+import distortion_classifier
+import perf_metrics
+from distortion_classifier import DISTORTION_LABELS
+from settings import get_setting
+
+
+# 메시지당 점수를 계산할 최대 문장 수
+MAX_SENTENCES = 16
+
+# 유형별로 보관할 근거 문장 수 / 근거로 인정할 최소 확률
+EVIDENCE_PER_LABEL = 3
+EVIDENCE_MIN_SCORE = 0.3
+
+# 힌트에 포함할 상위 유형 수
+HINT_TOP_K = 5
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?~])\s+|\n+')
+
+
+def is_incremental_scoring_enabled():
+    """턴별 점진적 인지왜곡 점수 사용 여부 (INCREMENTAL_DISTORTION_SCORING 설정)"""
+    return get_setting("INCREMENTAL_DISTORTION_SCORING", False, bool)
+
+
+def split_sentences(text):
+    """메시지를 문장 단위로 분리 (너무 짧은 조각 제외)"""
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text)]
+    return [s for s in sentences if len(s) >= 2][:MAX_SENTENCES] or [text.strip()]
+
+
+def _empty_scores():
+    return {
+        'turns': 0,
+        'sum': {label: 0.0 for label in DISTORTION_LABELS},
+        'max': {label: 0.0 for label in DISTORTION_LABELS},
+        'evidence': {label: [] for label in DISTORTION_LABELS}
+    }
+
+
+def get_scores():
+    """세션의 누적 점수 (없으면 생성)"""
+    if not st.session_state.get('distortion_scores'):
+        st.session_state.distortion_scores = _empty_scores()
+    return st.session_state.distortion_scores
+
+
+def score_message(message):
+    """
+    메시지 1개의 문장별 점수 계산 (백그라운드 스레드에서 실행)
+
+    Returns:
+        [(문장, {레이블: 확률}), ...]
+    """
+    sentences = split_sentences(message)
+    return list(zip(sentences, distortion_classifier.predict_batch(sentences)))
+
+
+def _merge(scores, sentence_probs):
+    """문장별 점수를 누적 점수에 반영 (메시지 점수 = 문장별 최대값)"""
+    scores['turns'] += 1
+
+    for label in DISTORTION_LABELS:
+        message_prob = max(probs[label] for _, probs in sentence_probs)
+        scores['sum'][label] += message_prob
+        scores['max'][label] = max(scores['max'][label], message_prob)
+
+        evidence = scores['evidence'][label] + [
+            {'sentence': sentence, 'score': round(probs[label], 4)}
+            for sentence, probs in sentence_probs
+            if probs[label] >= EVIDENCE_MIN_SCORE
+        ]
+        evidence.sort(key=lambda e: e['score'], reverse=True)
+        scores['evidence'][label] = evidence[:EVIDENCE_PER_LABEL]
+
+
+def request_scoring(message):
+    """Stage 2 사용자 메시지 점수 계산을 백그라운드에 제출"""
+    pending = st.session_state.get('pending_distortion_scores') or []
+    pending.append(background.submit(score_message, message))
+    st.session_state.pending_distortion_scores = pending
+    perf_metrics.increment("incremental_scoring.requested")
+
+
+def collect_scores(wait=False):
+    """
+    완료된 점수 계산 결과를 누적 점수에 반영 (메인 스크립트 스레드에서 호출)
+
+    Args:
+        wait: True면 진행 중인 계산이 끝날 때까지 대기 (추출 직전)
+    """
+    pending = st.session_state.get('pending_distortion_scores') or []
+    if not pending:
+        return
+
+    remaining = []
+    scores = get_scores()
+    for future in pending:
+        if not wait and not future.done():
+            remaining.append(future)
+            continue
+        try:
+            _merge(scores, future.result())
+            perf_metrics.increment("incremental_scoring.applied")
+        except Exception as e:
+            print(f"[점진적 인지왜곡 점수 실패] {e}")
+            perf_metrics.increment("incremental_scoring.failed")
+
+    st.session_state.pending_distortion_scores = remaining
+
+
+def get_running_probs(scores=None):
+    """
+    누적 확률 벡터 (LOCAL_MODEL_AGGREGATION: max = 턴별 최대, mean = 턴 평균)
+
+    Returns:
+        dict: {레이블: 확률} (점수가 없으면 None)
+    """
+    scores = scores or st.session_state.get('distortion_scores')
+    if not scores or scores['turns'] == 0:
+        return None
+
+    if get_setting("LOCAL_MODEL_AGGREGATION", "max") == 'mean':
+        return {label: total / scores['turns'] for label, total in scores['sum'].items()}
+    return dict(scores['max'])
+
+
+def get_ranking(top_k=HINT_TOP_K):
+    """
+    누적 점수 기준 상위 유형
+
+    Returns:
+        [{'type', 'probability', 'evidence': [문장, ...]}, ...] (점수가 없으면 [])
+    """
+    scores = st.session_state.get('distortion_scores')
+    probs = get_running_probs(scores)
+    if probs is None:
+        return []
+
+    ranked = sorted(probs.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    return [
+        {
+            'type': label,
+            'probability': prob,
+            'evidence': [e['sentence'] for e in scores['evidence'][label]]
+        }
+        for label, prob in ranked
+    ]
+
+
+def build_extraction_hint(ranking):
+    """extract_with_gpt에 붙일 로컬 분류기 힌트 텍스트"""
+    lines = ["[로컬 분류기 사전 순위 - 참고용]",
+             "아래 후보와 근거 문장을 우선 검토하고, 대화에 근거가 있는 유형만 선택하세요."]
+    for i, item in enumerate(ranking, 1):
+        evidence = " / ".join(f"\"{s}\"" for s in item['evidence']) or "(근거 문장 없음)"
+        lines.append(f"{i}. {item['type']} ({item['probability']:.2f}) - {evidence}")
+    return "\n".join(lines)
@@ -0,0 +1,264 @@
+"""
+청소년 인지 재구조화 챗봇 - 로컬 인지왜곡 분류 추론 워커 (동적 배치)
+
+분류 모델을 하나의 워커 프로세스에만 올려 두고, 앱(모든 Streamlit 세션)은 로컬 소켓으로
+추론을 요청합니다. 동시에 들어온 요청은 최대 대기 시간 안에서 하나의 마이크로 배치로 묶어
+한 번의 forward pass로 처리하므로, 추출 단계에 동시에 도달한 사용자가 많아도 CPU 사용량이
+배치 크기만큼으로 제한됩니다. 대기열이 가득 차면 즉시 거절(backpressure)합니다.
+
+연결은 pickle로 주고받으므로 인증 키(INFERENCE_WORKER_AUTHKEY)는 기본값 없이 워커와 앱 모두에
+같은 비밀 값을 지정해야 합니다.
+
+실행:
+    INFERENCE_WORKER_AUTHKEY=<비밀 키> python inference_worker.py --port 8788 --max-batch 8 --max-wait-ms 20 --queue-size 32
+
+앱 연결 (.env 또는 Streamlit Secrets):
+    INFERENCE_WORKER_ADDRESS=127.0.0.1:8788
+    INFERENCE_WORKER_AUTHKEY=<비밀 키>
+"""
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+import perf_metrics
+from settings import get_setting
+
+
+STATS_INTERVAL = 60.0
+
+
+class WorkerBusyError(RuntimeError):
+    """워커 대기열이 가득 차 요청이 거절된 경우"""
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or "127.0.0.1", int(port)
+
+
+def _authkey():
+    """연결 인증 키 (INFERENCE_WORKER_AUTHKEY, 필수 - 공개된 기본 키로 pickle 연결을 열지 않음)"""
+    authkey = get_setting("INFERENCE_WORKER_AUTHKEY")
+    if not authkey:
+        raise RuntimeError("INFERENCE_WORKER_AUTHKEY가 설정되지 않았습니다 (추론 워커와 앱에 같은 비밀 키 지정)")
+    return authkey.encode('utf-8')
+
+
+# ========== 앱 측 클라이언트 ==========
+
+def predict_remote_batch(texts):
+    """
+    워커에 추론 요청 (여러 텍스트는 워커에서 다른 요청과 함께 배치 처리)
+
+    Returns:
+        list[dict]: 텍스트별 {레이블: 확률}
+
+    Raises:
+        WorkerBusyError: 워커 대기열이 가득 찬 경우
+        TimeoutError: INFERENCE_WORKER_TIMEOUT 안에 응답이 없는 경우
+    """
+    address = _parse_address(get_setting("INFERENCE_WORKER_ADDRESS"))
+    timeout = get_setting("INFERENCE_WORKER_TIMEOUT", 30.0, float)
+
+    with Client(address, authkey=_authkey()) as conn:
+        conn.send({'op': 'predict', 'texts': list(texts)})
+        if not conn.poll(timeout):
+            perf_metrics.increment("local_model.worker.timeouts")
+            raise TimeoutError(f"추론 워커 응답 시간 초과 ({timeout}초)")
+        response = conn.recv()
+
+    perf_metrics.set_gauge("local_model.worker.queue_depth", response.get('queue_depth', 0))
+
+    if not response['ok']:
+        if response['error'] == 'busy':
+            perf_metrics.increment("local_model.worker.rejected")
+            raise WorkerBusyError("추론 워커 대기열이 가득 찼습니다")
+        raise RuntimeError(f"추론 워커 오류: {response['error']}")
+
+    return response['result']
+
+
+def predict_remote(text):
+    """워커에 추론 요청 (텍스트 1개)"""
+    return predict_remote_batch([text])[0]
+
+
+def get_worker_stats():
+    """워커 지표 조회 (대기열 깊이, 배치 크기, 거절 수 등)"""
+    address = _parse_address(get_setting("INFERENCE_WORKER_ADDRESS"))
+    with Client(address, authkey=_authkey()) as conn:
+        conn.send({'op': 'stats'})
+        return conn.recv()['result']
+
+
+# ========== 워커 ==========
+
+class InferenceWorker:
+    """대기열의 요청을 마이크로 배치로 묶어 추론"""
+
+    def __init__(self, classifier, max_batch=8, max_wait=0.02, queue_size=32):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue(maxsize=queue_size)
+
+    def submit(self, text):
+        """
+        요청 등록 (대기열이 가득 차면 WorkerBusyError)
+
+        Returns:
+            Future (결과: {레이블: 확률})
+        """
+        future = Future()
+        try:
+            self.requests.put_nowait((text, future, time.monotonic()))
+        except queue.Full:
+            perf_metrics.increment("worker.rejected")
+            raise WorkerBusyError("queue full")
+
+        perf_metrics.set_gauge("worker.queue_depth", self.requests.qsize())
+        return future
+
+    def _next_batch(self):
+        """첫 요청을 기다린 뒤 max_wait 동안 max_batch까지 모으기"""
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        perf_metrics.set_gauge("worker.queue_depth", self.requests.qsize())
+        return batch
+
+    def run(self):
+        """배치 처리 루프 (전용 스레드에서 실행)"""
+        while True:
+            batch = self._next_batch()
+            texts = [text for text, _, _ in batch]
+            started = time.monotonic()
+
+            for _, _, enqueued in batch:
+                perf_metrics.observe("worker.queue_wait", started - enqueued)
+
+            try:
+                results = self.classifier.predict_batch(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                perf_metrics.increment("worker.errors")
+                continue
+
+            perf_metrics.observe("worker.batch_size", len(batch))
+            perf_metrics.observe("worker.batch_latency", time.monotonic() - started)
+            perf_metrics.increment("worker.requests", len(batch))
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def handle(self, conn):
+        """클라이언트 연결 1개 처리"""
+        try:
+            message = conn.recv()
+            if message.get('op') == 'stats':
+                conn.send({'ok': True, 'result': perf_metrics.snapshot()})
+                return
+
+            texts = message['texts']
+            if self.requests.maxsize - self.requests.qsize() < len(texts):
+                perf_metrics.increment("worker.rejected")
+                conn.send({'ok': False, 'error': 'busy', 'queue_depth': self.requests.qsize()})
+                return
+
+            try:
+                futures = [self.submit(text) for text in texts]
+            except WorkerBusyError:
+                conn.send({'ok': False, 'error': 'busy', 'queue_depth': self.requests.qsize()})
+                return
+
+            try:
+                result = [future.result() for future in futures]
+            except Exception as e:
+                conn.send({'ok': False, 'error': str(e), 'queue_depth': self.requests.qsize()})
+                return
+
+            conn.send({'ok': True, 'result': result, 'queue_depth': self.requests.qsize()})
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+
+def _report_stats():
+    """주기적으로 워커 지표 출력"""
+    while True:
+        time.sleep(STATS_INTERVAL)
+        snapshot = perf_metrics.snapshot()
+        batch = snapshot['latency'].get('worker.batch_size', {})
+        wait = snapshot['latency'].get('worker.queue_wait', {})
+        print(
+            f"[추론 워커] 요청 {snapshot['counters'].get('worker.requests', 0)} · "
+            f"거절 {snapshot['counters'].get('worker.rejected', 0)} · "
+            f"대기열 {snapshot['gauges'].get('worker.queue_depth', 0)} · "
+            f"배치 p50 {batch.get('p50', 0):.1f} · 대기 p95 {wait.get('p95', 0) * 1000:.0f}ms"
+        )
+
+
+def main():
+    import distortion_classifier
+
+    parser = argparse.ArgumentParser(description="로컬 인지왜곡 분류 추론 워커 (동적 배치)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--max-batch", type=int, default=8, help="마이크로 배치 최대 요청 수")
+    parser.add_argument("--max-wait-ms", type=float, default=20.0, help="배치를 모으는 최대 대기 시간 (ms)")
+    parser.add_argument("--queue-size", type=int, default=32, help="대기열 크기 (가득 차면 즉시 거절)")
+    args = parser.parse_args()
+
+    try:
+        authkey = _authkey()
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    # 워커 시작 시 모델 로드 + 워밍업
+    classifier = distortion_classifier.get_classifier()
+    classifier.predict(distortion_classifier.WARMUP_TEXT)
+
+    worker = InferenceWorker(
+        classifier,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        queue_size=args.queue_size
+    )
+    threading.Thread(target=worker.run, name="inference-batcher", daemon=True).start()
+    threading.Thread(target=_report_stats, name="inference-stats", daemon=True).start()
+
+    listener = Listener((args.host, args.port), authkey=authkey)
+    print(f"✅ 추론 워커 시작: {args.host}:{args.port} ({classifier.backend}, 배치 {args.max_batch}, "
+          f"대기 {args.max_wait_ms}ms, 대기열 {args.queue_size})")
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # 인증 실패 등 연결 단위 오류
+                print(f"⚠️ 연결 수락 실패: {e}")
+                continue
+            threading.Thread(target=worker.handle, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+
+
+if __name__ == "__main__":
+    main()
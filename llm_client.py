@@ -0,0 +1,397 @@
+"""
+청소년 인지 재구조화 챗봇 - 공유 OpenAI 클라이언트 (프로세스 전역 커넥션 풀)
+
+모든 에이전트(단계별 응답, 평가/추출 에이전트, 선택지 생성, 안전 에이전트)가
+하나의 클라이언트와 HTTP keep-alive 풀을 함께 사용합니다.
+"""
+
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+import streamlit as st
+from openai import OpenAI
+
+import model_router
+import perf_metrics
+from settings import get_setting
+
+
+_client = None
+_api_key = None
+_lock = threading.Lock()
+
+
+# ========== API 키 헬퍼 함수 ==========
+def get_api_key():
+    """
+    API 키 가져오기 (Streamlit Secrets 우선, 환경변수 대체)
+
+    한 번 읽은 키는 프로세스 전체에서 재사용합니다.
+    """
+    global _api_key
+
+    if _api_key:
+        return _api_key
+
+    api_key = None
+    try:
+        # Streamlit Secrets 시도
+        api_key = st.secrets.get("OPENAI_API_KEY")
+    except Exception:
+        pass
+
+    # 환경변수 시도
+    if not api_key:
+        api_key = os.getenv("OPENAI_API_KEY")
+
+    if api_key:
+        _api_key = api_key
+        return api_key
+
+    # 둘 다 없으면 에러
+    st.error("⚠️ OpenAI API 키가 설정되지 않았습니다. Streamlit Secrets에 OPENAI_API_KEY를 추가하세요.")
+    return None
+
+
+# ========== 커넥션 재사용 추적 ==========
+def _trace_connection(event_name, info):
+    """httpcore trace 콜백 - 새 TCP 연결이 열릴 때만 집계"""
+    if event_name == "connection.connect_tcp.complete":
+        perf_metrics.increment("openai.connections_opened")
+
+
+def _on_request(request):
+    """요청마다 trace 콜백 연결"""
+    perf_metrics.increment("openai.requests")
+    request.extensions["trace"] = _trace_connection
+
+
+def _build_http_client():
+    """keep-alive 풀 설정이 적용된 httpx 클라이언트 생성"""
+    limits = httpx.Limits(
+        max_connections=get_setting("OPENAI_MAX_CONNECTIONS", 100, int),
+        max_keepalive_connections=get_setting("OPENAI_MAX_KEEPALIVE", 20, int),
+        keepalive_expiry=get_setting("OPENAI_KEEPALIVE_EXPIRY", 60.0, float)
+    )
+
+    return httpx.Client(
+        limits=limits,
+        follow_redirects=True,
+        event_hooks={'request': [_on_request]}
+    )
+
+
+def get_openai_client():
+    """
+    공유 OpenAI 클라이언트 가져오기 (최초 호출 시 생성)
+
+    Returns:
+        OpenAI 클라이언트
+
+    Raises:
+        RuntimeError: API 키가 설정되지 않은 경우
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is None:
+            api_key = get_api_key()
+            if not api_key:
+                raise RuntimeError("OpenAI API 키가 설정되지 않았습니다.")
+
+            # OPENAI_BASE_URL: 로컬 스텁 서버 등 OpenAI 호환 서버 주소 (없으면 기본 API)
+            base_url = get_setting("OPENAI_BASE_URL") or None
+
+            # 재시도는 chat_completion 래퍼가 데드라인 안에서 직접 처리
+            _client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=_build_http_client(),
+                max_retries=0
+            )
+            perf_metrics.increment("openai.clients_created")
+            print(f"✅ 공유 OpenAI 클라이언트 생성 완료 ({base_url or '기본 API'})")
+
+    return _client
+
+
+def get_connection_stats():
+    """
+    커넥션 재사용 통계
+
+    Returns:
+        요청 수, 새로 연 연결 수, 재사용 횟수, 재사용 비율
+    """
+    requests = perf_metrics.get_counter("openai.requests")
+    opened = perf_metrics.get_counter("openai.connections_opened")
+    reused = max(0, requests - opened)
+
+    return {
+        'requests': requests,
+        'connections_opened': opened,
+        'reused': reused,
+        'reuse_ratio': reused / requests if requests else 0.0
+    }
+
+
+# ========== 호출 래퍼 (데드라인 / 재시도 / 서킷 브레이커) ==========
+
+# 에이전트별 전체 호출 제한 시간 (초, 재시도 포함)
+# LLM_DEADLINE_<AGENT> 설정으로 변경 가능 (예: LLM_DEADLINE_SAFETY=5)
+AGENT_DEADLINES = {
+    'safety': 8.0,
+    'stage_reply': 30.0,
+    'restructuring_reply': 30.0,
+    'quick_replies': 15.0,
+    'collection_evaluator': 20.0,
+    'distortion_evaluator': 20.0,
+    'method_selector': 30.0,
+    'elb_extractor': 45.0,
+    'distortion_extractor': 60.0,
+    'json_repair': 20.0
+}
+DEFAULT_DEADLINE = 30.0
+
+# 재시도 백오프 (초)
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+
+class DeadlineExceededError(TimeoutError):
+    """에이전트 데드라인 안에 응답을 받지 못한 경우"""
+
+
+class DeadlineStream:
+    """
+    데드라인을 확인하며 읽는 스트림
+
+    요청 타임아웃은 청크 사이 대기 시간에만 적용되므로 청크마다 데드라인을 확인하고,
+    넘기면 스트림을 닫은 뒤 DeadlineExceededError를 냅니다.
+    """
+
+    def __init__(self, stream, agent, deadline):
+        self._stream = stream
+        self._agent = agent
+        self._deadline = deadline
+
+    def __iter__(self):
+        for chunk in self._stream:
+            if time.monotonic() > self._deadline:
+                self.close()
+                perf_metrics.increment(f"llm.{self._agent}.timeouts")
+                raise DeadlineExceededError(f"{self._agent} 데드라인 초과 (스트리밍 중)")
+            yield chunk
+
+    def close(self):
+        self._stream.close()
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷 브레이커가 열려 호출을 즉시 거부한 경우"""
+
+
+class CircuitBreaker:
+    """
+    연속 실패 시 일정 시간 호출을 즉시 거부하는 서킷 브레이커
+
+    closed → (연속 실패 N회) → open → (cooldown 경과) → half_open (1회 시험 호출)
+    → 성공 시 closed / 실패 시 다시 open
+    """
+
+    def __init__(self, name, failure_threshold=5, cooldown=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """호출 허용 여부"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self._set_state('half_open')
+
+            # half_open: 시험 호출 1개만 통과
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        """성공 기록"""
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != 'closed':
+                self._set_state('closed')
+
+    def record_failure(self):
+        """실패 기록 (재시도 대상 오류만)"""
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != 'open':
+                    perf_metrics.increment("llm.breaker_opened")
+                self._set_state('open')
+
+    def release_probe(self):
+        """호출하지 않고 끝난 경우 시험 호출 자리 반납"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _set_state(self, state):
+        self.state = state
+        perf_metrics.set_gauge(f"llm.breaker.{self.name}", state)
+
+
+_breakers = {}
+
+
+def get_breaker(name):
+    """모델별 서킷 브레이커"""
+    with _lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=get_setting("LLM_BREAKER_THRESHOLD", 5, int),
+                cooldown=get_setting("LLM_BREAKER_COOLDOWN", 30.0, float)
+            )
+        return _breakers[name]
+
+
+def get_deadline(agent):
+    """에이전트별 데드라인 (초)"""
+    return get_setting(
+        f"LLM_DEADLINE_{agent.upper()}",
+        AGENT_DEADLINES.get(agent, DEFAULT_DEADLINE),
+        float
+    )
+
+
+def _is_retryable(error):
+    """재시도할 오류인지 (429, 5xx, 연결 오류/타임아웃)"""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _backoff_delay(attempt, error):
+    """지터가 적용된 지수 백오프 (Retry-After 헤더가 있으면 우선)"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        try:
+            if retry_after is not None:
+                return min(BACKOFF_CAP, float(retry_after))
+        except ValueError:
+            pass
+
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _next_model(models):
+    """서킷 브레이커가 허용하는 첫 번째 모델 (모두 열려 있으면 None)"""
+    for model in models:
+        if get_breaker(model).allow():
+            return model
+    return None
+
+
+def chat_completion(agent, **request):
+    """
+    chat.completions.create 공통 호출 래퍼
+
+    - 모델/max_tokens/temperature는 model_routing.toml의 에이전트 라우팅을 따름
+      (p95 지연시간이 SLO를 넘거나 브레이커가 열리면 대체 모델 사용)
+    - 에이전트별 데드라인 (재시도 포함 전체 시간, 스트리밍은 마지막 청크까지)
+    - 429/5xx/연결 오류 시 지터 지수 백오프 재시도
+    - 모델별 서킷 브레이커 (장애 중에는 즉시 실패)
+    - 재시도/타임아웃/브레이커 지표 기록
+
+    Args:
+        agent: 호출 에이전트 이름 (예: 'stage_reply', 'safety')
+        **request: chat.completions.create 인자 (model을 주면 라우팅 무시)
+
+    Returns:
+        ChatCompletion (stream=True면 DeadlineStream)
+    """
+    client = get_openai_client()
+    if 'model' in request:
+        models = [request.pop('model')]
+    else:
+        models = model_router.select_models(agent)
+
+    deadline = time.monotonic() + get_deadline(agent)
+    max_retries = get_setting("LLM_MAX_RETRIES", 3, int)
+    attempt = 0
+
+    while True:
+        model = _next_model(models)
+        if model is None:
+            perf_metrics.increment(f"llm.{agent}.breaker_rejected")
+            raise CircuitOpenError(f"OpenAI 호출 일시 중단 ({', '.join(models)} 서킷 브레이커 열림)")
+        breaker = get_breaker(model)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            breaker.release_probe()
+            perf_metrics.increment(f"llm.{agent}.timeouts")
+            raise DeadlineExceededError(f"{agent} 데드라인 초과")
+
+        started = time.monotonic()
+        try:
+            response = client.chat.completions.create(
+                timeout=remaining,
+                **model_router.build_request(agent, model, request)
+            )
+        except Exception as e:
+            if not _is_retryable(e):
+                # 요청 자체의 문제 (400/401/422 등)는 API 상태와 무관 - 브레이커 상태는 그대로
+                breaker.release_probe()
+                perf_metrics.increment(f"llm.{agent}.errors")
+                raise
+
+            breaker.record_failure()
+            if isinstance(e, openai.APITimeoutError):
+                perf_metrics.increment(f"llm.{agent}.timeouts")
+                # 타임아웃도 지연시간 샘플로 남겨 SLO 판단에 반영
+                perf_metrics.observe(model_router.latency_metric(agent, model), time.monotonic() - started)
+            else:
+                perf_metrics.increment(f"llm.{agent}.errors")
+
+            attempt += 1
+            delay = _backoff_delay(attempt, e)
+            if attempt > max_retries or time.monotonic() + delay >= deadline:
+                raise
+
+            perf_metrics.increment(f"llm.{agent}.retries")
+            print(f"[LLM 재시도] {agent} ({model}) {attempt}/{max_retries} - {delay:.2f}초 후 ({type(e).__name__})")
+            time.sleep(delay)
+            continue
+
+        elapsed = time.monotonic() - started
+        breaker.record_success()
+        perf_metrics.observe(f"llm.{agent}.latency", elapsed)
+        perf_metrics.observe(model_router.latency_metric(agent, model), elapsed)
+        if request.get('stream'):
+            return DeadlineStream(response, agent, deadline)
+        return response
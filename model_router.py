@@ -0,0 +1,137 @@
+"""
+청소년 인지 재구조화 챗봇 - 에이전트별 모델 라우팅
+
+각 에이전트의 기본 모델, 대체 모델, max_tokens, temperature를 model_routing.toml에서
+읽고, 최근 p95 지연시간이 SLO를 넘으면 대체 모델로 자동 전환합니다.
+"""
+
+import os
+import random
+import threading
+import tomllib
+
+import perf_metrics
+from settings import get_setting
+
+
+# 설정 파일이 없을 때 사용하는 기본 라우팅 (model_routing.toml과 동일)
+DEFAULT_ROUTES = {
+    'stage_reply': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 500, 'temperature': 0.7, 'slo_p95': 10.0},
+    'restructuring_reply': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 500, 'temperature': 0.7, 'slo_p95': 10.0},
+    'collection_evaluator': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 200, 'temperature': 0.3, 'slo_p95': 5.0},
+    'elb_extractor': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 800, 'temperature': 0.5, 'slo_p95': 20.0},
+    'distortion_evaluator': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 500, 'temperature': 0.3, 'slo_p95': 8.0},
+    'distortion_extractor': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 1500, 'temperature': 0.5, 'slo_p95': 30.0},
+    'method_selector': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 800, 'temperature': 0.5, 'slo_p95': 15.0},
+    'quick_replies': {'primary': "gpt-4o", 'fallbacks': ["gpt-4o-mini"], 'max_tokens': 500, 'temperature': 0.8, 'slo_p95': 8.0},
+    'safety': {'primary': "gpt-4o-mini", 'fallbacks': [], 'temperature': 0.3},
+    'json_repair': {'primary': "gpt-4o-mini", 'fallbacks': [], 'max_tokens': 1500, 'temperature': 0.0}
+}
+
+DEFAULT_OPTIONS = {
+    'min_samples': 20,
+    'probe_rate': 0.05
+}
+
+# 요청 인자로 전달하는 라우팅 항목
+REQUEST_PARAMS = ('max_tokens', 'temperature')
+
+_routes = None
+_options = None
+_lock = threading.Lock()
+
+
+def load_routes():
+    """라우팅 설정 파일 로드 (기본 라우팅 위에 덮어쓰기)"""
+    path = get_setting("MODEL_ROUTING_FILE", "model_routing.toml")
+
+    routes = {agent: dict(route) for agent, route in DEFAULT_ROUTES.items()}
+    options = dict(DEFAULT_OPTIONS)
+
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                config = tomllib.load(f)
+
+            options.update(config.get('defaults', {}))
+            for agent, route in config.get('agents', {}).items():
+                routes.setdefault(agent, {}).update(route)
+
+            print(f"✅ 모델 라우팅 설정 로드: {path}")
+        except Exception as e:
+            print(f"⚠️ 모델 라우팅 설정 로드 실패 ({path}): {e} - 기본 라우팅 사용")
+    else:
+        print(f"ℹ️ 모델 라우팅 설정 파일 없음 ({path}) - 기본 라우팅 사용")
+
+    return routes, options
+
+
+def get_route(agent):
+    """에이전트 라우팅 정보"""
+    global _routes, _options
+
+    if _routes is None:
+        with _lock:
+            if _routes is None:
+                _routes, _options = load_routes()
+
+    return _routes.get(agent) or _routes['stage_reply']
+
+
+def get_option(name):
+    """라우팅 공통 옵션 (min_samples, probe_rate)"""
+    get_route('stage_reply')
+    return _options.get(name, DEFAULT_OPTIONS.get(name))
+
+
+def latency_metric(agent, model):
+    """에이전트 × 모델별 지연시간 지표 이름"""
+    return f"llm.{agent}.latency.{model}"
+
+
+def within_slo(agent, model, slo):
+    """최근 p95가 SLO 이내인지 (샘플이 부족하면 이내로 간주)"""
+    metric = latency_metric(agent, model)
+    if perf_metrics.sample_count(metric) < get_option('min_samples'):
+        return True
+    return perf_metrics.percentile(metric, 95) <= slo
+
+
+def select_models(agent):
+    """
+    호출할 모델 후보를 우선순위 순으로 반환
+
+    primary의 p95가 SLO를 넘으면 SLO 이내인 대체 모델을 앞으로 보냅니다.
+    대체 중에도 probe_rate 비율만큼은 primary로 보내 회복 여부를 확인합니다.
+    """
+    route = get_route(agent)
+    primary = route['primary']
+    candidates = [primary] + [m for m in route.get('fallbacks', []) if m != primary]
+
+    slo = route.get('slo_p95')
+    if not slo or len(candidates) == 1:
+        return candidates
+
+    healthy = [m for m in candidates if within_slo(agent, m, slo)]
+    ordered = healthy + [m for m in candidates if m not in healthy]
+
+    if ordered[0] != primary:
+        if random.random() < get_option('probe_rate'):
+            perf_metrics.increment(f"llm.{agent}.slo_probe")
+            return [primary] + [m for m in ordered if m != primary]
+
+        perf_metrics.increment(f"llm.{agent}.slo_fallback")
+        perf_metrics.set_gauge(f"llm.route.{agent}", ordered[0])
+    else:
+        perf_metrics.set_gauge(f"llm.route.{agent}", primary)
+
+    return ordered
+
+
+def build_request(agent, model, request):
+    """라우팅 값(max_tokens, temperature)을 채운 요청 인자 (호출 측 값이 우선)"""
+    route = get_route(agent)
+    params = {name: route[name] for name in REQUEST_PARAMS if name in route}
+    params.update(request)
+    params['model'] = model
+    return params
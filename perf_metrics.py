@@ -0,0 +1,92 @@
+"""
+청소년 인지 재구조화 챗봇 - 프로세스 전역 성능 지표 (카운터, 게이지, 최근 지연시간 샘플)
+"""
+
+import threading
+from collections import defaultdict, deque
+
+
+# 지표별로 보관하는 최근 샘플 수
+SAMPLE_WINDOW = 500
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_samples = defaultdict(lambda: deque(maxlen=SAMPLE_WINDOW))
+
+
+def increment(name, value=1):
+    """카운터 증가"""
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name, value):
+    """게이지 값 설정 (현재 상태 표시용)"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    """지연시간 등 샘플 기록 (초 단위 권장)"""
+    with _lock:
+        _samples[name].append(value)
+
+
+def get_counter(name):
+    """카운터 값 조회"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def percentile(name, q):
+    """
+    최근 샘플의 백분위수 계산
+
+    Args:
+        name: 지표 이름
+        q: 백분위 (0-100)
+
+    Returns:
+        백분위 값 (샘플이 없으면 None)
+    """
+    with _lock:
+        values = sorted(_samples.get(name, ()))
+
+    if not values:
+        return None
+
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def sample_count(name):
+    """최근 샘플 개수"""
+    with _lock:
+        return len(_samples.get(name, ()))
+
+
+def snapshot():
+    """전체 지표 스냅샷 (표시/내보내기용)"""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        names = list(_samples.keys())
+
+    latency = {}
+    for name in names:
+        count = sample_count(name)
+        if count == 0:
+            continue
+        latency[name] = {
+            'count': count,
+            'p50': percentile(name, 50),
+            'p95': percentile(name, 95),
+            'p99': percentile(name, 99)
+        }
+
+    return {
+        'counters': counters,
+        'gauges': gauges,
+        'latency': latency
+    }
@@ -0,0 +1,161 @@
+"""
+청소년 인지 재구조화 챗봇 - 프롬프트 레지스트리 (메모리 캐시 + 수정 시각 기반 다시 읽기)
+
+prompt1~10 파일을 처음 한 번만 읽어 템플릿으로 미리 나눠 두고, 이후에는 메모리에서 바로 씁니다.
+파일 수정 시각(mtime)은 PROMPT_RELOAD_INTERVAL마다 한 번만 확인하며, 바뀐 파일만 다시 읽습니다
+(배포 중 프롬프트를 고치면 재시작 없이 반영).
+
+자리표시자({selected_persona}, {restructuring_method} 등)는 템플릿을 만들 때 위치를 미리 나눠 두므로
+렌더링은 문자열 이어 붙이기 한 번입니다. 값을 주지 않은 자리표시자와 JSON 예시의 중괄호는 그대로 둡니다.
+
+프롬프트 조립 시간은 prompt.assembly.<이름> 지표와 턴별 합계(reply_timing 로그)로 기록합니다.
+"""
+
+import os
+import re
+import threading
+import time
+
+import perf_metrics
+from settings import get_setting
+
+
+PROMPT_FILES = [
+    "prompt1.txt", "prompt2.txt", "prompt3.txt", "prompt4.txt", "prompt5.txt",
+    "prompt6.txt", "prompt7.txt", "prompt8.txt", "prompt9_persona.txt", "prompt10.txt"
+]
+
+# {소문자_이름} 형태만 자리표시자로 인식 (JSON 예시의 중괄호는 제외)
+_PLACEHOLDER = re.compile(r'\{([a-z_]+)\}')
+
+_registry = None
+_registry_lock = threading.Lock()
+
+# 세션 스크립트 스레드별 이번 턴 프롬프트 조립 시간 합계
+_turn_timing = threading.local()
+
+
+class PromptTemplate:
+    """자리표시자 위치를 미리 나눠 둔 프롬프트 템플릿"""
+
+    def __init__(self, text):
+        self.text = text
+        parts = _PLACEHOLDER.split(text)
+        self._literals = parts[0::2]
+        self._fields = parts[1::2]
+        self.placeholders = frozenset(self._fields)
+
+    def render(self, **values):
+        """자리표시자 채우기 (값이 없는 자리표시자는 그대로)"""
+        if not self._fields:
+            return self.text
+
+        pieces = [self._literals[0]]
+        for field, literal in zip(self._fields, self._literals[1:]):
+            value = values.get(field)
+            pieces.append(f"{{{field}}}" if value is None else str(value))
+            pieces.append(literal)
+        return "".join(pieces)
+
+
+class PromptRegistry:
+    """프롬프트 파일 캐시 (프로세스 전역, 세션 공유)"""
+
+    def __init__(self, directory=".", reload_interval=1.0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._entries = {}  # 파일 이름 → [템플릿, mtime, 마지막 확인 시각]
+        self._lock = threading.Lock()
+
+    def preload(self, names=PROMPT_FILES):
+        """프롬프트 파일 미리 읽기 (없는 파일은 건너뜀)"""
+        for name in names:
+            try:
+                self.get(name)
+            except OSError as e:
+                print(f"⚠️ 프롬프트 미리 읽기 실패: {name} ({e})")
+
+    def get(self, name):
+        """
+        프롬프트 템플릿 조회
+
+        Raises:
+            FileNotFoundError: 프롬프트 파일이 없을 때
+        """
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is not None and now - entry[2] < self.reload_interval:
+            return entry[0]
+
+        with self._lock:
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                self._entries.pop(name, None)
+                raise
+
+            entry = self._entries.get(name)
+            if entry is None or entry[1] != mtime:
+                with open(path, 'r', encoding='utf-8') as f:
+                    template = PromptTemplate(f.read())
+                perf_metrics.increment("prompt.reloads" if entry is not None else "prompt.loads")
+                if entry is not None:
+                    print(f"[프롬프트] 변경 감지 - 다시 읽음: {name}")
+                entry = [template, mtime, now]
+                self._entries[name] = entry
+            else:
+                entry[2] = now
+
+        return entry[0]
+
+
+def get_registry():
+    """프로세스 공유 레지스트리 (처음 호출 시 생성 + 전체 미리 읽기)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = PromptRegistry(reload_interval=get_setting("PROMPT_RELOAD_INTERVAL", 1.0, float))
+                registry.preload()
+                _registry = registry
+    return _registry
+
+
+def get_text(name):
+    """프롬프트 원문 (FileNotFoundError 그대로 전달)"""
+    return get_registry().get(name).text
+
+
+def render(name, **values):
+    """프롬프트 자리표시자 채우기 (FileNotFoundError 그대로 전달)"""
+    return get_registry().get(name).render(**values)
+
+
+# ========== 조립 시간 ==========
+
+def reset_turn_timing():
+    """새 턴 시작 시 조립 시간 합계 초기화"""
+    _turn_timing.assembly = 0.0
+
+
+def turn_assembly_time():
+    """이번 턴 프롬프트 조립 시간 합계 (초, 현재 스레드)"""
+    return getattr(_turn_timing, 'assembly', 0.0)
+
+
+def assemble(name, build, *args):
+    """
+    프롬프트 조립 + 소요 시간 기록
+
+    Args:
+        name: 지표 이름 (prompt.assembly.<name>)
+        build: 프롬프트 조립 함수
+    """
+    started = time.perf_counter()
+    try:
+        return build(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        perf_metrics.observe(f"prompt.assembly.{name}", elapsed)
+        _turn_timing.assembly = turn_assembly_time() + elapsed
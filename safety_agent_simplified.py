@@ -2,24 +2,106 @@
 안전 모니터링 에이전트 - Level 5만 경고 (수정판)
 """
 
-import openai
 import json
+import threading
 import streamlit as st
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from llm_client import chat_completion
+from crisis_matcher import find_crisis_keywords
+import safety_log_writer
+import prompt_registry
+
+
+# 위험도 이력 보관 개수 (세션 길이와 무관하게 고정)
+RISK_HISTORY_CAPACITY = 8
+
+# 위험도 범위
+MAX_RISK_LEVEL = 5
+
+# 상승 패턴: 연속 횟수 / 최근 N회 중 횟수 (Level 4 이상 - Level 5는 바로 응급 모드로 전환되므로
+# 반복해서 관찰되는 신호는 Level 4)
+ESCALATION_LEVEL = 4
+ESCALATION_STREAK = 3
+ESCALATION_WINDOW = 5
+ESCALATION_IN_WINDOW = 3
+
+
+class RiskHistory:
+    """
+    고정 크기 위험도 이력 (링 버퍼, 위험도·범주만 저장 - 메시지 원문은 저장하지 않음)
+    
+    안전 선별과 안전 평가 캐시가 최근 위험도를 확인할 때 사용합니다.
+    추가할 때마다 위험도별 연속 횟수와 최근 ESCALATION_WINDOW회 중 위험도별 횟수를 갱신하므로
+    (창에서 빠지는 판정은 빼고) 상승 패턴 판정은 이력 길이와 무관하게 상수 시간입니다.
+    """
+    
+    def __init__(self, capacity: int = RISK_HISTORY_CAPACITY):
+        self.capacity = max(capacity, ESCALATION_WINDOW)
+        self._levels = [0] * self.capacity
+        self._categories = ['NONE'] * self.capacity
+        self._count = 0  # 지금까지 추가된 전체 개수 (다음 위치 = _count % capacity)
+        self._streaks = [0] * (MAX_RISK_LEVEL + 1)  # 위험도 l 이상 연속 횟수
+        self._window_counts = [0] * (MAX_RISK_LEVEL + 1)  # 최근 창 안의 위험도별 횟수
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+    
+    def append(self, risk_level: int, category: str):
+        """판정 1건 추가 (LLM 평가는 백그라운드 스레드에서도 추가)"""
+        risk_level = min(max(risk_level, 1), MAX_RISK_LEVEL)
+        with self._lock:
+            # 창에서 빠지는 판정 (ESCALATION_WINDOW번째 전)
+            if self._count >= ESCALATION_WINDOW:
+                leaving = self._levels[(self._count - ESCALATION_WINDOW) % self.capacity]
+                self._window_counts[leaving] -= 1
+            
+            index = self._count % self.capacity
+            self._levels[index] = risk_level
+            self._categories[index] = category
+            self._count += 1
+            
+            self._window_counts[risk_level] += 1
+            for level in range(1, MAX_RISK_LEVEL + 1):
+                self._streaks[level] = self._streaks[level] + 1 if risk_level >= level else 0
+    
+    def streak(self, level: int) -> int:
+        """위험도 level 이상이 연속된 횟수 (가장 최근 판정부터)"""
+        return self._streaks[level]
+    
+    def count_in_window(self, level: int) -> int:
+        """최근 ESCALATION_WINDOW회 중 위험도 level 이상 횟수"""
+        return sum(self._window_counts[level:])
+    
+    def recent_levels(self, n: int) -> List[int]:
+        """최근 n개 위험도 (오래된 순, n은 capacity 이하)"""
+        n = min(n, len(self))
+        return [self._levels[(self._count - n + i) % self.capacity] for i in range(n)]
+    
+    def max_recent(self, n: int) -> int:
+        """최근 n개 중 최고 위험도 (이력이 없으면 1)"""
+        return max(self.recent_levels(n), default=1)
+    
+    def last(self) -> Optional[Dict]:
+        """가장 최근 판정 ({'risk_level', 'category'}, 없으면 None)"""
+        if self._count == 0:
+            return None
+        index = (self._count - 1) % self.capacity
+        return {'risk_level': self._levels[index], 'category': self._categories[index]}
 
 
 class SafetyAgent:
     """실시간 안전 모니터링 에이전트"""
     
-    def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
-        self.risk_history = []  # 위험도 이력
+    def __init__(self):
+        # 클라이언트는 소유하지 않고 프로세스 공유 클라이언트 사용
+        self.risk_history = RiskHistory()  # 위험도 이력 (고정 크기)
         
     def load_prompt(self) -> str:
-        """Prompt 10 로드"""
+        """Prompt 10 로드 (프롬프트 레지스트리 캐시 - 메시지마다 파일을 읽지 않음)"""
         try:
-            with open('prompt10.txt', 'r', encoding='utf-8') as f:
-                return f.read()
+            return prompt_registry.get_text('prompt10.txt')
         except FileNotFoundError:
             st.error("⚠️ prompt10.txt 파일을 찾을 수 없습니다.")
             return ""
@@ -58,30 +140,34 @@ class SafetyAgent:
 """
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = chat_completion(
+                'safety',
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": analysis_request}
                 ],
-                temperature=0.3,  # 일관성 있는 평가
                 response_format={"type": "json_object"}
             )
             
             result = json.loads(response.choices[0].message.content)
             
             # 이력에 추가
-            self.risk_history.append({
-                'message': user_message,
-                'risk_level': result.get('risk_level', 1),
-                'category': result.get('risk_category', 'NONE')
-            })
+            self.record_risk(result)
             
             return result
             
         except Exception as e:
             st.error(f"⚠️ 안전 평가 중 오류: {str(e)}")
-            return self._get_default_assessment()
+            assessment = self._get_default_assessment()
+            assessment['error'] = str(e)
+            return assessment
+    
+    def record_risk(self, assessment: Dict):
+        """위험도 이력에 추가 (LLM 평가 없이 통과한 메시지, 로컬 판정 포함)"""
+        self.risk_history.append(
+            assessment.get('risk_level', 1),
+            assessment.get('risk_category', 'NONE')
+        )
     
     def _get_default_assessment(self) -> Dict:
         """기본 평가 결과 (오류 시)"""
@@ -100,25 +186,20 @@ class SafetyAgent:
     
     def check_escalation_pattern(self) -> Tuple[bool, str]:
         """
-        위험도 상승 패턴 감지 - Level 5만 추적
+        위험도 상승 패턴 감지 - Level 4 이상 반복
         
         Returns:
             (패턴 감지 여부, 경고 메시지)
         """
-        if len(self.risk_history) < 3:
-            return False, ""
-        
-        recent_levels = [h['risk_level'] for h in self.risk_history[-5:]]
+        history = self.risk_history
         
-        # 3회 연속 Level 5
-        if len(recent_levels) >= 3 and all(level >= 5 for level in recent_levels[-3:]):
-            return True, "🚨 3회 연속 긴급 위험도 감지. 즉시 전문가 상담이 필요합니다."
+        # 3회 연속 Level 4 이상
+        if history.streak(ESCALATION_LEVEL) >= ESCALATION_STREAK:
+            return True, "🚨 3회 연속 높은 위험도 감지. 즉시 전문가 상담이 필요합니다."
         
-        # 5회 중 3회 이상 Level 5
-        if len(recent_levels) >= 5:
-            critical_count = sum(1 for level in recent_levels[-5:] if level >= 5)
-            if critical_count >= 3:
-                return True, "🚨 반복적인 긴급 위험도 감지. 전문가 상담을 강력히 권장합니다."
+        # 5회 중 3회 이상 Level 4 이상
+        if history.count_in_window(ESCALATION_LEVEL) >= ESCALATION_IN_WINDOW:
+            return True, "🚨 반복적인 높은 위험도 감지. 전문가 상담을 강력히 권장합니다."
         
         return False, ""
     
@@ -207,16 +288,9 @@ def check_crisis_keywords(text: str) -> bool:
         text: 체크할 텍스트
         
     Returns:
-        위기 키워드 포함 여부
+        위기 키워드 포함 여부 (crisis_matcher의 정규화 + 컴파일된 키워드 사전 사용)
     """
-    CRISIS_KEYWORDS = [
-        '죽고 싶', '자살', '자해', '끝내고 싶',
-        '사라지고 싶', '목숨', '유서',
-        '칼로 긋', '약을 먹', '뛰어내리',
-        '목을 매', '손목을'
-    ]
-    
-    return any(keyword in text for keyword in CRISIS_KEYWORDS)
+    return bool(find_crisis_keywords(text))
 
 
 def display_emergency_screen():
@@ -285,7 +359,7 @@ def display_emergency_screen():
 
 def log_safety_assessment(assessment: Dict, user_id: str = "anonymous"):
     """
-    안전 평가 로그 저장 (Level 5만)
+    안전 평가 로그 저장 (Level 5만, safety_log_writer로 비동기 기록)
     
     Args:
         assessment: 평가 결과
@@ -306,8 +380,5 @@ def log_safety_assessment(assessment: Dict, user_id: str = "anonymous"):
             'risk_factors': assessment.get('risk_factors', [])
         }
         
-        try:
-            with open('high_risk_logs.json', 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
-        except Exception as e:
-            st.error(f"로그 저장 오류: {str(e)}")
+        # 큐에만 넣고 바로 반환 (기록·fsync·회전은 전용 스레드가 처리)
+        safety_log_writer.submit(log_entry)
@@ -0,0 +1,150 @@
+"""
+청소년 인지 재구조화 챗봇 - 안전 평가 결과 캐시 (LRU + TTL)
+
+"응", "몰라", 빠른 답변 버튼 문구, 재실행으로 다시 보낸 메시지처럼 같은 메시지가 같은 맥락에서
+반복되면 LLM 안전 평가를 다시 호출하지 않고 이전 판정을 사용합니다.
+
+- 키: 정규화한 현재 메시지(crisis_matcher.normalize) + analyze_risk가 보는 최근 대화 맥락의 해시
+  (원문은 저장하지 않음)
+- 저장: 오류 없이 받은 LLM 판정 중 위험도 SAFETY_CACHE_MAX_LEVEL 이하만
+- 조회 생략: 위기 키워드가 있거나 최근 위험도가 높았던 경우 (상승 패턴 감지는 항상 LLM 판정 기준)
+
+적중률은 safety.cache.* 지표로 확인합니다.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import perf_metrics
+from crisis_matcher import find_crisis_keywords, normalize
+from safety_screening import CONTEXT_LEVEL, CONTEXT_TURNS
+from settings import get_setting
+
+
+# analyze_risk가 보는 최근 대화 수 (현재 메시지 포함)
+CONTEXT_MESSAGES = 5
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def is_cache_enabled():
+    """안전 평가 캐시 사용 여부 (SAFETY_CACHE 설정)"""
+    return get_setting("SAFETY_CACHE", False, bool)
+
+
+def cache_key(user_message, conversation_history):
+    """
+    정규화한 현재 메시지 + 맥락 해시
+
+    Args:
+        user_message: 현재 사용자 메시지
+        conversation_history: 현재 메시지를 마지막에 포함한 대화 이력
+    """
+    digest = hashlib.sha256(normalize(user_message).encode('utf-8'))
+    for msg in conversation_history[-CONTEXT_MESSAGES:-1]:
+        digest.update(b'\x00')
+        digest.update(f"{msg['role']}:{normalize(msg['content'])}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SafetyVerdictCache:
+    """저위험 안전 평가 결과 LRU + TTL 캐시 (프로세스 전역, 세션 공유)"""
+
+    def __init__(self, max_entries=1024, ttl=600.0, max_level=2):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_level = max_level
+        self.entries = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        캐시된 판정 조회
+
+        Returns:
+            dict 또는 None (없음 / 만료)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            item = self.entries.get(key)
+            if item is not None and now - item[0] > self.ttl:
+                del self.entries[key]
+                item = None
+                perf_metrics.increment("safety.cache.expired")
+
+            if item is None:
+                perf_metrics.increment("safety.cache.miss")
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                perf_metrics.increment("safety.cache.hit")
+            perf_metrics.set_gauge("safety.cache.hit_rate", round(self.hits / self.lookups, 4))
+
+        return copy.deepcopy(item[1]) if item is not None else None
+
+    def put(self, key, assessment):
+        """저위험 판정만 저장 (가장 오래 쓰지 않은 항목부터 제거)"""
+        if assessment.get('error') or assessment.get('risk_level', 1) > self.max_level:
+            return False
+
+        with self._lock:
+            self.entries[key] = (time.monotonic(), copy.deepcopy(assessment))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            perf_metrics.set_gauge("safety.cache.size", len(self.entries))
+        return True
+
+
+def get_cache():
+    """프로세스 공유 캐시 (처음 호출 시 생성)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SafetyVerdictCache(
+                    max_entries=get_setting("SAFETY_CACHE_SIZE", 1024, int),
+                    ttl=get_setting("SAFETY_CACHE_TTL", 600.0, float),
+                    max_level=get_setting("SAFETY_CACHE_MAX_LEVEL", 2, int)
+                )
+    return _cache
+
+
+def lookup(user_message, conversation_history, risk_history):
+    """
+    LLM 안전 평가 대신 쓸 캐시 판정 조회
+
+    Args:
+        user_message: 현재 사용자 메시지
+        conversation_history: 현재 메시지를 마지막에 포함한 대화 이력
+        risk_history: SafetyAgent.risk_history (RiskHistory)
+
+    Returns:
+        dict 또는 None ('source': 'cache')
+    """
+    if not is_cache_enabled():
+        return None
+
+    # 위험 신호가 있으면 항상 새 LLM 판정
+    if find_crisis_keywords(user_message) or risk_history.max_recent(CONTEXT_TURNS) >= CONTEXT_LEVEL:
+        perf_metrics.increment("safety.cache.bypass")
+        return None
+
+    assessment = get_cache().get(cache_key(user_message, conversation_history))
+    if assessment is not None:
+        assessment['source'] = 'cache'
+    return assessment
+
+
+def store(user_message, conversation_history, assessment):
+    """LLM 판정 저장 (저위험만)"""
+    if not is_cache_enabled():
+        return
+    get_cache().put(cache_key(user_message, conversation_history), assessment)
@@ -0,0 +1,82 @@
+"""
+청소년 인지 재구조화 챗봇 - LLM 안전 평가를 제시간에 받지 못했을 때의 로컬 판정
+
+LLM 안전 평가가 SAFETY_VERDICT_BUDGET 안에 오지 않거나 오류로 끝나면, 기본값(Level 1)으로
+통과시키지 않고 로컬 신호로 위험도를 판정합니다.
+
+- 위기 키워드 (crisis_matcher): Level 4 (Level 5 키워드면 상담 전화 안내 표시)
+- 위험 단서 점수 (safety_screening): Level 4 단서 → 3, 그 밖의 단서 → 2
+- 최근 위험도 이력: 직전 판정이 4 이상이면 이번 메시지도 최소 4 (LLM 확인 전까지)
+- 하루 점수 (user_info['emotion_intensity']): 8 이상이고 단서가 있으면 한 단계 상향 (최대 4)
+
+로컬 판정은 최대 Level 4입니다. 키워드 오탐 하나로 응급 모드(세션 종료)가 되지 않도록
+Level 5 전환은 늦게 도착한 LLM 판정(collect_safety_reconciliation)이 결정합니다.
+"""
+
+from safety_screening import CONTEXT_TURNS, score_message
+
+
+# 하루 점수(0~10) 상향 기준
+HIGH_INTENSITY = 8
+
+# 위험 단서 점수 → 위험도 (Level 4 단서 1개 = 0.6)
+CUE_LEVELS = [(0.6, 3), (0.15, 2)]
+
+RISK_CATEGORIES = {5: 'CRITICAL', 4: 'HIGH', 3: 'MODERATE', 2: 'LOW', 1: 'NONE'}
+
+# 로컬 판정 최고 위험도 (Level 5는 LLM 판정만)
+MAX_LOCAL_LEVEL = 4
+
+
+def local_verdict(user_message, risk_history, user_info, llm_status):
+    """
+    로컬 신호 기반 안전 판정 (LLM 평가와 같은 형식)
+
+    Args:
+        user_message: 사용자 메시지
+        risk_history: SafetyAgent.risk_history (RiskHistory)
+        user_info: 사용자 정보 (emotion_intensity)
+        llm_status: LLM 평가 상태 ('timeout' / 'error')
+
+    Returns:
+        dict: 평가 결과 ('source': 'local_fallback')
+    """
+    score, keyword_level, cues = score_message(user_message)
+    risk_factors = []
+
+    level = 1
+    if keyword_level:
+        level = min(keyword_level, MAX_LOCAL_LEVEL)
+        risk_factors.append(f"위기 키워드 (Level {keyword_level}, LLM 확인 전)")
+
+    cue_level = next((lvl for min_score, lvl in CUE_LEVELS if score >= min_score), 1)
+    if cue_level > level:
+        level = cue_level
+    if cues:
+        risk_factors.append(f"위험 단서 (점수 {score:.2f})")
+
+    recent = risk_history.max_recent(CONTEXT_TURNS)
+    if recent >= 4 and level < 4:
+        level = 4
+        risk_factors.append(f"최근 위험도 Level {recent}")
+
+    intensity = (user_info or {}).get('emotion_intensity', 0)
+    if intensity >= HIGH_INTENSITY and 2 <= level < 4:
+        level += 1
+        risk_factors.append(f"하루 점수 {intensity}/10")
+
+    return {
+        "risk_level": level,
+        "risk_category": RISK_CATEGORIES[level],
+        "detected_keywords": cues,
+        "risk_factors": risk_factors,
+        "protective_factors": [],
+        "immediate_action_required": False,
+        "recommended_response": "",
+        "follow_up_needed": level >= 3,
+        "alert_guardian": False,
+        "session_should_end": False,
+        "show_crisis_resources": keyword_level >= 5,
+        "source": "local_fallback",
+        "llm_status": llm_status
+    }
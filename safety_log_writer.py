@@ -0,0 +1,281 @@
+"""
+청소년 인지 재구조화 챗봇 - 고위험 안전 로그 비동기 기록기 (high_risk_logs.json)
+
+위기 턴이 디스크를 기다리지 않도록 로그는 큐에 넣기만 하고, 전용 스레드 하나가 모아서 기록합니다.
+
+- 그룹 커밋: SAFETY_LOG_FSYNC_INTERVAL 동안 쌓인 로그를 한 번에 쓰고 fsync
+- 회전: SAFETY_LOG_MAX_BYTES를 넘거나 (SAFETY_LOG_ROTATE_DAILY) 날짜가 바뀌면 새 파일
+- 색인: <로그 이름>.index.json에 user_id → 날짜 → 파일별 바이트 위치 기록
+  (한 사용자/하루 조회 시 전체 로그를 읽지 않음)
+
+조회 / 색인 재구성:
+    python safety_log_writer.py --user anonymous --date 2026-10-18
+    python safety_log_writer.py --rebuild-index
+"""
+
+import argparse
+import atexit
+import datetime
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import perf_metrics
+from settings import get_setting
+
+
+DEFAULT_LOG_PATH = "high_risk_logs.json"
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _index_path(log_path):
+    root, _ = os.path.splitext(log_path)
+    return f"{root}.index.json"
+
+
+def _load_index(log_path):
+    try:
+        with open(_index_path(log_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_index(log_path, index):
+    """색인 원자적 저장 (임시 파일 → 교체)"""
+    path = _index_path(log_path)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _add_to_index(index, entry, file_name, offset):
+    user = index.setdefault(entry.get('user_id', 'anonymous'), {})
+    date = user.setdefault(entry.get('timestamp', '')[:10], {})
+    date.setdefault(file_name, []).append(offset)
+
+
+class SafetyLogWriter:
+    """고위험 로그 그룹 커밋 기록기 (프로세스 전역 1개, 전용 스레드)"""
+
+    def __init__(self, path=DEFAULT_LOG_PATH, queue_size=1024, fsync_interval=1.0,
+                 max_bytes=10 * 1024 * 1024, rotate_daily=False):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.entries = queue.Queue(maxsize=queue_size)
+        self.index = _load_index(path)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="safety-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry):
+        """
+        로그 1건 등록 (대기하지 않음)
+
+        Returns:
+            bool: 등록 여부 (큐가 가득 차면 False)
+        """
+        try:
+            self.entries.put_nowait(entry)
+        except queue.Full:
+            perf_metrics.increment("safety_log.dropped")
+            print(f"⚠️ 안전 로그 큐가 가득 차 기록하지 못했습니다: {entry.get('timestamp')}")
+            return False
+
+        perf_metrics.set_gauge("safety_log.queue_depth", self.entries.qsize())
+        return True
+
+    def _next_batch(self):
+        """첫 로그를 기다린 뒤 fsync 간격 동안 모으기"""
+        try:
+            batch = [self.entries.get(timeout=self.fsync_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.fsync_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.entries.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._closed.is_set() and self.entries.empty()):
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    perf_metrics.increment("safety_log.errors")
+                    print(f"⚠️ 안전 로그 기록 오류: {e}")
+
+    def _should_rotate(self, size):
+        if size >= self.max_bytes:
+            return True
+        if self.rotate_daily and size > 0:
+            modified = datetime.date.fromtimestamp(os.path.getmtime(self.path))
+            return modified != datetime.date.today()
+        return False
+
+    def _rotate(self):
+        """현재 파일을 타임스탬프 이름으로 옮기고 색인의 파일 이름도 변경"""
+        root, ext = os.path.splitext(self.path)
+        stamp = f"{datetime.datetime.now():%Y%m%d-%H%M%S}"
+        rotated = f"{root}.{stamp}{ext}"
+        seq = 1
+        while os.path.exists(rotated):
+            rotated = f"{root}.{stamp}-{seq}{ext}"
+            seq += 1
+        os.replace(self.path, rotated)
+
+        active = os.path.basename(self.path)
+        for dates in self.index.values():
+            for files in dates.values():
+                if active in files:
+                    files[os.path.basename(rotated)] = files.pop(active)
+
+        perf_metrics.increment("safety_log.rotations")
+        print(f"[안전 로그] 회전: {rotated}")
+
+    def _commit(self, batch):
+        """로그 묶음을 한 번에 쓰고 fsync 후 색인 갱신"""
+        started = time.monotonic()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if self._should_rotate(size):
+            self._rotate()
+            size = 0
+
+        lines = [(json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8') for entry in batch]
+        with open(self.path, 'ab') as f:
+            f.write(b''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+        file_name = os.path.basename(self.path)
+        offset = size
+        for entry, line in zip(batch, lines):
+            _add_to_index(self.index, entry, file_name, offset)
+            offset += len(line)
+        _save_index(self.path, self.index)
+
+        perf_metrics.observe("safety_log.commit", time.monotonic() - started)
+        perf_metrics.observe("safety_log.batch_size", len(batch))
+        perf_metrics.increment("safety_log.written", len(batch))
+
+    def close(self, timeout=5.0):
+        """남은 로그를 기록하고 종료 (프로세스 종료 시)"""
+        self._closed.set()
+        self._thread.join(timeout)
+
+
+def get_writer():
+    """프로세스 공유 기록기 (처음 호출 시 생성)"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SafetyLogWriter(
+                    path=get_setting("SAFETY_LOG_PATH", DEFAULT_LOG_PATH),
+                    queue_size=get_setting("SAFETY_LOG_QUEUE_SIZE", 1024, int),
+                    fsync_interval=get_setting("SAFETY_LOG_FSYNC_INTERVAL", 1.0, float),
+                    max_bytes=get_setting("SAFETY_LOG_MAX_BYTES", 10 * 1024 * 1024, int),
+                    rotate_daily=get_setting("SAFETY_LOG_ROTATE_DAILY", False, bool)
+                )
+                atexit.register(_writer.close)
+    return _writer
+
+
+def submit(entry):
+    """고위험 로그 1건 비동기 기록 요청"""
+    return get_writer().submit(entry)
+
+
+# ========== 조회 ==========
+
+def read_entries(user_id=None, date=None, path=None):
+    """
+    색인으로 해당 사용자/날짜의 로그만 읽기
+
+    Args:
+        user_id: 사용자 ID (None이면 전체)
+        date: 'YYYY-MM-DD' (None이면 전체)
+        path: 로그 파일 경로 (기본: SAFETY_LOG_PATH)
+
+    Returns:
+        list[dict]: 로그 항목 (파일·기록 순)
+    """
+    path = path or get_setting("SAFETY_LOG_PATH", DEFAULT_LOG_PATH)
+    directory = os.path.dirname(path)
+    index = _load_index(path)
+
+    offsets = {}
+    for user, dates in index.items():
+        if user_id is not None and user != user_id:
+            continue
+        for day, files in dates.items():
+            if date is not None and day != date:
+                continue
+            for file_name, positions in files.items():
+                offsets.setdefault(file_name, []).extend(positions)
+
+    entries = []
+    for file_name in sorted(offsets):
+        with open(os.path.join(directory, file_name), 'rb') as f:
+            for offset in sorted(offsets[file_name]):
+                f.seek(offset)
+                entries.append(json.loads(f.readline()))
+    return entries
+
+
+def rebuild_index(path=None):
+    """로그 파일(회전된 파일 포함)을 모두 읽어 색인 다시 만들기"""
+    path = path or get_setting("SAFETY_LOG_PATH", DEFAULT_LOG_PATH)
+    root, ext = os.path.splitext(path)
+    index = {}
+    count = 0
+
+    for file in sorted(glob.glob(f"{root}.*{ext}")) + [path]:
+        if file == _index_path(path) or not os.path.exists(file):
+            continue
+        offset = 0
+        with open(file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    _add_to_index(index, json.loads(line), os.path.basename(file), offset)
+                    count += 1
+                offset += len(line)
+
+    _save_index(path, index)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="고위험 안전 로그 조회 / 색인 재구성")
+    parser.add_argument("--path", help="로그 파일 경로 (기본: SAFETY_LOG_PATH)")
+    parser.add_argument("--user", help="사용자 ID")
+    parser.add_argument("--date", help="날짜 (YYYY-MM-DD)")
+    parser.add_argument("--rebuild-index", action="store_true", help="로그 파일로 색인 다시 만들기")
+    args = parser.parse_args()
+
+    if args.rebuild_index:
+        print(f"✅ 색인 재구성 완료: {rebuild_index(args.path)}건")
+        return
+
+    for entry in read_entries(args.user, args.date, args.path):
+        print(json.dumps(entry, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+청소년 인지 재구조화 챗봇 - 안전 평가 단계별 선별 (명백히 안전한 메시지는 LLM 평가 생략)
+
+1단계: 위기 키워드(crisis_matcher) + 위험 단서 어휘 모델로 메시지 점수 계산 (수십 마이크로초)
+2단계: 점수가 임계값 이상이거나 최근 위험도가 높았던 경우에만 LLM 안전 평가(prompt10) 호출
+
+"응", 빠른 답변 버튼 문구처럼 단서가 없는 메시지는 바로 Level 1로 통과시키고, 그중 일부
+(SAFETY_AUDIT_RATE)는 감사용으로 LLM 평가도 받습니다. SAFETY_SCREENING_LOG를 지정하면
+선별 점수와 LLM 판정을 기록하며, calibrate_safety_screening.py로 임계값별 재현율을 확인합니다.
+
+선별 기록에는 메시지 원문 대신 정규화한 메시지의 해시, 감지된 단서(사전의 대표 표현), 점수만 남깁니다.
+원문은 SAFETY_SCREENING_LOG_TEXT=true일 때만 기록합니다 (단서 사전을 고친 뒤 다시 점수를 매기려면 필요).
+"""
+
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+
+import perf_metrics
+from crisis_matcher import CRISIS_PATTERNS, CrisisMatcher, find_crisis_keywords, normalize
+from settings import get_setting
+
+
+# 위험 단서 (대표 표현, 위험도, 범주, 변형 표현) - prompt10.txt의 Level 2~4 키워드 + 특별 주의 패턴
+RISK_CUES = [
+    # Level 4: 소극적 자살 사고 / 심각한 우울 / 고립
+    ('사라지', 4, 'HIGH', ['없어지', '없어졌으면']),
+    ('희망이 없', 4, 'HIGH', ['희망이 안 보', '미래가 없']),
+    ('아무것도 하기 싫', 4, 'HIGH', ['의욕이 없', '의욕이 전혀', '아무 의미 없', '의미가 없', '다 귀찮']),
+    ('매일 울', 4, 'HIGH', ['맨날 울', '계속 울']),
+    ('일어날 수도 없', 4, 'HIGH', ['일어나기도 힘들', '침대에서 못 나']),
+    ('아무도 나를 이해', 4, 'HIGH', ['아무도 날 이해', '아무도 몰라', '아무도 안 만나']),
+    ('혼자야', 4, 'HIGH', ['나 혼자', '친구 없', '친구가 없']),
+    # 특별 주의 패턴: 구체적 계획 / 약물·알코올 / 폭력 / 자해 행동
+    ('오늘 밤에', 4, 'HIGH', ['옥상에 가', '준비했어', '방법을 찾']),
+    ('술을 마셨', 4, 'HIGH', ['술 마셨', '마약', '과다 복용']),
+    ('때리고 싶', 4, 'HIGH', ['복수하고 싶', '무기', '칼을 준비']),
+    ('벽에 박', 4, 'HIGH', ['머리를 박', '때렸어 나를', '나를 때리']),
+    ('폭력', 4, 'HIGH', ['학대', '괴롭힘을 당', '때려서', '두들겨 맞']),
+    # Level 3: 부정적 사고 / 감정 둔화 / 수면·식욕
+    ('쓸모없', 3, 'MODERATE', ['쓸모 없', '가치가 없', '필요 없는 사람']),
+    ('항상 실패', 3, 'MODERATE', ['맨날 실패', '다 망했']),
+    ('내 잘못', 3, 'MODERATE', ['제 잘못', '다 나 때문']),
+    ('아무 감정', 3, 'MODERATE', ['무감각', '아무렇지도 않']),
+    ('잠을 못', 3, 'MODERATE', ['잠이 안', '악몽', '자고만 싶', '계속 자고']),
+    ('먹고 싶지 않', 3, 'MODERATE', ['밥을 안', '입맛이 없', '계속 먹어']),
+    ('우울', 3, 'MODERATE', ['외로', '비참', '절망', '버려진', '괴로']),
+    # Level 2: 일상 스트레스 / 가벼운 불안 / 일시적 좌절
+    ('걱정', 2, 'LOW', ['불안', '긴장', '떨려', '무서']),
+    ('스트레스', 2, 'LOW', ['힘들', '지쳐', '속상', '서운']),
+    ('싸웠', 2, 'LOW', ['화나', '짜증', '울었', '혼났']),
+]
+
+# 단서 위험도별 가중치 (여러 단서는 noisy-OR로 결합: 1 - Π(1 - w))
+CUE_WEIGHTS = {4: 0.6, 3: 0.35, 2: 0.15}
+
+# 위기 키워드 위험도별 점수 (항상 LLM 평가 대상)
+KEYWORD_SCORES = {5: 1.0, 4: 0.9}
+
+# 최근 LLM 판정 중 이 위험도 이상이 있으면 단서가 없어도 LLM 평가 ("응"이 위험한 질문의 답일 수 있음)
+CONTEXT_LEVEL = 3
+CONTEXT_TURNS = 3
+
+# 단서는 놓치지 않는 쪽이 우선이므로 단어 경계 없이 매칭 (오탐 비용 = LLM 호출 1번)
+# 위기 키워드도 Level 4 단서로 포함 - 띄어쓰기 없이 쓴 "나자살할래"처럼 키워드 매처가 단어 경계 때문에
+# 인정하지 않은 경우에도 LLM 평가로 보냄
+_cue_matcher = CrisisMatcher(
+    RISK_CUES + [(keyword, 4, 'HIGH', variants) for keyword, _, _, variants in CRISIS_PATTERNS],
+    bounded_syllables=0
+)
+_log_lock = threading.Lock()
+
+
+def is_screening_enabled():
+    """안전 평가 단계별 선별 사용 여부 (SAFETY_SCREENING 설정)"""
+    return get_setting("SAFETY_SCREENING", False, bool)
+
+
+def score_message(user_message):
+    """
+    로컬 위험 점수 (0~1)
+
+    Returns:
+        (점수, 위기 키워드 최고 위험도 또는 0, 감지된 단서 목록)
+    """
+    keyword_hits = find_crisis_keywords(user_message)
+    keyword_level = max((hit['risk_level'] for hit in keyword_hits), default=0)
+
+    cues = _cue_matcher.find(user_message)
+    benign = 1.0
+    for cue in cues:
+        benign *= 1.0 - CUE_WEIGHTS.get(cue['risk_level'], 0.0)
+
+    score = max(KEYWORD_SCORES.get(keyword_level, 0.0), 1.0 - benign)
+    return score, keyword_level, [cue['keyword'] for cue in cues]
+
+
+def _recent_elevated(risk_history):
+    return risk_history.max_recent(CONTEXT_TURNS) >= CONTEXT_LEVEL
+
+
+def screen(user_message, risk_history):
+    """
+    LLM 안전 평가 필요 여부 판단
+
+    Args:
+        user_message: 사용자 메시지
+        risk_history: SafetyAgent.risk_history (RiskHistory, 최근 판정 맥락)
+
+    Returns:
+        dict: {'route': 'cleared' | 'audit' | 'llm', 'reason', 'score', 'keyword_level', 'cues',
+               'threshold', 'audit_rate', 'context_elevated'}
+    """
+    started = time.perf_counter()
+    score, keyword_level, cues = score_message(user_message)
+    threshold = get_setting("SAFETY_SCREENING_THRESHOLD", 0.15, float)
+    audit_rate = get_setting("SAFETY_AUDIT_RATE", 0.05, float)
+    context_elevated = _recent_elevated(risk_history)
+
+    if not is_screening_enabled():
+        route, reason = 'llm', 'disabled'
+    elif keyword_level:
+        route, reason = 'llm', 'keyword'
+    elif context_elevated:
+        route, reason = 'llm', 'context'
+    elif score >= threshold:
+        route, reason = 'llm', 'score'
+    elif random.random() < audit_rate:
+        route, reason = 'audit', 'sampled'
+    else:
+        route, reason = 'cleared', 'benign'
+
+    perf_metrics.observe("safety.screening", time.perf_counter() - started)
+    perf_metrics.increment(f"safety.screening.{route}")
+
+    return {
+        'route': route,
+        'reason': reason,
+        'score': round(score, 4),
+        'keyword_level': keyword_level,
+        'cues': cues,
+        'threshold': threshold,
+        'audit_rate': audit_rate,
+        'context_elevated': context_elevated
+    }
+
+
+def cleared_assessment(screening):
+    """LLM 평가 없이 통과한 메시지의 평가 결과 (LLM 응답과 같은 형식, Level 1)"""
+    return {
+        "risk_level": 1,
+        "risk_category": "NONE",
+        "detected_keywords": [],
+        "risk_factors": [],
+        "protective_factors": [],
+        "immediate_action_required": False,
+        "recommended_response": "",
+        "follow_up_needed": False,
+        "alert_guardian": False,
+        "session_should_end": False,
+        "source": "screening",
+        "screening_score": screening['score']
+    }
+
+
+def message_hash(user_message):
+    """정규화한 메시지의 SHA-256 (같은 메시지 묶기용, 원문은 저장하지 않음)"""
+    return hashlib.sha256(normalize(user_message).encode('utf-8')).hexdigest()
+
+
+def record(user_message, screening, assessment=None):
+    """
+    선별 결과 + LLM 판정 기록 (SAFETY_SCREENING_LOG, JSON Lines - 보정 리포트 입력)
+
+    메시지는 해시(message_hash)와 감지된 단서·점수로만 기록합니다.
+    SAFETY_SCREENING_LOG_TEXT=true이면 원문('message')도 함께 기록합니다 - 청소년의 대화 원문이
+    파일에 남으므로 보정용 데이터를 모으는 동안에만 켜고, 로그 파일 접근과 보관 기간을 관리하세요.
+
+    통과한 메시지는 LLM 판정 없이 기록되어 트래픽 비율 계산에만 쓰입니다.
+    LLM 평가가 오류로 끝난 경우(기본값 반환)는 판정으로 쓰지 않습니다.
+    """
+    path = get_setting("SAFETY_SCREENING_LOG", "")
+    if not path:
+        return
+    if assessment is not None and assessment.get('error'):
+        return
+
+    entry = {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'message_hash': message_hash(user_message),
+        **screening,
+        'llm_level': assessment.get('risk_level', 1) if assessment is not None else None,
+        'llm_category': assessment.get('risk_category') if assessment is not None else None
+    }
+    if get_setting("SAFETY_SCREENING_LOG_TEXT", False, bool):
+        entry['message'] = user_message
+
+    try:
+        with _log_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ 안전 선별 기록 실패: {e}")
@@ -0,0 +1,48 @@
+"""
+청소년 인지 재구조화 챗봇 - 런타임 설정 헬퍼 (Streamlit Secrets 우선, 환경변수 대체)
+"""
+
+import os
+import streamlit as st
+
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'on', 'y'}
+
+
+def get_setting(name, default=None, cast=str):
+    """
+    설정 값 가져오기
+
+    Args:
+        name: 설정 이름 (예: "OPENAI_MAX_CONNECTIONS")
+        default: 값이 없거나 변환 실패 시 기본값
+        cast: 변환 함수 (str, int, float, bool)
+
+    Returns:
+        변환된 설정 값
+    """
+    value = None
+
+    # Streamlit Secrets 시도
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        pass
+
+    # 환경변수 시도
+    if value is None:
+        value = os.getenv(name)
+
+    if value is None or value == "":
+        return default
+
+    if cast is bool:
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in _TRUE_VALUES
+
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        print(f"⚠️ 설정 값 변환 실패: {name}={value!r} (기본값 {default!r} 사용)")
+        return default
@@ -0,0 +1,472 @@
+"""
+청소년 인지 재구조화 챗봇 - 구조화 출력 엔진 (JSON 스키마 / 관대한 파서 / 복구 호출)
+
+평가·추출 에이전트의 JSON 응답을 한 곳에서 처리합니다.
+1. 에이전트별 JSON 스키마를 response_format으로 전달
+2. JSON 파싱 실패 시 잘린 JSON을 로컬에서 복구 (열린 문자열/괄호 닫기, 미완성 항목 제거)
+3. 그래도 실패하거나 스키마 검증만 실패하면 저렴한 모델로 복구 호출 (비싼 호출 결과를 버리지 않음)
+   - 스키마 검증만 실패한 JSON은 잘라내지 않고, 복구 호출도 실패하면 기존 방식처럼 그대로 사용
+세션별로 파싱 실패 때문에 낭비된 호출 수를 기존 방식 기준과 함께 집계합니다
+(백그라운드 작업에서는 collect_outcomes로 모아 스크립트 스레드에서 apply_outcomes로 반영).
+"""
+
+import json
+import re
+import threading
+
+import streamlit as st
+
+import perf_metrics
+from llm_client import chat_completion
+from settings import get_setting
+
+
+# ========== 에이전트별 JSON 스키마 ==========
+
+_STRING = {"type": "string"}
+_BOOLEAN = {"type": "boolean"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+SCHEMAS = {
+    # prompt2.txt - 정보 수집 완료 평가
+    'collection_evaluator': {
+        "type": "object",
+        "properties": {
+            "status": {"type": "string", "enum": ["COMPLETE", "INCOMPLETE"]},
+            "reason": _STRING,
+            "situation_clear": _BOOLEAN,
+            "emotion_expressed": _BOOLEAN,
+            "action_mentioned": _BOOLEAN,
+            "context_sufficient": _BOOLEAN
+        },
+        "required": ["status", "reason"]
+    },
+    # prompt3.txt - 감정-논리-행동 추출
+    'elb_extractor': {
+        "type": "object",
+        "properties": {
+            "emotion": {
+                "type": "object",
+                "properties": {"primary": _STRING, "secondary": _STRING, "description": _STRING},
+                "required": ["primary"]
+            },
+            "logic": {
+                "type": "object",
+                "properties": {"automatic_thoughts": _STRING_LIST, "core_belief": _STRING, "description": _STRING},
+                "required": ["automatic_thoughts"]
+            },
+            "behavior": {
+                "type": "object",
+                "properties": {"actions": _STRING_LIST, "avoidance": _STRING_LIST, "description": _STRING},
+                "required": ["actions"]
+            },
+            "summary": _STRING
+        },
+        "required": ["emotion", "logic", "behavior", "summary"]
+    },
+    # prompt5.txt - 인지왜곡 추출 준비 평가
+    'distortion_evaluator': {
+        "type": "object",
+        "properties": {
+            "status": {"type": "string", "enum": ["READY", "NOT_READY"]},
+            "reason": _STRING,
+            "collected_areas": {
+                "type": "object",
+                "properties": {
+                    "concrete_situation": _BOOLEAN,
+                    "automatic_thoughts": _BOOLEAN,
+                    "extremity_check": _BOOLEAN
+                }
+            },
+            "turn_count": {"type": "integer"},
+            "coverage": _STRING,
+            "missing_info": _STRING_LIST,
+            "next_questions": _STRING_LIST
+        },
+        "required": ["status", "reason"]
+    },
+    # prompt6.txt - 인지왜곡 유형 추출
+    'distortion_extractor': {
+        "type": "object",
+        "properties": {
+            "distortions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "type": _STRING,
+                        "type_english": _STRING,
+                        "evidence": _STRING_LIST,
+                        "explanation": _STRING,
+                        "pattern": _STRING
+                    },
+                    "required": ["type", "type_english", "evidence", "explanation"]
+                }
+            },
+            "overall_summary": _STRING
+        },
+        "required": ["distortions"]
+    },
+    # prompt8.txt - 재구조화 방법 선택
+    'method_selector': {
+        "type": "object",
+        "properties": {
+            "selected_method": _STRING,
+            "method_code": {
+                "type": "string",
+                "enum": ["alternative", "evidence", "decatastrophizing", "distancing", "miracle"]
+            },
+            "reason": _STRING,
+            "expected_effectiveness": _STRING,
+            "key_questions": _STRING_LIST
+        },
+        "required": ["selected_method", "method_code", "reason"]
+    }
+}
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float)
+}
+
+
+# 백그라운드 작업 스레드의 파싱 결과 (session_state 대신 작업 결과와 함께 반환)
+_outcome_buffer = threading.local()
+
+
+class StructuredOutputError(ValueError):
+    """복구 호출까지 실패해 JSON 결과를 얻지 못한 경우"""
+
+
+def get_response_format(agent):
+    """에이전트별 response_format (STRUCTURED_OUTPUT_MODE: json_schema / json_object / off)"""
+    mode = get_setting("STRUCTURED_OUTPUT_MODE", "json_schema")
+
+    if mode == "json_schema" and agent in SCHEMAS:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": agent, "schema": SCHEMAS[agent], "strict": False}
+        }
+    if mode in ("json_schema", "json_object"):
+        return {"type": "json_object"}
+    return None
+
+
+def validate(value, schema, path="$"):
+    """
+    간단한 스키마 검증 (type / required / enum / items / properties)
+
+    Returns:
+        오류 메시지 리스트 (비어 있으면 통과)
+    """
+    errors = []
+    expected = _JSON_TYPES.get(schema.get("type"))
+
+    # bool은 int의 하위 타입이므로 별도 처리
+    if expected is not None:
+        if isinstance(value, bool) and schema.get("type") in ("integer", "number"):
+            return [f"{path}: {schema['type']} 필요"]
+        if not isinstance(value, expected):
+            return [f"{path}: {schema['type']} 필요"]
+
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {schema['enum']} 중 하나여야 함")
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: 필수 항목 누락")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub_schema, f"{path}.{key}"))
+
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+
+    return errors
+
+
+# ========== 파서 ==========
+
+def strip_code_fence(text):
+    """```json 코드 블록 제거 (기존 방식)"""
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].split("```")[0].strip()
+    return text.strip()
+
+
+class IncrementalJSONRepairer:
+    """
+    잘린 JSON 복구용 증분 스캐너
+
+    텍스트를 한 번만 훑으면서 괄호 스택과 문자열 상태, 값이 끝난 위치(잘라도 되는 후보)를
+    기록합니다. 스트리밍 응답이라면 청크마다 feed()를 호출하면 됩니다.
+    """
+
+    # 복구 시 시도할 최대 후보 수
+    MAX_ATTEMPTS = 64
+
+    def __init__(self):
+        self.buffer = []
+        self.length = 0
+        self.started = False
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.cut_points = []  # (잘라도 되는 위치, 그 시점의 괄호 스택)
+
+    def feed(self, text):
+        """텍스트 추가 (첫 '{' 또는 '[' 이전 내용은 무시)"""
+        for char in text:
+            if not self.started:
+                if char not in "{[":
+                    continue
+                self.started = True
+
+            self.buffer.append(char)
+            self.length += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    self.cut_points.append((self.length, tuple(self.stack)))
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.stack.append(char)
+                self.cut_points.append((self.length, tuple(self.stack)))
+            elif char in "}]":
+                if self.stack:
+                    self.stack.pop()
+                self.cut_points.append((self.length, tuple(self.stack)))
+                if not self.stack:
+                    # 최상위 값 완료 - 이후 내용은 무시
+                    self.started = False
+                    return
+            elif char == ",":
+                self.cut_points.append((self.length - 1, tuple(self.stack)))
+
+    @staticmethod
+    def _close(text, stack):
+        """끝의 쉼표/콜론 제거 후 열린 괄호 닫기"""
+        text = text.rstrip()
+        while text and text[-1] in ",:":
+            text = text[:-1].rstrip()
+        closers = "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+        return text + closers
+
+    def finish(self, accept=None):
+        """
+        복구된 JSON 값 반환
+
+        Args:
+            accept: 결과 검사 함수 (False면 더 앞에서 자른 후보를 시도, 예: 스키마 검증)
+
+        Raises:
+            ValueError: 복구할 수 없는 경우
+        """
+        text = "".join(self.buffer)
+        if not text:
+            raise ValueError("JSON 시작 문자를 찾을 수 없음")
+
+        # 1) 그대로 닫기 (잘린 문자열 값도 살림)
+        candidate = text + ('"' if self.in_string and not self.escape else "")
+        attempts = [self._close(candidate, self.stack)]
+
+        # 2) 값이 끝난 위치에서 잘라 닫기 (뒤쪽부터)
+        for cut, stack in reversed(self.cut_points[-self.MAX_ATTEMPTS:]):
+            attempts.append(self._close(text[:cut], stack))
+
+        for attempt in attempts:
+            # 닫는 괄호 앞의 불필요한 쉼표 제거
+            attempt = re.sub(r",\s*([}\]])", r"\1", attempt)
+            try:
+                result = json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+            if accept is None or accept(result):
+                return result
+
+        raise ValueError("JSON 복구 실패")
+
+
+def repair_json(text, accept=None):
+    """잘리거나 깨진 JSON 문자열을 로컬에서 복구"""
+    repairer = IncrementalJSONRepairer()
+    repairer.feed(text)
+    return repairer.finish(accept)
+
+
+# ========== 세션별 통계 ==========
+
+def _record(outcome, legacy_rejected=False):
+    """
+    구조화 출력 결과 집계
+
+    outcome: strict / local_repair / llm_repair / unvalidated (스키마 검증 실패, 기존 방식처럼 그대로 사용) / wasted
+    legacy_rejected: 기존 방식(```json 잘라내기 + json.loads, 스키마 검증 없음)으로도 파싱에 실패했는지 여부.
+    legacy_wasted는 기존 방식이었다면 버려졌을 호출 수로, 이 경우만 셉니다
+    (JSON은 맞지만 스키마 검증만 실패한 응답은 기존 방식에서는 그대로 쓰였음).
+    """
+    perf_metrics.increment(f"structured_output.{outcome}")
+    if legacy_rejected:
+        perf_metrics.increment("structured_output.legacy_wasted")
+
+    buffer = getattr(_outcome_buffer, 'entries', None)
+    if buffer is not None:
+        buffer.append((outcome, legacy_rejected))
+    else:
+        apply_outcomes([(outcome, legacy_rejected)])
+
+
+def apply_outcomes(outcomes):
+    """세션별 통계 반영 (스크립트 스레드에서만 호출)"""
+    try:
+        stats = st.session_state.setdefault('structured_output_stats', {
+            'calls': 0,
+            'strict': 0,
+            'local_repair': 0,
+            'llm_repair': 0,
+            'unvalidated': 0,
+            'wasted': 0,
+            'legacy_wasted': 0
+        })
+        for outcome, legacy_rejected in outcomes:
+            stats['calls'] += 1
+            stats[outcome] = stats.get(outcome, 0) + 1
+            if legacy_rejected:
+                stats['legacy_wasted'] += 1
+    except Exception:
+        # 스크립트 컨텍스트 밖 (CLI 등)
+        pass
+
+
+def collect_outcomes(fn, *args):
+    """
+    백그라운드 작업 실행 (세션 통계는 session_state에 쓰지 않고 결과와 함께 반환)
+
+    Returns:
+        (fn 결과, 파싱 결과 목록) - 스크립트 스레드에서 apply_outcomes로 반영
+    """
+    previous = getattr(_outcome_buffer, 'entries', None)
+    _outcome_buffer.entries = []
+    try:
+        return fn(*args), _outcome_buffer.entries
+    finally:
+        _outcome_buffer.entries = previous
+
+
+def _llm_repair(agent, text, errors):
+    """저렴한 모델로 JSON 복구 호출"""
+    schema = SCHEMAS.get(agent)
+    schema_text = json.dumps(schema, ensure_ascii=False) if schema else "(스키마 없음)"
+
+    response = chat_completion(
+        'json_repair',
+        messages=[
+            {
+                "role": "system",
+                "content": "당신은 깨진 JSON을 고치는 도구입니다. 주어진 내용을 최대한 보존하여 스키마에 맞는 올바른 JSON만 출력하세요."
+            },
+            {
+                "role": "user",
+                "content": f"[스키마]\n{schema_text}\n\n[문제]\n{'; '.join(errors)}\n\n[깨진 JSON]\n{text}"
+            }
+        ],
+        response_format={"type": "json_object"}
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+def parse_structured(agent, text):
+    """
+    에이전트 응답 텍스트를 JSON으로 파싱 (엄격 → 로컬 복구 → LLM 복구)
+
+    로컬 복구(잘라서 닫기)는 JSON 파싱 자체가 실패한 경우에만 씁니다. 파싱은 되고 스키마 검증만
+    실패한 응답을 잘라내면 멀쩡한 항목까지 버려지므로, LLM 복구를 시도하고 그것도 실패하면
+    기존 방식처럼 파싱한 값을 그대로 반환합니다.
+
+    Returns:
+        dict (스키마 검증 통과, 또는 검증에 실패했지만 파싱된 객체)
+
+    Raises:
+        StructuredOutputError: 모든 단계 실패 시
+    """
+    schema = SCHEMAS.get(agent, {"type": "object"})
+    errors = []
+    decoded = None
+    legacy_rejected = False
+
+    # 1) 엄격 파싱 (기존 방식 + 스키마 검증)
+    try:
+        decoded = json.loads(strip_code_fence(text))
+        errors = validate(decoded, schema)
+        if not errors:
+            _record("strict")
+            return decoded
+    except json.JSONDecodeError as e:
+        errors = [f"JSON 파싱 오류: {e}"]
+        legacy_rejected = True
+
+    # 2) 로컬 복구 (잘린 JSON만 - 파싱된 JSON을 잘라내면 데이터 손실)
+    if legacy_rejected:
+        try:
+            result = repair_json(text, accept=lambda value: not validate(value, schema))
+            print(f"[구조화 출력] {agent} 로컬 복구 성공")
+            _record("local_repair", legacy_rejected)
+            return result
+        except ValueError:
+            pass
+
+    # 3) LLM 복구 호출
+    if get_setting("JSON_REPAIR_WITH_LLM", True, bool):
+        try:
+            result = _llm_repair(agent, text, errors)
+            if not validate(result, schema):
+                print(f"[구조화 출력] {agent} 복구 호출 성공")
+                _record("llm_repair", legacy_rejected)
+                return result
+        except Exception as e:
+            print(f"[구조화 출력] {agent} 복구 호출 실패: {e}")
+
+    # 4) 스키마 검증만 실패한 객체는 기존 방식처럼 그대로 사용
+    if isinstance(decoded, dict):
+        print(f"[구조화 출력] {agent} 스키마 검증 실패 - 파싱 결과 그대로 사용: {'; '.join(errors)}")
+        _record("unvalidated")
+        return decoded
+
+    _record("wasted", legacy_rejected)
+    raise StructuredOutputError(f"{agent} 응답 파싱 실패: {'; '.join(errors)}")
+
+
+def complete_json(agent, messages, **request):
+    """
+    구조화 출력 호출 (스키마 response_format + 파싱/복구)
+
+    Args:
+        agent: 호출 에이전트 이름
+        messages: 대화 메시지
+        **request: 추가 chat.completions.create 인자
+
+    Returns:
+        dict
+    """
+    response_format = get_response_format(agent)
+    if response_format is not None:
+        request.setdefault('response_format', response_format)
+
+    response = chat_completion(agent, messages=messages, **request)
+    return parse_structured(agent, response.choices[0].message.content or "")
@@ -0,0 +1,538 @@
+"""
+청소년 인지 재구조화 챗봇 - 로컬 OpenAI 호환 스텁 서버 (오프라인 부하/성능 측정용)
+
+chat.completions 요청 형식(스트리밍, response_format 포함)을 그대로 받아
+에이전트별로 규칙 기반 응답을 돌려줍니다. 실제 토큰을 쓰지 않고 파이프라인 전체의
+지연시간·재시도·헤지·라우팅 동작을 측정할 수 있습니다.
+
+실행:
+    python stub_server.py --port 8787 --profile realistic
+
+앱 연결 (.env 또는 Streamlit Secrets):
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1
+    OPENAI_API_KEY=sk-local   # 아무 값이나 가능
+
+지연시간 프로필 (--profile):
+    instant   : 지연 없음
+    fast      : 중앙값 0.3초, 오류 없음
+    realistic : 중앙값 1.5초, 긴 꼬리, 오류 1%
+    slow_tail : 중앙값 1.5초, 5%는 10배 지연 (헤지/SLO 대체 시험용)
+    flaky     : 중앙값 1초, 오류 15% (재시도/서킷 브레이커 시험용)
+
+--profile-file로 TOML 파일을 주면 프로필을 덮어쓸 수 있습니다:
+    median = 1.0          # 전체 응답 시간 중앙값 (초)
+    sigma = 0.5           # 로그정규 분포 sigma
+    tail_rate = 0.05      # 꼬리 지연 비율
+    tail_multiplier = 10  # 꼬리 지연 배수
+    error_rate = 0.02     # 오류 응답 비율
+    error_statuses = [429, 500, 503]
+    ttft_ratio = 0.3      # 스트리밍 시 첫 토큰까지 걸리는 비율
+
+    [agents.safety]       # 에이전트별 덮어쓰기
+    median = 0.4
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import tomllib
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PROFILES = {
+    'instant': {'median': 0.0, 'sigma': 0.0, 'error_rate': 0.0},
+    'fast': {'median': 0.3, 'sigma': 0.3, 'error_rate': 0.0},
+    'realistic': {'median': 1.5, 'sigma': 0.6, 'error_rate': 0.01},
+    'slow_tail': {'median': 1.5, 'sigma': 0.4, 'tail_rate': 0.05, 'tail_multiplier': 10.0, 'error_rate': 0.0},
+    'flaky': {'median': 1.0, 'sigma': 0.5, 'error_rate': 0.15}
+}
+
+DEFAULT_PROFILE = {
+    'median': 1.0,
+    'sigma': 0.5,
+    'tail_rate': 0.0,
+    'tail_multiplier': 10.0,
+    'error_rate': 0.0,
+    'error_statuses': [429, 500, 503],
+    'ttft_ratio': 0.3,
+    # 에이전트별 상대 지연 (추출 에이전트는 출력이 길어 느림)
+    'agents': {
+        'safety': {'median_scale': 0.5},
+        'quick_replies': {'median_scale': 0.7},
+        'collection_evaluator': {'median_scale': 0.6},
+        'distortion_evaluator': {'median_scale': 0.7},
+        'elb_extractor': {'median_scale': 1.5},
+        'distortion_extractor': {'median_scale': 2.5},
+        'method_selector': {'median_scale': 1.2},
+        'json_repair': {'median_scale': 0.5}
+    }
+}
+
+# 스트리밍 청크 크기 (글자 수)
+STREAM_CHUNK_CHARS = 4
+
+# 시스템 프롬프트 문구 → 에이전트 (앞쪽이 우선)
+AGENT_MARKERS = [
+    ('안전 모니터링 에이전트', 'safety'),
+    ('깨진 JSON', 'json_repair'),
+    ('다음 턴에 할 법한', 'quick_replies'),
+    ('정보 수집이 충분히 완료되었는지 평가', 'collection_evaluator'),
+    ('감정, 논리, 행동을 추출', 'elb_extractor'),
+    ('추출 준비가 되었는지', 'distortion_evaluator'),
+    ('인지왜곡 유형을 추출', 'distortion_extractor'),
+    ('재구조화 방법을 선택', 'method_selector'),
+    ('재구조화하는', 'restructuring_reply')
+]
+
+# 안전 에이전트 규칙 (현재 사용자 메시지 기준)
+CRISIS_KEYWORDS = ['죽고 싶', '자살', '자해', '사라지고 싶', '살기 싫']
+DISTRESS_KEYWORDS = ['힘들', '우울', '외로', '무기력', '불안']
+
+MIN_USER_TURNS = 3
+
+
+class StubState:
+    """서버 전역 상태 (프로필, 난수, 요청 통계)"""
+
+    def __init__(self, profile, seed=None, quiet=False):
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def agent_profile(self, agent):
+        """에이전트별 덮어쓰기가 적용된 프로필"""
+        merged = {k: v for k, v in self.profile.items() if k != 'agents'}
+        override = self.profile.get('agents', {}).get(agent, {})
+        merged.update(override)
+        merged['median'] = merged['median'] * override.get('median_scale', 1.0)
+        return merged
+
+    def sample_latency(self, profile):
+        """로그정규 분포 지연시간 (꼬리 지연 포함)"""
+        with self.lock:
+            if profile['median'] <= 0:
+                return 0.0
+            latency = profile['median'] * math.exp(self.random.gauss(0, profile['sigma']))
+            if self.random.random() < profile.get('tail_rate', 0.0):
+                latency *= profile.get('tail_multiplier', 10.0)
+            return latency
+
+    def sample_error(self, profile):
+        """오류 상태 코드 (없으면 None)"""
+        with self.lock:
+            if self.random.random() < profile.get('error_rate', 0.0):
+                return self.random.choice(profile.get('error_statuses', [500]))
+            return None
+
+    def record(self, agent, status):
+        with self.lock:
+            key = f"{agent}:{status}"
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+# ========== 에이전트별 응답 생성 ==========
+
+def detect_agent(body):
+    """요청 본문에서 에이전트 판별 (json_schema 이름 → 시스템 프롬프트 문구 → 단계별 응답)"""
+    response_format = body.get('response_format') or {}
+    if response_format.get('type') == 'json_schema':
+        name = response_format.get('json_schema', {}).get('name')
+        if name:
+            return name
+
+    system_text = "\n".join(
+        m.get('content') or "" for m in body.get('messages', []) if m.get('role') == 'system'
+    )
+    for marker, agent in AGENT_MARKERS:
+        if marker in system_text:
+            return agent
+    return 'stage_reply'
+
+
+def _last_user_text(body):
+    for message in reversed(body.get('messages', [])):
+        if message.get('role') == 'user':
+            return message.get('content') or ""
+    return ""
+
+
+def _user_turns(text):
+    """평가/추출 에이전트 입력에서 청소년 발화 수"""
+    return text.count("청소년:")
+
+
+def _safety_assessment(text):
+    """키워드 규칙 기반 위험도 평가"""
+    current = text.split("[현재 사용자 메시지]")[-1]
+    crisis = [k for k in CRISIS_KEYWORDS if k in current]
+    distress = [k for k in DISTRESS_KEYWORDS if k in current]
+
+    if crisis:
+        level, category = 5, "CRITICAL"
+    elif distress:
+        level, category = 2, "LOW"
+    else:
+        level, category = 1, "NONE"
+
+    return {
+        "risk_level": level,
+        "risk_category": category,
+        "detected_keywords": crisis + distress,
+        "risk_factors": ["자살/자해 관련 표현"] if crisis else [],
+        "protective_factors": [],
+        "immediate_action_required": level >= 5,
+        "recommended_response": "",
+        "follow_up_needed": level >= 4,
+        "alert_guardian": level >= 5,
+        "session_should_end": False
+    }
+
+
+# 스키마 타입별 빈 값 (복구 응답에서 누락된 필수 항목 채우기)
+_SCHEMA_DEFAULTS = {"object": dict, "array": list, "string": str, "boolean": bool, "integer": int, "number": float}
+
+
+def _close_json(prefix):
+    """잘린 JSON 앞부분에 열린 문자열/괄호 닫기"""
+    stack = []
+    in_string = escaped = False
+    for char in prefix:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    return prefix + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def _decode_broken(text):
+    """깨진 JSON에서 살릴 수 있는 가장 긴 앞부분 디코딩 (실패하면 None)"""
+    text = text.strip().strip("`")
+    if text.startswith("json"):
+        text = text[4:]
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+    for end in range(len(text), 0, -1):
+        if text[end - 1] not in '}]"0123456789el':
+            continue
+        try:
+            return json.loads(_close_json(text[:end]))
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _conform(value, schema):
+    """스키마에 맞게 값 맞추기 (타입이 다르거나 없는 항목은 빈 값, enum은 첫 값)"""
+    kind = schema.get("type")
+    if kind in _SCHEMA_DEFAULTS:
+        expected = (int, float) if kind == "number" else _SCHEMA_DEFAULTS[kind]
+        if not isinstance(value, expected) or (isinstance(value, bool) and kind in ("integer", "number")):
+            value = _SCHEMA_DEFAULTS[kind]()
+    if "enum" in schema and value not in schema["enum"]:
+        value = schema["enum"][0]
+
+    if isinstance(value, dict):
+        value = dict(value)
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value or key in schema.get("required", []):
+                value[key] = _conform(value.get(key), sub_schema)
+    elif isinstance(value, list) and "items" in schema:
+        value = [_conform(item, schema["items"]) for item in value]
+    return value
+
+
+def _repaired_json(text):
+    """json_repair 요청의 [깨진 JSON]을 살리고 [스키마]의 필수 항목을 채운 응답"""
+    schema_text = text.split("[스키마]\n", 1)[-1].split("\n\n[문제]", 1)[0]
+    broken = text.split("[깨진 JSON]\n", 1)[-1]
+    try:
+        schema = json.loads(schema_text)
+    except json.JSONDecodeError:
+        schema = {"type": "object"}  # (스키마 없음)
+    return _conform(_decode_broken(broken), schema)
+
+
+def build_content(agent, body):
+    """에이전트별 응답 본문 (JSON 에이전트는 JSON 문자열)"""
+    text = _last_user_text(body)
+    turns = _user_turns(text)
+
+    if agent == 'safety':
+        result = _safety_assessment(text)
+    elif agent == 'quick_replies':
+        result = {"options": [
+            "그냥 요즘 계속 그런 일이 반복돼서 좀 지쳤던 것 같아요",
+            "처음엔 별로 신경 안 썼는데 나중에 생각해보니까 속상하더라고요",
+            "솔직히 말하면 화가 나서 방에 들어가서 문 닫아버렸어요"
+        ]}
+    elif agent == 'collection_evaluator':
+        complete = turns >= MIN_USER_TURNS
+        result = {
+            "status": "COMPLETE" if complete else "INCOMPLETE",
+            "reason": f"청소년 발화 {turns}회 (스텁 규칙: {MIN_USER_TURNS}회 이상이면 완료)",
+            "situation_clear": complete,
+            "emotion_expressed": complete,
+            "action_mentioned": complete,
+            "context_sufficient": complete
+        }
+    elif agent == 'elb_extractor':
+        result = {
+            "emotion": {"primary": "속상함", "secondary": "억울함", "description": "친구 관계에서 속상함을 느낌"},
+            "logic": {
+                "automatic_thoughts": ["다들 나를 싫어하는 것 같다"],
+                "core_belief": "나는 사랑받지 못한다",
+                "description": "한 번의 일을 전체로 일반화함"
+            },
+            "behavior": {"actions": ["방에 들어가 문을 닫음"], "avoidance": ["친구에게 연락하지 않음"], "description": "회피 행동"},
+            "summary": "친구와의 갈등 후 속상함을 느끼고 관계를 회피함"
+        }
+    elif agent == 'distortion_evaluator':
+        ready = turns >= MIN_USER_TURNS
+        result = {
+            "status": "READY" if ready else "NOT_READY",
+            "reason": f"청소년 발화 {turns}회 (스텁 규칙: {MIN_USER_TURNS}회 이상이면 준비 완료)",
+            "collected_areas": {"concrete_situation": ready, "automatic_thoughts": ready, "extremity_check": ready},
+            "turn_count": turns,
+            "coverage": "충분" if ready else "부족",
+            "missing_info": [] if ready else ["자동적 사고의 극단성"],
+            "next_questions": [] if ready else ["그때 어떤 생각이 제일 먼저 들었어?"]
+        }
+    elif agent == 'distortion_extractor':
+        # 유형 이름은 distortion_classifier.DISTORTION_LABELS / prompt6.txt와 같은 표기
+        # (섀도 일치도·로컬 대체 결과와 비교되므로 다른 이름을 쓰면 안 됨)
+        result = {
+            "distortions": [
+                {"type": "과잉 일반화", "type_english": "Overgeneralization", "evidence": ["다들 나를 싫어해"],
+                 "explanation": "한 번의 일을 모든 상황으로 넓혀서 생각하고 있어요.", "pattern": "항상/모두"},
+                {"type": "성급한 판단", "type_english": "Jumping to Conclusions", "evidence": ["분명 나를 무시한 거야"],
+                 "explanation": "상대의 마음을 확인 없이 단정하고 있어요.", "pattern": "추측"},
+                {"type": "확대와 축소", "type_english": "Magnification and Minimization", "evidence": ["이제 끝났어"],
+                 "explanation": "일어날 일을 가장 나쁜 쪽으로만 생각하고 있어요.", "pattern": "최악 예상"}
+            ],
+            "overall_summary": "관계 상황을 일반화하고 상대의 마음을 단정하는 경향"
+        }
+    elif agent == 'method_selector':
+        result = {
+            "selected_method": "증거 찾기",
+            "method_code": "evidence",
+            "reason": "구체적인 근거를 확인하면 생각을 점검하기 쉬움",
+            "expected_effectiveness": "높음",
+            "key_questions": ["그렇게 생각하는 근거는 뭐야?", "반대되는 증거도 있을까?"]
+        }
+    elif agent == 'json_repair':
+        result = _repaired_json(text)
+    else:
+        snippet = text.strip().replace("\n", " ")[:30]
+        return (
+            f"그랬구나. \"{snippet}\"라고 말해줘서 고마워. "
+            "그 일이 있었을 때 어떤 기분이 들었는지 조금 더 이야기해 줄 수 있을까?"
+        )
+
+    return json.dumps(result, ensure_ascii=False)
+
+
+# ========== HTTP 처리 ==========
+
+def _usage(body, content):
+    """대략적인 토큰 사용량 (글자 수 기준)"""
+    prompt_chars = sum(len(m.get('content') or "") for m in body.get('messages', []))
+    prompt_tokens = max(1, prompt_chars // 2)
+    completion_tokens = max(1, len(content) // 2)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI chat.completions 호환 핸들러"""
+
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        # 기본 접근 로그 대신 요청 요약만 출력
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "owned_by": "stub"} for model in ("gpt-4o", "gpt-4o-mini")
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        state = self.state
+        agent = detect_agent(body)
+        profile = state.agent_profile(agent)
+        latency = state.sample_latency(profile)
+        started = time.monotonic()
+
+        status = state.sample_error(profile)
+        if status is not None:
+            # 오류도 일부 지연 후 반환 (실제 API와 비슷하게)
+            time.sleep(latency * profile['ttft_ratio'])
+            headers = {"Retry-After": "1"} if status == 429 else None
+            self._send_json(status, {"error": {
+                "message": f"stub injected error ({status})",
+                "type": "rate_limit_error" if status == 429 else "server_error",
+                "code": None
+            }}, headers)
+        else:
+            content = build_content(agent, body)
+            if body.get('stream'):
+                self._stream(body, content, latency, profile['ttft_ratio'])
+            else:
+                time.sleep(latency)
+                self._send_json(200, {
+                    "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get('model', 'gpt-4o'),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": _usage(body, content)
+                })
+            status = 200
+
+        state.record(agent, status)
+        if not state.quiet:
+            print(f"[스텁] {agent:<22} {body.get('model', '-'):<12} {status} {time.monotonic() - started:.2f}초")
+
+    def _stream(self, body, content, latency, ttft_ratio):
+        """SSE 스트리밍 응답 (첫 청크까지 ttft_ratio, 나머지는 청크별로 나눠 지연)"""
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get('model', 'gpt-4o')
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        interval = latency * (1 - ttft_ratio) / len(pieces)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        try:
+            time.sleep(latency * ttft_ratio)
+            send({"role": "assistant", "content": ""})
+            for piece in pieces:
+                time.sleep(interval)
+                send({"content": piece})
+            send({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 스트림을 닫음 (헤지 요청 취소 등)
+            pass
+
+
+def load_profile(name, profile_file=None, overrides=None):
+    """기본값 → 내장 프로필 → 프로필 파일 → 명령행 순으로 덮어쓴 프로필"""
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    profile.update(PROFILES[name])
+
+    if profile_file:
+        with open(profile_file, 'rb') as f:
+            config = tomllib.load(f)
+        for agent, values in config.pop('agents', {}).items():
+            profile['agents'].setdefault(agent, {}).update(values)
+        profile.update(config)
+
+    profile.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument("--profile-file", help="프로필 덮어쓰기 TOML 파일")
+    parser.add_argument("--median", type=float, help="응답 시간 중앙값 (초)")
+    parser.add_argument("--sigma", type=float, help="로그정규 분포 sigma")
+    parser.add_argument("--error-rate", type=float, help="오류 응답 비율 (0~1)")
+    parser.add_argument("--seed", type=int, help="난수 시드 (재현용)")
+    parser.add_argument("--quiet", action="store_true", help="요청별 로그 생략")
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile, args.profile_file, {
+        'median': args.median,
+        'sigma': args.sigma,
+        'error_rate': args.error_rate
+    })
+
+    StubHandler.state = StubState(profile, seed=args.seed, quiet=args.quiet)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+
+    print(f"✅ 스텁 서버 시작: http://{args.host}:{args.port}/v1 (프로필: {args.profile})")
+    print(f"   중앙값 {profile['median']}초, sigma {profile['sigma']}, 오류율 {profile['error_rate']}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("\n[스텁 요청 통계]")
+        for key, count in sorted(StubHandler.state.counts.items()):
+            print(f"  {key}: {count}")
+
+
+if __name__ == "__main__":
+    main()
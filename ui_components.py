@@ -355,3 +355,32 @@ def check_usage_time_warning(session_start_time):
             권장 사용 시간을 초과했습니다.
             지금 대화를 마무리하고 다음에 다시 만나요.
             """)
+
+
+def render_perf_metrics(snapshot, connection_stats=None):
+    """성능 지표 렌더링 (운영자용, SHOW_PERF_METRICS 설정 시)"""
+    with st.expander("⚙️ 성능 지표"):
+        if connection_stats:
+            st.markdown("**🔌 OpenAI 커넥션 재사용**")
+            st.caption(
+                f"요청 {connection_stats['requests']}회 · "
+                f"새 연결 {connection_stats['connections_opened']}회 · "
+                f"재사용 {connection_stats['reused']}회 "
+                f"({connection_stats['reuse_ratio']:.0%})"
+            )
+        
+        if snapshot.get('latency'):
+            st.markdown("**⏱️ 지연시간 (초)**")
+            for name, stats in sorted(snapshot['latency'].items()):
+                st.caption(
+                    f"{name}: p50 {stats['p50']:.2f} · p95 {stats['p95']:.2f} · "
+                    f"p99 {stats['p99']:.2f} (n={stats['count']})"
+                )
+        
+        if snapshot.get('counters'):
+            st.markdown("**🔢 카운터**")
+            st.json(snapshot['counters'], expanded=False)
+        
+        if snapshot.get('gauges'):
+            st.markdown("**📟 상태**")
+            st.json(snapshot['gauges'], expanded=False)